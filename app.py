@@ -1,16 +1,13 @@
 import streamlit as st
-import pandas as pd
 import random
+from scenario_loader import read_scenario_workbook
+from competency_matcher import get_matcher
 
 @st.cache_data
 def load_data(file_path):
     """Load all sheets from the Excel file."""
     try:
-        excel_file = pd.ExcelFile(file_path)
-        data = {}
-        for sheet_name in excel_file.sheet_names:
-            data[sheet_name] = pd.read_excel(file_path, sheet_name=sheet_name)
-        return data
+        return read_scenario_workbook(file_path)
     except Exception as e:
         st.error(f"Error loading file: {e}")
         return None
@@ -88,23 +85,11 @@ else:
         st.error("No scenarios available in this category.")
     
     st.markdown("---")
-    # --- Simple rule-based ICF feedback engine ---
-    competency_map = {
-        "Evokes Awareness": ["what", "how", "could", "might", "imagine", "notice"],
-        "Active Listening": ["I hear", "you said", "it sounds", "you mentioned"],
-        "Maintains Presence": ["let’s pause", "take a moment", "what are you feeling"],
-        "Cultivates Trust & Safety": ["thank you for sharing", "that sounds hard", "I appreciate your honesty"],
-        "Facilitates Growth": ["next step", "apply", "move forward", "experiment", "commit"]
-    }
-
-    # --- Feedback section ---
+    # --- Feedback section (rule-based ICF feedback engine) ---
     def evaluate_icf_feedback(coach_input):
-    # This function should probably have access to `competency_map`
-    # which should be defined elsewhere in your global scope.
-        coach_input_lower = coach_input.lower()
-        matched = [c for c, kws in competency_map.items() if any(k in coach_input_lower for k in kws)]
         if not coach_input.strip():
             return "Please enter your coaching response to get feedback."
+        matched = list(get_matcher().score(coach_input))
         if matched:
             return f"✅ Your response aligns with: {', '.join(matched)}.\n\nGreat use of curiosity and reflection!"
         return "🤔 I didn’t detect clear ICF-aligned phrasing.\nTry using more open-ended or awareness-based questions (e.g., starting with *what* or *how*)."
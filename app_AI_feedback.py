@@ -1,79 +1,193 @@
+import hashlib
+import os
+import uuid
 import streamlit as st
-import pandas as pd
-import random
-from openai import OpenAI
-from scenario_manager import ScenarioManager, display_extraction_interface, display_library_manager
+from scenario_manager import get_shared_manager, display_extraction_interface, display_library_manager
+from scenario_loader import load_scenario_bank
+from scenario_sampler import ScenarioIndex, ScenarioSampler
+from scenario_search import DEFAULT_INDEX_FILE, ICF_COMPETENCIES, SimilarityIndex, scenario_key
+from llm_client import PROVIDER_OLLAMA, PROVIDER_OPENAI, get_client, stream_chat_completion, format_stream_stats
+from llm_cache import get_response_cache
+from llm_scheduler import BULK, INTERACTIVE, format_queue_status, scheduled
+from llm_failover import Backend, HedgedClient
+from ollama_warmup import DEFAULT_KEEP_ALIVE, KEEP_ALIVE_OPTIONS, format_warm_status, get_model_warmer
+from transcript_parser import iter_turns
+from transcript_analysis import build_analysis_prompt, needs_chunking, prepare_analysis_prompt
+from competency_matcher import get_matcher, format_competency_summary
+from feedback_prompts import FEEDBACK_PROMPT_VERSION, GENERAL_MODE, BOTTOM_LINING_MODE, build_feedback_prompt
+
+@st.cache_resource
+def _scenario_cache_stats():
+    """Process-wide hit/miss counters for the scenario bank cache."""
+    return {'calls': 0, 'misses': 0}
+
+def _file_version(file_path):
+    """Return (mtime_ns, size) for a file, or (0, 0) if it does not exist."""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return (0, 0)
+    return (stat.st_mtime_ns, stat.st_size)
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _load_scenario_bank(file_path, excel_version):
+    """
+    Load the workbook scenario bank and index it.
+
+    Shared by every session in this process. The version argument is only
+    used as a cache key: a new Excel mtime/size produces a new entry, so
+    unchanged reruns never touch the disk. A cold start reads the compiled
+    scenario_bank.pkl when it is up to date. Custom scenarios are synced into
+    the index by load_data, not baked into the cache entry.
+    """
+    _scenario_cache_stats()['misses'] += 1
+    return ScenarioIndex(load_scenario_bank(file_path))
 
-def load_data(file_path, _custom_scenario_count=0):
+def load_data(file_path):
     """
-    Load all sheets from the Excel file and merge with custom scenarios.
-    Note: Cache removed to ensure custom scenarios always load fresh.
+    Load all sheets from the Excel file merged with custom scenarios.
+
+    The workbook is cached per process and reloaded when the Excel file
+    changes on disk. Custom scenarios are applied as deltas on each call, so
+    adding or deleting one does not re-merge the bank.
 
     Args:
         file_path: Path to Excel file
-        _custom_scenario_count: Number of custom scenarios (for cache invalidation)
+
+    Returns:
+        ScenarioIndex over the merged scenario bank, or None on error
     """
     try:
-        excel_file = pd.ExcelFile(file_path)
-        data = {}
-        for sheet_name in excel_file.sheet_names:
-            data[sheet_name] = pd.read_excel(file_path, sheet_name=sheet_name)
-
-        # Merge with custom scenarios from JSON
-        manager = ScenarioManager()
-        if manager.get_stats()['total'] > 0:
-            data = manager.merge_with_excel_data(data)
-
-        return data
+        _scenario_cache_stats()['calls'] += 1
+        scenario_index = _load_scenario_bank(file_path, _file_version(file_path))
+        scenario_index.sync(get_shared_manager())
+        return scenario_index
     except Exception as e:
         st.error(f"Error loading file: {e}")
         return None
 
-def get_random_scenario(df):
+def get_scenario_cache_stats():
+    """Return scenario bank cache hits and misses for this process."""
+    counters = _scenario_cache_stats()
+    return {
+        'hits': counters['calls'] - counters['misses'],
+        'misses': counters['misses']
+    }
+
+def get_random_scenario(scenario_index, category):
     """
-    Get a random scenario from the dataframe.
-    Gives 70% priority to custom scenarios (from real transcripts) if available.
+    Get a random scenario for this session from the precomputed index.
+    Gives 70% priority to custom scenarios (from real transcripts) if available,
+    and does not repeat a custom (or workbook) scenario until all of the
+    category's custom (or workbook) scenarios have been shown.
+    Add ?seed=<n> to the URL for a reproducible sequence.
     """
-    if df is None or len(df) == 0:
-        return None
-
-    # Check if there are custom scenarios (identified by 'Source' column)
-    if 'Source' in df.columns:
-        custom_scenarios = df[df['Source'] == 'Real Transcript']
+    sampler = st.session_state.get('scenario_sampler')
+    if sampler is None or sampler.index is not scenario_index:
+        seed = st.query_params.get('seed')
+        sampler = ScenarioSampler(scenario_index, seed=int(seed) if seed and seed.isdigit() else None)
+        st.session_state.scenario_sampler = sampler
+    return sampler.draw(category)
+
+@st.cache_resource(show_spinner=False)
+def _similarity_index():
+    """Process-wide similar-scenario index, loaded from scenario_vectors.pkl."""
+    return SimilarityIndex.load(DEFAULT_INDEX_FILE)
+
+def get_similarity_index(scenario_index):
+    """
+    Return the similar-scenario index synced with the scenario bank.
 
-        if len(custom_scenarios) > 0:
-            # 70% chance to select from custom scenarios
-            if random.random() < 0.70:
-                return custom_scenarios.sample(n=1).iloc[0]
+    Only scenarios added or changed since the last sync are vectorized, and
+    the index is written back to disk when it changed.
+    """
+    search_index = _similarity_index()
+    if search_index.sync(scenario_index):
+        try:
+            search_index.save(DEFAULT_INDEX_FILE)
+        except OSError:
+            pass  # read-only deployment: keep the in-memory index
+    return search_index
+
+def get_similar_scenario(scenario_index, category, competency=None):
+    """
+    Get the unseen scenario in this category most similar to the current one,
+    or, with a competency, the one whose example responses practice it best.
+    Falls back to a random draw when nothing unseen matches.
+    """
+    search_index = get_similarity_index(scenario_index)
+    seen = st.session_state.setdefault('seen_scenarios', set())
+    current = st.session_state.get('current_scenario')
+    if competency:
+        results = search_index.for_competency(competency, k=1, category=category, exclude=seen)
+    elif current is not None:
+        results = search_index.similar_to(scenario_key(category, current), k=1, category=category, exclude=seen)
+    else:
+        results = []
+    return results[0][2] if results else get_random_scenario(scenario_index, category)
 
-    # Otherwise select from all scenarios (or 30% of the time even if custom exist)
-    return df.sample(n=1).iloc[0]
+def _openai_api_key():
+    """OpenAI API key from secrets (local development) or the environment (Render/production)."""
+    try:
+        if "OPENAI_API_KEY" in st.secrets:
+            return st.secrets["OPENAI_API_KEY"]
+    except FileNotFoundError:
+        pass
+    return os.environ.get("OPENAI_API_KEY")
 
 def get_ai_client(llm_provider):
-    """Get the appropriate AI client based on provider selection."""
+    """Get the shared AI client for the provider selection (reused across reruns)."""
     if llm_provider == "Ollama (Free, Local)":
-        # Ollama uses OpenAI-compatible API
-        return OpenAI(
-            base_url="http://localhost:11434/v1",
-            api_key="ollama"  # Ollama doesn't need a real API key
-        )
+        # Ollama uses OpenAI-compatible API; the client is shared process-wide
+        return get_client(PROVIDER_OLLAMA)
     else:
         # OpenAI - Check both secrets and environment variables
-        import os
-        api_key = None
-
-        # Try secrets first (local development)
-        if "OPENAI_API_KEY" in st.secrets:
-            api_key = st.secrets["OPENAI_API_KEY"]
-        # Fallback to environment variable (for Render/production)
-        elif "OPENAI_API_KEY" in os.environ:
-            api_key = os.environ["OPENAI_API_KEY"]
+        api_key = _openai_api_key()
 
         if not api_key:
             st.error("⚠️ OpenAI API key not found. Please add it to .streamlit/secrets.toml or set OPENAI_API_KEY environment variable.")
             return None
 
-        return OpenAI(api_key=api_key)
+        return get_client(PROVIDER_OPENAI, api_key=api_key)
+
+def wait_for_model_load(model_name):
+    """Let a running Ollama warm-up finish first, so load time is reported apart from inference."""
+    warmer = get_model_warmer()
+    if not warmer.is_warming(model_name):
+        return
+    with st.spinner(f"🔥 Loading {model_name} into memory..."):
+        load_seconds = warmer.wait(model_name)
+    if load_seconds:
+        st.caption(f"🔥 Loaded {model_name} in {load_seconds:.1f}s (not included in the timing below)")
+
+def hedged_client(backends, session_id, priority, on_wait=None):
+    """Scheduled client for the primary backend, hedged with the backup if one is selected."""
+    if len(backends) == 1:
+        return scheduled(backends[0].client, session_id, priority, on_wait)
+    # Attempts run on their own threads; HedgedClient hands on_wait updates back to this one
+    return HedgedClient([backend._replace(client=scheduled(backend.client, session_id, priority))
+                         for backend in backends], on_wait=on_wait)
+
+def interactive_client(backends, session_id):
+    """Client for a request the user is waiting on, showing its place in the queue until it starts."""
+    queue_status = st.empty()
+
+    def on_wait(position, expected_wait):
+        if position or expected_wait:
+            queue_status.info(format_queue_status(position, expected_wait))
+        else:
+            queue_status.empty()
+
+    return hedged_client(backends, session_id, INTERACTIVE, on_wait)
+
+def show_backup_notice(client, backends):
+    """Say so when the backup answered because the primary was slow or failed."""
+    answered_by = getattr(client, 'answered_by', None)
+    if answered_by and answered_by != backends[0].name:
+        st.caption(f"🛟 Answered by the backup ({answered_by}): {backends[0].name} was slow or unavailable")
+
+BACKUP_OLLAMA_MODEL = "llama3.2:3b"
+BACKUP_OPENAI_MODEL = "gpt-4o-mini"
 
 # --- Setup ---
 st.set_page_config(page_title="Coaching Practice Simulator", page_icon="💬")
@@ -110,15 +224,50 @@ with st.sidebar:
         }
         model_name = model_mapping.get(model_name, "llama3.2:3b")
         st.info("💡 **Using Ollama (Free)**\n\nMake sure Ollama is running:\n```\nollama serve\n```")
+
+        # Preload the selected model in the background and keep it resident
+        keep_alive = st.selectbox(
+            "🔥 Keep model loaded for:", KEEP_ALIVE_OPTIONS,
+            index=KEEP_ALIVE_OPTIONS.index(DEFAULT_KEEP_ALIVE),
+            format_func=lambda value: "Until Ollama stops" if value == "-1" else value,
+            help="Ollama unloads idle models; reloading one adds seconds to the next response"
+        )
+        get_model_warmer().warm(model_name, keep_alive)
+        st.caption(format_warm_status(model_name, get_model_warmer().status(model_name)))
     else:
         model_name = "gpt-4o-mini"
+        keep_alive = None
         st.info("💳 **Using OpenAI (Paid)**\n\nRequires API key in `.streamlit/secrets.toml`")
 
+    # Backup backend: used at once if the primary fails (e.g. out of quota), and
+    # raced against the primary when it is slower than usual (see llm_failover)
+    backup_options = {"None": None}
+    if llm_provider == "OpenAI (Paid)" or model_name != BACKUP_OLLAMA_MODEL:
+        backup_options[f"Ollama {BACKUP_OLLAMA_MODEL} (local)"] = (PROVIDER_OLLAMA, BACKUP_OLLAMA_MODEL)
+    if llm_provider == "Ollama (Free, Local)" and _openai_api_key():
+        backup_options[f"OpenAI {BACKUP_OPENAI_MODEL} (paid)"] = (PROVIDER_OPENAI, BACKUP_OPENAI_MODEL)
+    backup_label = st.selectbox(
+        "🛟 Backup for slow or failed requests:", list(backup_options),
+        help="Requests go to the backup when the primary fails, or when it takes longer than "
+             "its recent p90 response time (whichever answers first is used)"
+    )
+    backup = backup_options[backup_label]
+    if backup and backup[0] == PROVIDER_OLLAMA:
+        # A cold backup would lose every race; keep it loaded too
+        get_model_warmer().warm(backup[1], keep_alive or DEFAULT_KEEP_ALIVE)
+
+    use_response_cache = st.checkbox(
+        "⚡ Reuse cached AI responses", value=True,
+        help="Identical requests (same model, prompt and response) are answered instantly from a local cache"
+    )
+    llm_cache_stats = get_response_cache().get_stats()
+    st.caption(f"Cache hit rate: {llm_cache_stats['hit_rate']:.0%} ({llm_cache_stats['entries']} saved responses)")
+
     st.markdown("---")
 
     # Library Manager in sidebar
     st.header("📚 Scenario Library")
-    manager = ScenarioManager()
+    manager = get_shared_manager()
     stats = manager.get_stats()
 
     if stats['total'] > 0:
@@ -133,6 +282,9 @@ with st.sidebar:
             for category, count in sorted(stats['by_category'].items()):
                 st.write(f"- {category}: {count}")
 
+            cache_stats = get_scenario_cache_stats()
+            st.caption(f"🗄️ Scenario cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+
         if st.button("🔧 Manage Library"):
             st.session_state.show_library_manager = True
     else:
@@ -143,6 +295,18 @@ client = get_ai_client(llm_provider)
 if client is None:
     st.stop()
 
+backends = [Backend(model_name, client, model_name)]
+if backup:
+    backup_provider, backup_model = backup
+    if backup_provider == PROVIDER_OLLAMA:
+        backends.append(Backend(backup_model, get_client(PROVIDER_OLLAMA), backup_model))
+    else:
+        backends.append(Backend(backup_model, get_client(PROVIDER_OPENAI, api_key=_openai_api_key()), backup_model))
+
+# All model calls queue fairly with other sessions' calls (see llm_scheduler)
+session_id = st.session_state.setdefault('llm_session_id', uuid.uuid4().hex)
+bulk_client = hedged_client(backends, session_id, BULK)
+
 # --- Practice Mode Selection ---
 practice_mode = st.radio(
     "🎯 Select Practice Mode:",
@@ -226,7 +390,7 @@ Client: I work late every night and feel guilty about missing time with my famil
         st.info("📋 Skipping full analysis - extracting scenarios directly...")
 
         # Display extraction interface immediately
-        display_extraction_interface(transcript_content, client, model_name)
+        display_extraction_interface(transcript_content, bulk_client, model_name)
 
         # Back button
         if st.button("← Back to Upload"):
@@ -239,111 +403,92 @@ Client: I work late every night and feel guilty about missing time with my famil
             st.warning("⚠️ Please upload a file or paste transcript text first.")
         else:
             with st.spinner("🔄 Analyzing your coaching session with ICF ACC-level criteria..."):
-                # Parse transcript to count turns
-                lines = [line.strip() for line in transcript_content.split('\n') if line.strip()]
-                coach_turns = [line for line in lines if line.lower().startswith('coach:')]
-                client_turns = [line for line in lines if line.lower().startswith('client:')]
-
-                st.info(f"📊 Session overview: {len(coach_turns)} coach responses, {len(client_turns)} client statements")
-
-                # Create comprehensive analysis prompt
-                prompt = f"""
-You are an ICF ACC-level mentor coach evaluating a complete coaching session transcript.
-
-**TRANSCRIPT:**
-{transcript_content}
-
-**EVALUATION FRAMEWORK:**
-Please provide a comprehensive analysis structured as follows:
-
-**1. ACC-Level Competencies Demonstrated:**
-Identify which ICF ACC competencies were demonstrated in this session:
-- Establishes and Maintains Agreements
-- Cultivates Trust and Safety
-- Maintains Presence
-- Listens Actively
-- Evokes Awareness
-- Facilitates Client Growth
-- Embodies a Coaching Mindset
-
-For each competency demonstrated, provide specific examples from the transcript.
-
-**2. Missed Opportunities to Evoke Awareness:**
-Identify 3-5 specific moments where the coach could have asked a more powerful question or made an observation that would have deepened the client's awareness. For each:
-- Quote the coach's actual statement
-- Explain what opportunity was missed
-- Provide an example of what could have been said instead
-
-**3. Questions Analysis:**
-Evaluate the quality of questions asked:
-- How many were open vs. closed questions?
-- Were questions powerful and evocative, or leading/directive?
-- Did questions help the client explore deeply or stay surface-level?
-- Provide 2-3 examples of strong questions and 2-3 that could be improved
-
-**4. Tone and Attunement:**
-Assess how well the coach attuned to the client:
-- Did the coach match the client's energy and pace?
-- Were there moments of deep empathy and understanding?
-- Did the coach seem present and fully engaged?
-- Any moments where attunement could have been stronger?
-
-**5. Acknowledgment:**
-Evaluate how the coach acknowledged the client:
-- Were there genuine moments of acknowledgment (not just praise)?
-- Did acknowledgments recognize the client's strengths, growth, or insights?
-- Provide examples of effective acknowledgments or missed opportunities
-
-**6. Observations:**
-Assess the coach's use of observations:
-- Did the coach share observations about what they noticed?
-- Were observations offered tentatively as gifts, not judgments?
-- Examples of strong observations or missed opportunities to share observations
-
-**7. Clean Language:**
-Evaluate the coach's use of the client's own language:
-- Did the coach use the client's words and metaphors, or impose their own?
-- Were there moments of interpretation or assumption?
-- Examples of good clean language usage and areas for improvement
-
-**8. Overall Strengths:**
-Summarize the top 3 strengths demonstrated in this session.
-
-**9. Priority Development Areas:**
-Identify the top 3 areas for focused development to progress toward PCC level.
-
-**10. Action Steps:**
-Provide 3 specific, actionable practices the coach can implement in their next session.
-
-Keep tone encouraging, specific, and developmental. Use examples from the actual transcript to illustrate points.
-"""
-
-                # Call AI API
-                response = client.chat.completions.create(
-                    model=model_name,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.7
-                )
-
-                ai_feedback = response.choices[0].message.content
+                # Parse transcript into turns
+                turns = list(iter_turns(transcript_content))
+                coach_turns = [turn['text'] for turn in turns if turn['speaker'] == 'coach']
+
+                st.info(f"📊 Session overview: {len(coach_turns)} coach responses, {len(turns) - len(coach_turns)} client statements")
+
+                # Instant rule-based check over every coach turn, shown while the AI analysis streams
+                turns_with = {}
+                for scores in get_matcher().score_many(coach_turns):
+                    for competency in scores:
+                        turns_with[competency] = turns_with.get(competency, 0) + 1
+                if turns_with:
+                    st.caption("⚡ Instant check (coach turns with matching phrasing): " + " · ".join(
+                        f"{competency} {count}/{len(coach_turns)}" for competency, count in turns_with.items()
+                    ))
 
                 st.markdown("---")
                 st.markdown("## 📋 Comprehensive Coaching Session Analysis")
-                st.markdown(ai_feedback)
+
+                # Reuse this session's analysis of the same transcript by the same
+                # model, so widget interactions below don't re-run inference. Only a
+                # new transcript, a different model/backup or the explicit re-run
+                # button calls the AI again.
+                transcript_hash = hashlib.sha256(transcript_content.encode('utf-8')).hexdigest()
+                analysis_key = (transcript_hash, model_name, backup)
+                saved_analyses = st.session_state.setdefault('transcript_analyses', {})
+                rerun_requested = st.session_state.pop('rerun_analysis', False)
+
+                if analysis_key in saved_analyses and not rerun_requested:
+                    ai_feedback, stream_stats = saved_analyses[analysis_key]
+                    st.markdown(ai_feedback)
+                else:
+                    # Long transcripts are analyzed in parallel excerpts first (see
+                    # transcript_analysis), then the report streams as usual
+                    use_cache = use_response_cache and not rerun_requested
+                    if keep_alive:
+                        wait_for_model_load(model_name)
+                    if needs_chunking(transcript_content, model_name):
+                        progress = st.progress(0.0, text="📑 Transcript is longer than the model's context: analyzing it in parts...")
+                        prompt = prepare_analysis_prompt(
+                            transcript_content, hedged_client(backends, session_id, INTERACTIVE), model_name,
+                            use_cache=use_cache,
+                            progress=lambda done, total: progress.progress(
+                                done / total, text=f"📑 Analyzed part {done} of {total}")
+                        )
+                        progress.empty()
+                    else:
+                        prompt = build_analysis_prompt(transcript_content)
+
+                    # Call AI API, rendering tokens as they arrive
+                    stream_stats = {}
+                    report_client = interactive_client(backends, session_id)
+                    ai_feedback = st.write_stream(
+                        stream_chat_completion(report_client, model_name, prompt,
+                                               temperature=0.7, stats=stream_stats,
+                                               use_cache=use_cache, prompt_version=FEEDBACK_PROMPT_VERSION)
+                    )
+                    show_backup_notice(report_client, backends)
+                    if keep_alive and not stream_stats.get('cached'):
+                        get_model_warmer().warm(model_name, keep_alive, force=True)
+                    saved_analyses.pop(analysis_key, None)
+                    saved_analyses[analysis_key] = (ai_feedback, stream_stats)
+                    # Keep only the most recent few analyses per session
+                    while len(saved_analyses) > 5:
+                        saved_analyses.pop(next(iter(saved_analyses)))
+                st.caption(format_stream_stats(stream_stats))
 
                 # Add download button for feedback
                 st.markdown("---")
-                st.download_button(
-                    label="💾 Download Analysis",
-                    data=ai_feedback,
-                    file_name="coaching_transcript_analysis.txt",
-                    mime="text/plain"
-                )
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.download_button(
+                        label="💾 Download Analysis",
+                        data=ai_feedback,
+                        file_name="coaching_transcript_analysis.txt",
+                        mime="text/plain"
+                    )
+                with col2:
+                    if st.button("🔄 Re-run Analysis", help="Ask the AI for a fresh analysis of this transcript"):
+                        st.session_state.rerun_analysis = True
+                        st.rerun()
 
                 st.success("✨ Analysis complete! Review the feedback above and consider the action steps for your next session.")
 
                 # Add scenario extraction interface
-                display_extraction_interface(transcript_content, client, model_name)
+                display_extraction_interface(transcript_content, bulk_client, model_name)
 
                 # Back button
                 st.markdown("---")
@@ -357,32 +502,29 @@ Keep tone encouraging, specific, and developmental. Use examples from the actual
 # --- Dynamic Scenario (only for General and Bottom-Lining modes) ---
 if practice_mode != "Transcript Analysis":
     file_path = "Coach_Training_Scenarios_ICF_PCC.xlsx"
-    # Pass custom scenario count to invalidate cache when scenarios change
-    custom_count = ScenarioManager().get_stats()['total']
-    data = load_data(file_path, _custom_scenario_count=custom_count)
+    scenario_index = load_data(file_path)
 
     if 'scenario_counter' not in st.session_state:
         st.session_state.scenario_counter = 0
 
-    if data is None:
+    if scenario_index is None:
         st.warning("⚠️ Please ensure 'Coach_Training_Scenarios_ICF_PCC.xlsx' is in the same directory as app.py")
         st.info("The Excel file should contain sheets for: Career, Leadership, Relationship, Self Improvement, and Value System")
     else:
-        categories = list(data.keys())
+        categories = scenario_index.categories
 
         st.markdown("---")
 
         category = st.selectbox("📂 Select a Category", categories)
 
         # Debug info: Show scenario counts
-        if category in data:
-            total = len(data[category])
-            custom = len(data[category][data[category]['Source'] == 'Real Transcript']) if 'Source' in data[category].columns else 0
+        if category in scenario_index.categories:
+            total, custom = scenario_index.counts(category)
             st.caption(f"📊 {total} total scenarios ({custom} custom, {total-custom} from library)")
 
         if 'current_scenario' not in st.session_state or st.session_state.get('current_category') != category:
             st.session_state.current_category = category
-            st.session_state.current_scenario = get_random_scenario(data[category])
+            st.session_state.current_scenario = get_random_scenario(scenario_index, category)
             st.session_state.show_examples = False
             st.session_state.scenario_counter += 1
 
@@ -390,6 +532,7 @@ if practice_mode != "Transcript Analysis":
 
         if st.session_state.current_scenario is not None:
             scenario = st.session_state.current_scenario
+            st.session_state.setdefault('seen_scenarios', set()).add(scenario_key(category, scenario))
 
             st.subheader("🧭 Client Scenario")
 
@@ -403,13 +546,25 @@ if practice_mode != "Transcript Analysis":
                 st.info(f"**Scenario ID:** {scenario['ID']}")
             with col2:
                 if st.button("🔄 New Scenario"):
-                    st.session_state.current_scenario = get_random_scenario(data[category])
+                    st.session_state.current_scenario = get_random_scenario(scenario_index, category)
                     st.session_state.show_examples = False
                     st.rerun()
 
             st.markdown(f"**Client says:**")
             st.write(f"_{scenario['Client Question / Scenario']}_")
 
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                focus = st.selectbox("🎯 Competency to practice", ["Any"] + ICF_COMPETENCIES,
+                                     help="Pick a competency to get scenarios whose example responses practice it")
+            with col2:
+                if st.button("🧭 Similar Scenario", help="Next unseen scenario most like this one (or matching the competency)"):
+                    st.session_state.current_scenario = get_similar_scenario(
+                        scenario_index, category, None if focus == "Any" else focus
+                    )
+                    st.session_state.show_examples = False
+                    st.rerun()
+
 # --- User Input (for General and Bottom-Lining modes only) ---
 if practice_mode != "Transcript Analysis":
     if practice_mode == "Bottom-Lining Practice":
@@ -438,73 +593,35 @@ if practice_mode != "Transcript Analysis":
             st.warning("Please enter your coaching response first.")
         else:
             with st.spinner("Analyzing your response with ICF criteria..."):
-                if practice_mode == "Bottom-Lining Practice":
-                    prompt = f"""
-You are an ICF PCC-level mentor coach evaluating a trainee coach's BOTTOM-LINING skill.
-
-Client says: "{scenario['Client Question / Scenario']}"
-Coach's bottom-line statement: "{coach_input}"
-
-Bottom-lining is the skill of distilling a client's complex or lengthy narrative into its essence in 1-2 concise sentences.
-
-Please evaluate specifically for bottom-lining effectiveness:
-
-**Bottom-Lining Assessment:**
-- Did the coach capture the CORE issue/theme? (not just repeat details)
-- Was it concise (1-2 sentences, ideally 20-40 words)?
-- Did it stay client-centered (their words/perspective, not coach's interpretation)?
-- Did it avoid adding advice or questions?
-
-**What Worked:**
-- [Specific strengths in this bottom-line attempt]
-
-**Opportunities for Growth:**
-- [Specific suggestions to improve the bottom-lining]
-
-**Example ACC-Level Bottom-Line:**
-Provide one bottom-line statement at ACC level (captures main point, somewhat wordy).
-
-**Example PCC-Level Bottom-Line:**
-Provide one bottom-line statement at PCC level (captures essence elegantly, client-centered, concise).
-
-Keep tone encouraging and developmental.
-"""
-                else:
-                    prompt = f"""
-You are an ICF PCC-level mentor coach evaluating a trainee coach's response.
-Client says: "{scenario['Client Question / Scenario']}"
-Coach says: "{coach_input}"
-
-Please evaluate the coach's response using the ICF PCC markers. Provide feedback in this format:
-
-**Competencies Demonstrated:**
-- [List them]
-
-**Opportunities for Growth:**
-- [List them]
-
-**Observations:**
-- [3 bullet points summarizing strengths and areas to refine]
-
-**Example ACC-Level Response:**
-Provide one improved response that demonstrates a ACC-level question or reflection.
-
-**Example PCC-Level Response:**
-Provide one improved response that demonstrates a PCC-level question or reflection.
-
-Keep tone encouraging, developmental, and aligned with ICF standards.
-"""
-
-                # --- Call the AI model ---
-                response = client.chat.completions.create(
-                    model=model_name,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.7
+                prompt = build_feedback_prompt(
+                    scenario['Client Question / Scenario'], coach_input,
+                    BOTTOM_LINING_MODE if practice_mode == "Bottom-Lining Practice" else GENERAL_MODE
                 )
 
-                ai_feedback = response.choices[0].message.content
+                # --- Instant rule-based check, shown while the AI feedback streams ---
+                if practice_mode != "Bottom-Lining Practice":
+                    instant_scores = get_matcher().score(coach_input)
+                    if instant_scores:
+                        st.info(f"⚡ **Instant check:** {format_competency_summary(instant_scores)}")
+                    else:
+                        st.info("⚡ **Instant check:** no ICF-aligned phrasing detected - see the AI feedback below.")
+
+                # --- Call the AI model, rendering tokens as they arrive ---
                 st.markdown("### 📊 AI Feedback")
-                st.markdown(ai_feedback)
+                if keep_alive:
+                    wait_for_model_load(model_name)
+                stream_stats = {}
+                feedback_client = interactive_client(backends, session_id)
+                st.write_stream(
+                    stream_chat_completion(feedback_client, model_name, prompt,
+                                           temperature=0.7, stats=stream_stats,
+                                           use_cache=use_response_cache, prompt_version=FEEDBACK_PROMPT_VERSION)
+                )
+                st.caption(format_stream_stats(stream_stats))
+                show_backup_notice(feedback_client, backends)
+                if keep_alive and not stream_stats.get('cached'):
+                    # The request reset keep_alive to Ollama's default; restore the chosen one
+                    get_model_warmer().warm(model_name, keep_alive, force=True)
 
                 if practice_mode == "Bottom-Lining Practice":
                     st.success("💡 Reflect: Did you capture the essence? Could you make it more concise?")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Benchmark the compiled competency matcher against the old substring loop.
+
+Scores every coach turn of the bundled sample transcript, repeated to
+simulate longer sessions, once per turn with the old
+any(k in text for k in kws) loop and in one score_many call.
+
+Usage:
+    python bench_competency_matcher.py
+    python bench_competency_matcher.py --repeats 1 10 100 --runs 5
+"""
+
+import argparse
+import time
+
+from competency_matcher import COMPETENCY_MAP, get_matcher
+from transcript_parser import iter_turns
+
+TRANSCRIPT = "transcripts/coaching_transcript_cleaned.txt"
+
+
+def substring_loop(turns):
+    """The previous evaluate_icf_feedback matching, applied per turn."""
+    results = []
+    for text in turns:
+        lower = text.lower()
+        results.append([c for c, kws in COMPETENCY_MAP.items() if any(k in lower for k in kws)])
+    return results
+
+
+def best_of(func, arg, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, nargs="+", default=[1, 10, 100],
+                        help="Copies of the sample transcript's coach turns")
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs per method (best is reported)")
+    args = parser.parse_args()
+
+    with open(TRANSCRIPT) as f:
+        coach_turns = [t['text'] for t in iter_turns(f.read()) if t['speaker'] == 'coach']
+    matcher = get_matcher()
+
+    print(f"{'coach turns':>11} {'substring ms':>13} {'score_many ms':>14} {'per turn us':>12}")
+    for repeat in args.repeats:
+        turns = coach_turns * repeat
+        loop_ms = best_of(substring_loop, turns, args.runs)
+        batch_ms = best_of(matcher.score_many, turns, args.runs)
+        print(f"{len(turns):>11} {loop_ms:>13.2f} {batch_ms:>14.2f} {batch_ms * 1000 / len(turns):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Benchmark per-request client overhead: new OpenAI() per request vs. the shared client.
+
+Starts a local OpenAI-compatible stub server that answers instantly (so the
+timings are pure client and connection overhead), then sends the same
+chat completions with a freshly constructed client per request (the old
+get_ai_client behaviour on every rerun) and with the pooled client from
+llm_client.get_client. Pass --base-url to measure against a running server
+instead, e.g. Ollama.
+
+Usage:
+    python bench_llm_client.py
+    python bench_llm_client.py --requests 500
+    python bench_llm_client.py --base-url http://localhost:11434/v1 --model llama3.2:3b
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+from llm_client import PROVIDER_OLLAMA, get_client
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Minimal /chat/completions endpoint with HTTP/1.1 keep-alive."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+    connections = set()
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        StubHandler.connections.add(self.client_address)
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        body = json.dumps({
+            "id": "stub", "object": "chat.completion", "created": 0, "model": request.get('model', ''),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def time_requests(make_client, model, count):
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        make_client().chat.completions.create(model=model, messages=[{"role": "user", "content": "Hi"}],
+                                              max_tokens=1)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per method")
+    parser.add_argument("--base-url", help="Measure against this server instead of the built-in stub")
+    parser.add_argument("--model", default="llama3.2:3b")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server, base_url = start_stub_server()
+
+    methods = [
+        ("new OpenAI() per request", lambda: openai.OpenAI(base_url=base_url, api_key="ollama")),
+        ("shared get_client()", lambda: get_client(PROVIDER_OLLAMA, base_url=base_url)),
+    ]
+    print(f"{'method':<26} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'connections':>12}")
+    for name, make_client in methods:
+        time_requests(make_client, args.model, 3)  # warm up imports and the shared pool
+        StubHandler.connections.clear()
+        timings = time_requests(make_client, args.model, args.requests)
+        connections = str(len(StubHandler.connections)) if server else "-"
+        print(f"{name:<26} {statistics.median(timings):>8.2f} "
+              f"{statistics.quantiles(timings, n=20)[18]:>8.2f} {statistics.mean(timings):>8.2f} {connections:>12}")
+
+    if server:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
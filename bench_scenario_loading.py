@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Benchmark scenario workbook loading against workbook size.
+
+Compares the old per-sheet loader (one pd.read_excel call per category, each
+re-opening the .xlsx) with the single-pass read_scenario_workbook, and both
+with a cold start from the compiled scenario_bank.pkl artifact (including
+the source hash check).
+
+Usage:
+    python bench_scenario_loading.py
+    python bench_scenario_loading.py --sizes 1000 10000 20000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+from scenario_loader import build_scenario_artifact, load_compiled_scenario_bank, read_scenario_workbook
+
+CATEGORIES = ["Career", "Leadership", "Relationship", "Self Improvement", "Value System"]
+
+
+def write_synthetic_workbook(path, rows_per_sheet):
+    """Write a workbook with the same columns as the real scenario bank."""
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        for category in CATEGORIES:
+            prefix = category[:3].upper()
+            pd.DataFrame({
+                'ID': [f"{prefix}-{i:05d}" for i in range(rows_per_sheet)],
+                'Client Question / Scenario': [
+                    f"I keep going back and forth about {category.lower()} decision number {i} and I don't know what matters most."
+                    for i in range(rows_per_sheet)
+                ],
+                'Coach Response 1': ["What feels most important to you right now?"] * rows_per_sheet,
+                'Coach Response 2': ["What would you notice if this were resolved?"] * rows_per_sheet,
+                'Coach Response 3': ["What are you learning about yourself here?"] * rows_per_sheet,
+            }).to_excel(writer, sheet_name=category, index=False)
+
+
+def load_per_sheet(path):
+    """The previous loader: open the workbook once per sheet."""
+    excel_file = pd.ExcelFile(path)
+    return {name: pd.read_excel(path, sheet_name=name) for name in excel_file.sheet_names}
+
+
+def best_of(func, path, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(path)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="Scenarios per sheet for each synthetic workbook")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per loader (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'rows/sheet':>10} {'size MB':>8} {'per-sheet s':>12} {'single-pass s':>14} {'compiled s':>11} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.sizes:
+            path = os.path.join(tmp, f"scenarios_{rows}.xlsx")
+            artifact = os.path.join(tmp, f"scenarios_{rows}.pkl")
+            write_synthetic_workbook(path, rows)
+            build_scenario_artifact(path, artifact)
+            size_mb = os.path.getsize(path) / 1e6
+
+            per_sheet = best_of(load_per_sheet, path, args.repeat)
+            single_pass = best_of(read_scenario_workbook, path, args.repeat)
+            compiled = best_of(lambda p: load_compiled_scenario_bank(p, artifact), path, args.repeat)
+            print(f"{rows:>10} {size_mb:>8.2f} {per_sheet:>12.3f} {single_pass:>14.3f} {compiled:>11.4f} "
+                  f"{per_sheet / compiled:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
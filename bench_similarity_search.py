@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Benchmark similar-scenario search against scenario bank size.
+
+Builds synthetic scenario banks whose statements are sampled from the word
+frequencies of the bundled transcripts and workbook, then times: the initial
+build, an incremental update of 100 scenarios, save/load of the on-disk
+index, and k-NN query latency (similar scenario and competency focus).
+
+Usage:
+    python bench_similarity_search.py
+    python bench_similarity_search.py --sizes 1000 100000 --queries 500
+"""
+
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+from scenario_loader import read_scenario_workbook
+from scenario_search import ICF_COMPETENCIES, SimilarityIndex, TEXT_COLUMN
+
+CATEGORIES = ["Career", "Leadership", "Relationship", "Self Improvement", "Value System"]
+TRANSCRIPTS = ["transcripts/coaching_transcript_cleaned.txt", "transcripts/sample_coaching_transcript.txt"]
+
+
+def word_distribution():
+    """Words and their frequencies from the bundled transcripts and workbook."""
+    counts = Counter()
+    for path in TRANSCRIPTS:
+        with open(path) as f:
+            counts.update(re.findall(r"[a-z']+", f.read().lower()))
+    for df in read_scenario_workbook("Coach_Training_Scenarios_ICF_PCC.xlsx").values():
+        for text in df[TEXT_COLUMN].dropna():
+            counts.update(re.findall(r"[a-z']+", text.lower()))
+    words = list(counts)
+    return words, [counts[w] for w in words]
+
+
+def synthetic_scenarios(count, words, weights, rng, start=0):
+    items = []
+    for i in range(start, start + count):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        competency = rng.choice(ICF_COMPETENCIES)
+        items.append(((category, str(i)), {
+            'ID': i,
+            TEXT_COLUMN: " ".join(rng.choices(words, weights, k=rng.randint(8, 40))),
+            'Coach Response 1': f"What would you like to explore? (Competency 7: {competency})",
+        }))
+    return items
+
+
+def percentiles(func, args, repeat):
+    timings = []
+    for arg in args[:repeat]:
+        start = time.perf_counter()
+        func(arg)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Scenario bank sizes to benchmark")
+    parser.add_argument("--queries", type=int, default=200, help="Timed queries per size")
+    args = parser.parse_args()
+
+    words, weights = word_distribution()
+    print(f"{'scenarios':>10} {'build s':>8} {'+100 ms':>8} {'save ms':>8} {'load ms':>8} "
+          f"{'similar p50/p95 ms':>19} {'competency p50/p95 ms':>22}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            rng = random.Random(size)
+            items = synthetic_scenarios(size, words, weights, rng)
+
+            start = time.perf_counter()
+            index = SimilarityIndex()
+            index.add_many(items)
+            index.similar_to(items[0][0])  # first query compiles the postings
+            build = time.perf_counter() - start
+
+            start = time.perf_counter()
+            index.add_many(synthetic_scenarios(100, words, weights, rng, start=size))
+            index.similar_to(items[0][0])
+            update_ms = (time.perf_counter() - start) * 1000
+
+            path = os.path.join(tmp, f"vectors_{size}.pkl")
+            start = time.perf_counter()
+            index.save(path)
+            save_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            SimilarityIndex.load(path)
+            load_ms = (time.perf_counter() - start) * 1000
+
+            keys = [key for key, _ in rng.sample(items, min(args.queries, size))]
+            sim50, sim95 = percentiles(lambda key: index.similar_to(key, k=5, category=key[0]), keys, args.queries)
+            focus = [rng.choice(ICF_COMPETENCIES) for _ in range(args.queries)]
+            comp50, comp95 = percentiles(lambda c: index.for_competency(c, k=5), focus, args.queries)
+            print(f"{size:>10} {build:>8.2f} {update_ms:>8.1f} {save_ms:>8.1f} {load_ms:>8.1f} "
+                  f"{sim50:>9.2f} / {sim95:<7.2f} {comp50:>11.2f} / {comp95:<8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Benchmark full transcript analysis latency against transcript length.
+
+Repeats the bundled sample transcript to simulate longer sessions and times
+the chunked map-reduce analysis end to end (excerpt notes, any merge rounds
+and the final report) against a running Ollama or other OpenAI-compatible
+server. The response cache is bypassed.
+
+Usage:
+    python bench_transcript_analysis.py
+    python bench_transcript_analysis.py --model llama3.1:8b --repeats 1 2 4 8 --concurrency 4
+"""
+
+import argparse
+import time
+
+from llm_client import OLLAMA_BASE_URL, PROVIDER_OLLAMA, create_chat_completion, estimate_tokens, get_client
+from transcript_analysis import chunk_transcript, needs_chunking, prepare_analysis_prompt
+
+TRANSCRIPT = "transcripts/sample_coaching_transcript.txt"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default=OLLAMA_BASE_URL)
+    parser.add_argument("--model", default="llama3.2:3b")
+    parser.add_argument("--repeats", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="Copies of the sample transcript per run")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Excerpt requests in flight (match OLLAMA_NUM_PARALLEL)")
+    args = parser.parse_args()
+
+    client = get_client(PROVIDER_OLLAMA, base_url=args.base_url)
+    with open(TRANSCRIPT) as f:
+        transcript = f.read()
+
+    print(f"{'copies':>6} {'tokens':>7} {'parts':>6} {'map+merge s':>12} {'report s':>9} {'total s':>8}")
+    for repeat in args.repeats:
+        text = transcript * repeat
+        parts = len(chunk_transcript(text, args.model)) if needs_chunking(text, args.model) else 1
+        start = time.perf_counter()
+        prompt = prepare_analysis_prompt(text, client, args.model, max_concurrency=args.concurrency,
+                                         use_cache=False)
+        prepared = time.perf_counter()
+        create_chat_completion(client, args.model, prompt, use_cache=False)
+        end = time.perf_counter()
+        print(f"{repeat:>6} {estimate_tokens(text):>7} {parts:>6} {prepared - start:>12.1f} "
+              f"{end - prepared:>9.1f} {end - start:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Benchmark transcript parsing from 1k to 1M lines.
+
+Times the single-pass iter_turns parser (via extract_client_statements and
+count_turns) against the previous extractor loop plus the separate
+lowercase/split pass the Full Analysis overview used to make.
+
+Usage:
+    python bench_transcript_parser.py
+    python bench_transcript_parser.py --sizes 1000 100000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from scenario_manager import ScenarioManager
+from transcript_parser import count_turns
+
+
+def make_transcript(n_lines, seed=0):
+    """Monologue-heavy synthetic transcript with WEBVTT-style noise lines."""
+    rng = random.Random(seed)
+    lines = []
+    while len(lines) < n_lines:
+        lines.append("Coach: What feels most important about that for you right now?")
+        for _ in range(rng.randint(1, 12)):
+            if rng.random() < 0.3:
+                lines.append("00:00:02.740 --> 00:00:06.029")
+            lines.append("Client: I keep going back and forth about whether to stay in this role or finally make the move.")
+        lines.append("")
+    return "\n".join(lines[:n_lines])
+
+
+def legacy_extract(transcript):
+    """The previous extract_client_statements loop, with its backward context scan."""
+    statements = []
+    lines = transcript.split('\n')
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        if line.lower().startswith('client:'):
+            context = ""
+            for j in range(i - 1, -1, -1):
+                if lines[j].strip().lower().startswith('coach:'):
+                    context = lines[j].strip()[6:].strip()
+                    break
+            combined_statement = line[7:].strip()
+            start_line = i + 1
+            i += 1
+            while i < len(lines):
+                next_line = lines[i].strip()
+                if next_line.lower().startswith('client:'):
+                    combined_statement += " " + next_line[7:].strip()
+                    i += 1
+                elif next_line.lower().startswith('coach:'):
+                    break
+                else:
+                    i += 1
+            combined_statement = combined_statement.strip()
+            if len(combined_statement) > 30:
+                statements.append({'statement': combined_statement, 'context': context,
+                                   'line_number': start_line, 'length': len(combined_statement)})
+        else:
+            i += 1
+    return statements
+
+
+def legacy_overview(transcript):
+    lines = [line.strip() for line in transcript.split('\n') if line.strip()]
+    coach_turns = [line for line in lines if line.lower().startswith('coach:')]
+    client_turns = [line for line in lines if line.lower().startswith('client:')]
+    return len(coach_turns), len(client_turns)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000],
+                        help="Transcript lengths in lines")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    manager = ScenarioManager(storage_file=os.path.join(tmp.name, "library.db"), import_json=False)
+    print(f"{'lines':>9} {'extract legacy s':>17} {'extract new s':>14} "
+          f"{'overview legacy s':>18} {'overview new s':>15} {'new µs/line':>12}")
+    for n_lines in args.sizes:
+        transcript = make_transcript(n_lines)
+        extract_legacy = timed(legacy_extract, transcript)
+        extract_new = timed(manager.extract_client_statements, transcript)
+        overview_legacy = timed(legacy_overview, transcript)
+        overview_new = timed(count_turns, transcript)
+        print(f"{n_lines:>9} {extract_legacy:>17.3f} {extract_new:>14.3f} "
+              f"{overview_legacy:>18.3f} {overview_new:>15.3f} {extract_new / n_lines * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
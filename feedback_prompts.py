@@ -0,0 +1,84 @@
+"""
+Feedback Prompts - Prompt templates for coaching-response feedback
+
+Shared by the Streamlit app and the batch CLI (main.py), so both score
+responses with exactly the same prompts and share cached responses.
+"""
+
+# Bump when the feedback/analysis prompts change so cached responses are not reused
+FEEDBACK_PROMPT_VERSION = "1"
+
+GENERAL_MODE = "general"
+BOTTOM_LINING_MODE = "bottom-lining"
+FEEDBACK_MODES = (GENERAL_MODE, BOTTOM_LINING_MODE)
+
+
+def build_feedback_prompt(client_statement: str, coach_input: str, mode: str = GENERAL_MODE) -> str:
+    """
+    Build the feedback prompt for one coaching response.
+
+    Args:
+        client_statement: The scenario's client question / statement
+        coach_input: The trainee coach's response
+        mode: GENERAL_MODE or BOTTOM_LINING_MODE
+
+    Returns:
+        Prompt text
+    """
+    if mode == BOTTOM_LINING_MODE:
+        return f"""
+You are an ICF PCC-level mentor coach evaluating a trainee coach's BOTTOM-LINING skill.
+
+Client says: "{client_statement}"
+Coach's bottom-line statement: "{coach_input}"
+
+Bottom-lining is the skill of distilling a client's complex or lengthy narrative into its essence in 1-2 concise sentences.
+
+Please evaluate specifically for bottom-lining effectiveness:
+
+**Bottom-Lining Assessment:**
+- Did the coach capture the CORE issue/theme? (not just repeat details)
+- Was it concise (1-2 sentences, ideally 20-40 words)?
+- Did it stay client-centered (their words/perspective, not coach's interpretation)?
+- Did it avoid adding advice or questions?
+
+**What Worked:**
+- [Specific strengths in this bottom-line attempt]
+
+**Opportunities for Growth:**
+- [Specific suggestions to improve the bottom-lining]
+
+**Example ACC-Level Bottom-Line:**
+Provide one bottom-line statement at ACC level (captures main point, somewhat wordy).
+
+**Example PCC-Level Bottom-Line:**
+Provide one bottom-line statement at PCC level (captures essence elegantly, client-centered, concise).
+
+Keep tone encouraging and developmental.
+"""
+    if mode != GENERAL_MODE:
+        raise ValueError(f"Unknown feedback mode: {mode!r}")
+    return f"""
+You are an ICF PCC-level mentor coach evaluating a trainee coach's response.
+Client says: "{client_statement}"
+Coach says: "{coach_input}"
+
+Please evaluate the coach's response using the ICF PCC markers. Provide feedback in this format:
+
+**Competencies Demonstrated:**
+- [List them]
+
+**Opportunities for Growth:**
+- [List them]
+
+**Observations:**
+- [3 bullet points summarizing strengths and areas to refine]
+
+**Example ACC-Level Response:**
+Provide one improved response that demonstrates a ACC-level question or reflection.
+
+**Example PCC-Level Response:**
+Provide one improved response that demonstrates a PCC-level question or reflection.
+
+Keep tone encouraging, developmental, and aligned with ICF standards.
+"""
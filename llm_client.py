@@ -0,0 +1,351 @@
+"""
+LLM Client - Helpers for calling OpenAI-compatible chat models (OpenAI and Ollama)
+"""
+
+import random
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, Optional
+import openai
+from llm_cache import get_response_cache, make_cache_key
+from llm_rate_limit import DEFAULT_COMPLETION_TOKENS, MAX_RATE_LIMIT_WAIT, get_rate_limiter, retry_after_seconds
+
+DEFAULT_PROMPT_VERSION = "1"
+
+PROVIDER_OLLAMA = "ollama"
+PROVIDER_OPENAI = "openai"
+OLLAMA_BASE_URL = "http://localhost:11434/v1"
+
+# Connection settings for pooled clients. Local generation can take minutes,
+# but a server that doesn't accept a connection within seconds is down. Idle
+# connections are kept well past the 5s httpx default, since users take
+# longer than that to type their next response.
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 300.0
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 10
+DEFAULT_KEEPALIVE_EXPIRY = 300.0
+# Pooled clients don't retry inside the SDK (those retries would bypass the
+# rate limiter), so streams retry here, as often as the SDK did
+STREAM_MAX_RETRIES = 2
+
+_clients: Dict[tuple, openai.OpenAI] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(provider: str = PROVIDER_OLLAMA, base_url: Optional[str] = None, api_key: Optional[str] = None,
+               connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, read_timeout: float = DEFAULT_READ_TIMEOUT,
+               max_connections: int = DEFAULT_MAX_CONNECTIONS) -> openai.OpenAI:
+    """
+    Return the process-wide client for a provider and base URL, creating it once.
+
+    Every caller with the same settings shares one client and so one HTTP
+    connection pool, so keep-alive connections (and their TLS sessions) are
+    reused across requests, script reruns and Streamlit sessions. Clients are
+    thread-safe.
+
+    Args:
+        provider: PROVIDER_OLLAMA or PROVIDER_OPENAI
+        base_url: API base URL (default: local Ollama, or the OpenAI API)
+        api_key: API key (not needed for Ollama)
+        connect_timeout: Seconds to wait for a connection
+        read_timeout: Seconds to wait for response data
+        max_connections: Connection pool size
+    """
+    if provider == PROVIDER_OLLAMA:
+        base_url, api_key = base_url or OLLAMA_BASE_URL, api_key or "ollama"
+    key = (provider, base_url, api_key, connect_timeout, read_timeout, max_connections)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            # httpx.Limits, taken from the SDK so this works with the httpx it ships with
+            limits = type(openai.DEFAULT_CONNECTION_LIMITS)(
+                max_connections=max_connections,
+                max_keepalive_connections=min(DEFAULT_MAX_KEEPALIVE_CONNECTIONS, max_connections),
+                keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY
+            )
+            timeout = openai.Timeout(read_timeout, connect=connect_timeout)
+            # Retries happen in create_chat_completion/stream_chat_completion, which
+            # wait for the rate limiter (see llm_rate_limit) before each one
+            client = openai.OpenAI(
+                api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0,
+                http_client=openai.DefaultHttpxClient(limits=limits, timeout=timeout)
+            )
+            _clients[key] = client
+        return client
+
+
+def _cache_get(key: str) -> Optional[str]:
+    """Look up a cached response; an unusable cache or empty response counts as a miss."""
+    try:
+        return get_response_cache().get(key) or None
+    except sqlite3.Error:
+        return None
+
+
+def _answered_by_model(client, model_name: str) -> bool:
+    """False if a failover client (see llm_failover) answered with a different model."""
+    return getattr(client, 'answered_model', None) in (None, model_name)
+
+
+def _cache_set(key: str, response: str):
+    try:
+        get_response_cache().set(key, response)
+    except sqlite3.Error:
+        pass
+
+
+def stream_chat_completion(client, model_name: str, prompt: str, temperature: float = 0.7,
+                           stats: Optional[Dict] = None, use_cache: bool = True,
+                           prompt_version: str = DEFAULT_PROMPT_VERSION) -> Iterator[str]:
+    """
+    Stream a single-prompt chat completion, yielding text as it arrives.
+
+    Works the same against Ollama and OpenAI. Pass a dict as ``stats`` to get
+    timing for the call once the stream is exhausted. A cached response is
+    yielded in one piece without calling the model. Retryable errors before
+    the stream starts are retried up to STREAM_MAX_RETRIES times.
+
+    Args:
+        client: OpenAI client instance
+        model_name: Name of the model to use
+        prompt: User prompt
+        temperature: Sampling temperature
+        stats: Optional dict filled with time_to_first_token, total_time,
+            tokens, tokens_per_sec and cached
+        use_cache: Read and write the persistent response cache
+        prompt_version: Version of the prompt template, part of the cache key
+
+    Yields:
+        Completion text chunks
+    """
+    start = time.perf_counter()
+    cache_key = make_cache_key(model_name, prompt, temperature, prompt_version) if use_cache else None
+    cached = _cache_get(cache_key) if use_cache else None
+    if cached is not None:
+        if stats is not None:
+            elapsed = time.perf_counter() - start
+            stats.update({
+                'time_to_first_token': elapsed,
+                'total_time': elapsed,
+                'tokens': estimate_tokens(cached),
+                'tokens_per_sec': 0.0,
+                'cached': True
+            })
+        yield cached
+        return
+
+    first_token_at = None
+    chunk_count = 0
+    usage_tokens = None
+    total_tokens = None
+    parts = []
+
+    limiter = _rate_limiter(client, model_name)
+    reserved = estimate_tokens(prompt) + DEFAULT_COMPLETION_TOKENS
+    request_client = _without_sdk_retries(client)
+    attempt = 0
+    while True:
+        if limiter:
+            limiter.acquire(reserved)
+        try:
+            stream = request_client.chat.completions.create(
+                model=model_name,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            break
+        except Exception as e:
+            if attempt >= STREAM_MAX_RETRIES or not is_retryable_error(e):
+                raise
+            delay = _retry_delay(e, attempt)
+            if limiter and is_rate_limit_error(e):
+                limiter.pause(delay)
+            time.sleep(delay)
+            attempt += 1
+    for chunk in stream:
+        if getattr(chunk, 'usage', None) is not None:
+            usage_tokens = chunk.usage.completion_tokens
+            total_tokens = chunk.usage.total_tokens
+        if not chunk.choices:
+            continue
+        content = chunk.choices[0].delta.content
+        if content:
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            chunk_count += 1
+            parts.append(content)
+            yield content
+
+    if limiter:
+        limiter.record_usage(reserved, total_tokens)
+    if use_cache and parts and _answered_by_model(client, model_name):
+        _cache_set(cache_key, ''.join(parts))
+
+    if stats is not None:
+        end = time.perf_counter()
+        # Each streamed chunk is roughly one token when the server omits usage
+        tokens = usage_tokens or chunk_count
+        generation_time = end - (first_token_at or end)
+        stats.update({
+            'time_to_first_token': (first_token_at or end) - start,
+            'total_time': end - start,
+            'tokens': tokens,
+            'tokens_per_sec': tokens / generation_time if generation_time > 0 else 0.0,
+            'cached': False
+        })
+
+
+def format_stream_stats(stats: Dict) -> str:
+    """One-line summary of stream timing for display under a response."""
+    if not stats:
+        return ""
+    if stats.get('cached'):
+        return "⚡ Served from the response cache"
+    return (f"⏱️ First token {stats['time_to_first_token']:.2f}s · "
+            f"{stats['tokens']} tokens in {stats['total_time']:.1f}s · "
+            f"{stats['tokens_per_sec']:.1f} tokens/sec")
+
+
+def is_quota_error(error: Exception) -> bool:
+    """True for a 429 saying the account is out of credit, which retrying will not fix."""
+    return (getattr(error, 'status_code', None) == 429
+            and 'insufficient_quota' in (getattr(error, 'code', None), getattr(error, 'type', None)))
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for a 429 that clears once requests slow down (not an exhausted quota)."""
+    return getattr(error, 'status_code', None) == 429 and not is_quota_error(error)
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """True for rate limits (429), server errors (5xx), timeouts and dropped connections."""
+    if isinstance(error, openai.APIConnectionError):  # includes APITimeoutError
+        return True
+    status_code = getattr(error, 'status_code', None)
+    return is_rate_limit_error(error) or (status_code is not None and 500 <= status_code < 600)
+
+
+def backoff_delay(attempt: int, backoff: float = 1.0) -> float:
+    """Exponential backoff with jitter, so concurrent callers don't retry in lockstep."""
+    return backoff * (2 ** attempt) * (0.5 + random.random())
+
+
+def _retry_delay(error: Exception, attempt: int, backoff: float = 1.0) -> float:
+    """The server's Retry-After if it sent one, else exponential backoff with jitter."""
+    retry_after = retry_after_seconds(error)
+    if retry_after is None:
+        return backoff_delay(attempt, backoff)
+    # Jitter upwards only: retrying before Retry-After just gets another 429
+    return retry_after * (1 + 0.2 * random.random())
+
+
+def _without_sdk_retries(client):
+    """The client with the SDK's own retries turned off, so retries happen only in this module."""
+    if getattr(client, 'max_retries', 0) and hasattr(client, 'with_options'):
+        return client.with_options(max_retries=0)
+    return client
+
+
+def _rate_limiter(client, model_name: str):
+    base_url = getattr(client, 'base_url', None)
+    return get_rate_limiter(base_url, model_name) if base_url is not None else None
+
+
+def create_chat_completion(client, model_name: str, prompt: str, temperature: float = 0.7,
+                           timeout: Optional[float] = None, max_retries: int = 3,
+                           backoff: float = 1.0, use_cache: bool = True,
+                           prompt_version: str = DEFAULT_PROMPT_VERSION) -> str:
+    """
+    Run a single-prompt chat completion and return its text.
+
+    Retryable errors (see is_retryable_error) are retried with exponential
+    backoff and jitter; anything else is raised immediately. The SDK's own
+    retries are turned off, so a request is sent at most 1 + max_retries
+    times (plus rate limit retries, below). Rate limit
+    errors (429) wait for the server's Retry-After and are retried until
+    MAX_RATE_LIMIT_WAIT seconds have been spent waiting, whatever
+    max_retries is (unless it is 0). Requests to APIs with a rate limit
+    budget (see llm_rate_limit) wait for their turn before being sent.
+    Responses are served from and saved to the persistent response cache
+    unless ``use_cache`` is False.
+
+    Args:
+        client: OpenAI client instance
+        model_name: Name of the model to use
+        prompt: User prompt
+        temperature: Sampling temperature
+        timeout: Per-request timeout in seconds (None uses the client default)
+        max_retries: Retries after the first attempt
+        backoff: Base delay in seconds, doubled on each retry
+        use_cache: Read and write the persistent response cache
+        prompt_version: Version of the prompt template, part of the cache key
+    """
+    cache_key = make_cache_key(model_name, prompt, temperature, prompt_version) if use_cache else None
+    if use_cache:
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+    limiter = _rate_limiter(client, model_name)
+    reserved = estimate_tokens(prompt) + DEFAULT_COMPLETION_TOKENS
+    attempt = rate_limited = 0
+    rate_limit_wait = 0.0
+    request_client = _without_sdk_retries(client)
+    while True:
+        try:
+            if limiter:
+                limiter.acquire(reserved)
+            kwargs = {'timeout': timeout} if timeout is not None else {}
+            response = request_client.chat.completions.create(
+                model=model_name,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                **kwargs
+            )
+            if limiter:
+                limiter.record_usage(reserved, response.usage.total_tokens if response.usage else None)
+            content = response.choices[0].message.content
+            if use_cache and content and _answered_by_model(client, model_name):
+                _cache_set(cache_key, content)
+            return content
+        except Exception as e:
+            if max_retries and is_rate_limit_error(e) and rate_limit_wait < MAX_RATE_LIMIT_WAIT:
+                delay = _retry_delay(e, min(rate_limited, 5), backoff)
+                if limiter:
+                    # Every caller of this model holds off, not just this one
+                    limiter.pause(delay)
+                time.sleep(delay)
+                rate_limit_wait += delay
+                rate_limited += 1
+                continue
+            if attempt >= max_retries or not is_retryable_error(e):
+                raise
+            time.sleep(backoff_delay(attempt, backoff))
+            attempt += 1
+
+
+# Context windows the models are actually served with. Ollama runs every model
+# at its default num_ctx (4096) unless told otherwise, regardless of what the
+# model supports.
+MODEL_CONTEXT_WINDOWS = {
+    "llama3.2:3b": 4096,
+    "llama3.1:8b": 4096,
+    "mistral:7b": 4096,
+    "llama3.1:70b": 4096,
+    "gpt-4o-mini": 128000,
+}
+DEFAULT_CONTEXT_WINDOW = 4096
+
+
+def get_context_window(model_name: str) -> int:
+    """Return the usable context window (in tokens) for a model."""
+    return MODEL_CONTEXT_WINDOWS.get(model_name, DEFAULT_CONTEXT_WINDOW)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)."""
+    return len(text) // 4 + 1
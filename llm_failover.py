@@ -0,0 +1,288 @@
+"""
+LLM Failover - Hedged requests and automatic failover across backends
+
+A HedgedClient stands in for an OpenAI client and sends each chat completion
+to a primary backend, with one or more alternates (another provider or a
+smaller local model):
+
+- Failover: if the primary fails with an error another backend could avoid
+  (429 quota/rate limit, 5xx, connection refused, timeout, unknown model),
+  the next backend is tried at once instead of retrying the primary.
+- Hedging: if the primary has not answered within its recent p90 latency,
+  the request is also sent to the next backend and whichever answers first
+  wins. For streamed responses "answers" means the first token, and the
+  losing stream is closed, which stops its generation. A losing request
+  still queued by the scheduler is withdrawn; a non-streamed one already
+  sent cannot be interrupted, and its reply is discarded.
+
+Attempts run on their own threads. Queue position updates for the primary
+(see llm_scheduler) are passed back to the thread that called create(), so
+a callback may use Streamlit.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from llm_client import is_quota_error, is_retryable_error
+from llm_scheduler import RequestCancelled
+
+DEFAULT_HEDGE_PERCENTILE = 0.9
+# Used until a backend has MIN_LATENCY_SAMPLES answered requests
+DEFAULT_HEDGE_DELAY = 10.0
+MIN_HEDGE_DELAY = 0.25
+MIN_LATENCY_SAMPLES = 5
+LATENCY_WINDOW = 50
+
+
+class Backend(NamedTuple):
+    name: str
+    client: object
+    model_name: str
+
+
+def should_fail_over(error: Exception) -> bool:
+    """True for errors another backend could avoid (see is_retryable_error, plus quota, auth and unknown model)."""
+    return (is_retryable_error(error) or is_quota_error(error)
+            or getattr(error, 'status_code', None) in (401, 403, 404))
+
+
+class LatencyTracker:
+    """Recent answer times of one backend and model, for choosing hedge delays."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """The q-th quantile of recent samples, or None with too few samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+_trackers: Dict[tuple, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_latency_tracker(backend: Backend, stream: bool) -> LatencyTracker:
+    """Process-wide tracker for a backend's time to first token (stream) or full reply."""
+    key = (str(backend.client.base_url), backend.model_name, stream)
+    with _trackers_lock:
+        tracker = _trackers.get(key)
+        if tracker is None:
+            tracker = _trackers[key] = LatencyTracker()
+        return tracker
+
+
+class _Attempt:
+    """One backend's try at a request, run on its own thread."""
+
+    def __init__(self, backend: Backend, kwargs: Dict, events: queue.Queue,
+                 on_wait: Optional[Callable[[int, float], None]] = None):
+        self.backend = backend
+        self.kwargs = {**kwargs, 'model': backend.model_name}
+        self.events = events
+        self.started = time.perf_counter()
+        self.stream = None
+        self.cancelled = False
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self.client = backend.client
+        if hasattr(self.client, 'with_waiting'):
+            # Scheduled: leave the queue if cancelled before a slot frees up
+            self.client = self.client.with_waiting(on_wait, self._cancel_event)
+
+    def run(self):
+        try:
+            if self._cancel_event.is_set():
+                return
+            response = self.client.chat.completions.create(**self.kwargs)
+            if not self.kwargs.get('stream'):
+                self.events.put(('ok', self, response))
+                return
+            with self._lock:
+                self.stream = response
+                cancelled = self.cancelled
+            if cancelled:
+                self._close()
+                return
+            iterator = iter(response)
+            first = next(iterator, None)
+            self.events.put(('ok', self, (response, iterator, first)))
+        except RequestCancelled:
+            pass
+        except Exception as e:
+            self.events.put(('error', self, e))
+
+    def cancel(self):
+        """Stop waiting for this attempt: it is not sent if still queued, and a streamed response is closed."""
+        self._cancel_event.set()
+        with self._lock:
+            self.cancelled = True
+            stream = self.stream
+        if stream is not None:
+            self._close()
+
+    def _close(self):
+        try:
+            self.stream.close()
+        except Exception:
+            pass
+
+
+class _HedgedStream:
+    """The winning stream, starting with the chunk that won the race."""
+
+    def __init__(self, stream, iterator, first):
+        self._stream, self._iterator = stream, iterator
+        self._pending = [first] if first is not None else []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._pending:
+            return self._pending.pop()
+        return next(self._iterator)
+
+    def close(self):
+        self._stream.close()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class _HedgedCompletions:
+    def __init__(self, owner: "HedgedClient"):
+        self._owner = owner
+
+    def create(self, **kwargs):
+        return self._owner._create(kwargs)
+
+
+class _HedgedChat:
+    def __init__(self, owner: "HedgedClient"):
+        self.completions = _HedgedCompletions(owner)
+
+
+class HedgedClient:
+    """
+    OpenAI client stand-in that hedges and fails over across backends.
+
+    The first backend is the primary; the model passed to create() is
+    replaced by each backend's own model_name. After a call, answered_by
+    and answered_model name the backend and model whose reply was returned
+    (per thread, so concurrent callers each see their own).
+
+    on_wait receives the primary's queue position updates when its client
+    is a ScheduledClient, on the thread that called create().
+    """
+
+    def __init__(self, backends: List[Backend], hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE,
+                 hedge_delay: Optional[float] = None, on_wait: Optional[Callable[[int, float], None]] = None):
+        if not backends:
+            raise ValueError("HedgedClient needs at least one backend")
+        # Errors fail over to the next backend instead of being retried in place
+        self.backends = [backend._replace(client=backend.client.with_options(max_retries=0))
+                         for backend in backends]
+        self.hedge_percentile = hedge_percentile
+        self.hedge_delay = hedge_delay
+        self.on_wait = on_wait
+        self._answered = threading.local()
+        self.chat = _HedgedChat(self)
+
+    @property
+    def base_url(self):
+        return self.backends[0].client.base_url
+
+    @property
+    def answered_by(self) -> Optional[str]:
+        backend = getattr(self._answered, 'backend', None)
+        return backend.name if backend else None
+
+    @property
+    def answered_model(self) -> Optional[str]:
+        backend = getattr(self._answered, 'backend', None)
+        return backend.model_name if backend else None
+
+    def _delay(self, backend: Backend, stream: bool) -> float:
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        observed = get_latency_tracker(backend, stream).percentile(self.hedge_percentile)
+        return DEFAULT_HEDGE_DELAY if observed is None else max(MIN_HEDGE_DELAY, observed)
+
+    def _create(self, kwargs: Dict):
+        stream = bool(kwargs.get('stream'))
+        events: queue.Queue = queue.Queue()
+        attempts: List[_Attempt] = []
+        errors: List[Exception] = []
+
+        def launch() -> bool:
+            if len(attempts) == len(self.backends):
+                return False
+            on_wait = None
+            if not attempts and self.on_wait is not None:
+                # The attempt's thread cannot touch the UI; hand updates to this one
+                on_wait = lambda *update: events.put(('wait', None, update))
+            attempt = _Attempt(self.backends[len(attempts)], kwargs, events, on_wait)
+            attempts.append(attempt)
+            # A thread per attempt: a shared pool would fill with attempts queued in the
+            # scheduler, and an interactive attempt would wait behind them for a thread
+            threading.Thread(target=attempt.run, name="llm-hedge", daemon=True).start()
+            return True
+
+        launch()
+        hedge_at = time.perf_counter() + self._delay(self.backends[0], stream)
+        running = 1
+        waiting = False
+        try:
+            while True:
+                timeout = None
+                if len(attempts) < len(self.backends):
+                    timeout = max(0.0, hedge_at - time.perf_counter())
+                try:
+                    kind, attempt, payload = events.get(timeout=timeout)
+                except queue.Empty:
+                    # Primary is slower than usual: race the next backend against it
+                    launch()
+                    running += 1
+                    hedge_at = time.perf_counter() + self._delay(attempts[-1].backend, stream)
+                    continue
+
+                if kind == 'wait':
+                    waiting = payload != (0, 0.0)
+                    self.on_wait(*payload)
+                    continue
+
+                running -= 1
+                if kind == 'ok':
+                    get_latency_tracker(attempt.backend, stream).record(time.perf_counter() - attempt.started)
+                    for other in attempts:
+                        if other is not attempt:
+                            other.cancel()
+                    self._answered.backend = attempt.backend
+                    if waiting:
+                        # The primary may still be queued, but this request no longer is
+                        self.on_wait(0, 0.0)
+                    return _HedgedStream(*payload) if stream else payload
+
+                errors.append(payload)
+                if should_fail_over(payload) and running == 0 and launch():
+                    running += 1
+                    continue
+                if running == 0:
+                    raise errors[0]
+        except BaseException:
+            # e.g. on_wait interrupted by a Streamlit rerun: nobody will read the result
+            for attempt in attempts:
+                attempt.cancel()
+            raise
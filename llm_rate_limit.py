@@ -0,0 +1,149 @@
+"""
+LLM Rate Limit - Client-side requests/tokens per minute budgets for hosted APIs
+
+OpenAI limits each organization to a number of requests and tokens per
+minute (RPM/TPM) per model and answers 429 once either is used up. Batch
+paths (auto-categorization, excerpt analysis, main.py) send requests as fast
+as their workers allow, so without a budget they run into 429s and spend
+their time backing off. A RateLimiter spaces requests to stay within both
+budgets, and when the API still says 429 its Retry-After pauses every caller
+of that model, not just the one that got the error.
+
+Limits apply to the OpenAI API by default (OPENAI_RPM / OPENAI_TPM, or
+set_rate_limits); local Ollama has no limiter.
+"""
+
+import email.utils
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+DEFAULT_OPENAI_RPM = int(os.environ.get("OPENAI_RPM", "500"))
+DEFAULT_OPENAI_TPM = int(os.environ.get("OPENAI_TPM", "200000"))
+# Reserved for the reply when a request is sent; corrected once usage is known
+DEFAULT_COMPLETION_TOKENS = 500
+# Servers may enforce limits over short windows (60 RPM as 1 per second), and
+# a full minute's burst would be rejected, so requests are paced evenly with
+# only this many seconds' worth let through at once
+BURST_SECONDS = 0.1
+# Longest a request keeps retrying rate limit (429) errors before giving up
+MAX_RATE_LIMIT_WAIT = 300.0
+
+
+class TokenBucket:
+    """
+    Refills at rate_per_minute, holding at most BURST_SECONDS' worth.
+
+    reserve() always succeeds and returns how long the caller must wait, so
+    callers are served in the order they reserve and nobody polls.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * BURST_SECONDS)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take amount (going into debt if needed); returns seconds until it is covered."""
+        self._refill(now)
+        self.tokens -= amount
+        return max(0.0, -self.tokens / self.rate)
+
+    def adjust(self, amount: float, now: float):
+        """Return (positive) or charge (negative) tokens after the real cost is known."""
+        self._refill(now)
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """Requests and tokens per minute budgets for one model, shared by all threads."""
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> float:
+        """
+        Wait until a request of about `tokens` tokens fits both budgets.
+
+        Returns:
+            Seconds waited
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._paused_until - now)
+            if self.requests:
+                wait = max(wait, self.requests.reserve(1, now))
+            if self.tokens:
+                wait = max(wait, self.tokens.reserve(tokens, now))
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def record_usage(self, reserved: int, used: Optional[int]):
+        """Correct the token budget with the usage the API reported."""
+        if self.tokens and used is not None:
+            with self._lock:
+                self.tokens.adjust(reserved - used, time.monotonic())
+
+    def pause(self, seconds: float):
+        """Hold every request to this model for `seconds` (e.g. from Retry-After)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+_limits: Dict[tuple, tuple] = {}
+_limiters: Dict[tuple, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def set_rate_limits(base_url: str, model_name: str, requests_per_minute: Optional[int],
+                    tokens_per_minute: Optional[int]):
+    """Configure (or with None/None, remove) the budget for a model on an API."""
+    key = (str(base_url).rstrip('/'), model_name)
+    with _limiters_lock:
+        _limits[key] = (requests_per_minute, tokens_per_minute)
+        _limiters.pop(key, None)
+
+
+def get_rate_limiter(base_url, model_name: str) -> Optional[RateLimiter]:
+    """Process-wide limiter for a model on an API, or None if it has no budget."""
+    key = (str(base_url).rstrip('/'), model_name)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limits = _limits.get(key)
+            if limits is None and 'api.openai.com' in key[0]:
+                limits = (DEFAULT_OPENAI_RPM, DEFAULT_OPENAI_TPM)
+            if not limits or not any(limits):
+                return None
+            limiter = _limiters[key] = RateLimiter(*limits)
+        return limiter
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Delay the server asked for in an error's retry-after-ms or Retry-After header, if any."""
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        value = headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            # HTTP-date form
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,375 @@
+"""
+LLM Scheduler - Process-wide admission control and fair queueing for model calls
+
+A local Ollama server runs only a few requests at once and queues the rest
+with no ordering, so when several sessions call it together requests time
+out while waiting behind someone's bulk categorization. Every chat
+completion goes through a client wrapped by scheduled(), which waits for a
+slot on its backend before sending:
+
+- At most max_in_flight requests per backend (base URL) are sent at once;
+  the client timeout only starts once a request is sent
+- Interactive requests (feedback, transcript analysis) go before bulk ones
+  (auto-categorization)
+- Within a priority, sessions take turns (round-robin), so one session's
+  batch of 50 requests does not hold up another session's single request
+"""
+
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Optional
+
+INTERACTIVE = 0
+BULK = 1
+
+# Ollama runs OLLAMA_NUM_PARALLEL requests per model at once (1 unless configured)
+DEFAULT_MAX_IN_FLIGHT = int(os.environ.get("OLLAMA_NUM_PARALLEL", "1"))
+REMOTE_MAX_IN_FLIGHT = 8
+# Initial guess at request duration for wait estimates, before any request finishes
+DEFAULT_SERVICE_SECONDS = 10.0
+# How soon a queued request notices it was cancelled
+CANCEL_POLL_SECONDS = 0.1
+
+WaitCallback = Callable[[int, float], None]
+
+
+class RequestCancelled(Exception):
+    """Raised by acquire when the request was cancelled before being sent."""
+
+
+class _Ticket:
+    __slots__ = ('session', 'priority', 'admitted')
+
+    def __init__(self, session: str, priority: int):
+        self.session = session
+        self.priority = priority
+        self.admitted = False
+
+
+class _Backend:
+    def __init__(self, max_in_flight: int):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        # priority -> {session: deque of tickets}, sessions in round-robin order
+        self.queues: Dict[int, OrderedDict] = {INTERACTIVE: OrderedDict(), BULK: OrderedDict()}
+        self.service_seconds = DEFAULT_SERVICE_SECONDS
+        self.completed = 0
+
+
+class LLMScheduler:
+    """
+    Admission control per backend, with priorities and per-session fair sharing.
+
+    Use slot() around each request, or wrap a client with scheduled().
+    """
+
+    def __init__(self, max_in_flight: Optional[Dict[str, int]] = None):
+        self._limits = dict(max_in_flight or {})
+        self._backends: Dict[str, _Backend] = {}
+        self._condition = threading.Condition()
+
+    def _backend(self, backend: str) -> _Backend:
+        state = self._backends.get(backend)
+        if state is None:
+            limit = self._limits.get(backend)
+            if limit is None:
+                is_local = 'localhost' in backend or '127.0.0.1' in backend
+                limit = DEFAULT_MAX_IN_FLIGHT if is_local else REMOTE_MAX_IN_FLIGHT
+            state = self._backends[backend] = _Backend(max(1, limit))
+        return state
+
+    def set_limit(self, backend: str, max_in_flight: int):
+        """Change how many requests a backend may run at once."""
+        with self._condition:
+            self._limits[backend] = max_in_flight
+            self._backend(backend).max_in_flight = max(1, max_in_flight)
+            self._dispatch(backend)
+            self._condition.notify_all()
+
+    def _dispatch(self, backend: str):
+        """Admit queued tickets while the backend has free slots (lock held)."""
+        state = self._backend(backend)
+        while state.in_flight < state.max_in_flight:
+            queue = next((q for p, q in sorted(state.queues.items()) if q), None)
+            if queue is None:
+                return
+            session, tickets = next(iter(queue.items()))
+            ticket = tickets.popleft()
+            # Rotate: this session goes to the back of the line for its next request
+            del queue[session]
+            if tickets:
+                queue[session] = tickets
+            ticket.admitted = True
+            state.in_flight += 1
+
+    def _position(self, state: _Backend, ticket: _Ticket) -> int:
+        """Requests that will be admitted before this ticket (lock held)."""
+        ahead = sum(len(tickets) for p, queue in state.queues.items() if p < ticket.priority
+                    for tickets in queue.values())
+        queue = state.queues[ticket.priority]
+        own = queue[ticket.session]
+        index = own.index(ticket)
+        # Round-robin: each round admits one ticket from every session still queued
+        for session, tickets in queue.items():
+            if session == ticket.session:
+                ahead += index
+            elif tickets:
+                turns = index + 1 if _before(queue, session, ticket.session) else index
+                ahead += min(len(tickets), turns)
+        return ahead
+
+    def _expected_wait(self, state: _Backend, position: int) -> float:
+        return (position // state.max_in_flight + 1) * state.service_seconds
+
+    def acquire(self, backend: str, session: str, priority: int = INTERACTIVE,
+                on_wait: Optional[WaitCallback] = None, cancel: Optional[threading.Event] = None) -> None:
+        """
+        Block until a request may be sent to the backend.
+
+        Args:
+            backend: Backend identifier (the client's base URL)
+            session: Caller identity for fair sharing (e.g. Streamlit session ID)
+            priority: INTERACTIVE or BULK
+            on_wait: Called as on_wait(position, expected_wait_seconds) while
+                queued whenever the position changes, and with (0, 0.0) once
+                admitted after waiting. Called from the waiting thread. If it
+                raises (e.g. Streamlit stopping a rerun), the request leaves
+                the queue, or gives back its slot, and the exception propagates.
+            cancel: Once set, the request leaves the queue (or gives back the
+                slot it was just admitted to) and RequestCancelled is raised.
+        """
+        ticket = _Ticket(session, priority)
+        with self._condition:
+            state = self._backend(backend)
+            queue = state.queues[priority]
+            queue.setdefault(session, deque()).append(ticket)
+            self._dispatch(backend)
+
+        reported = None
+        try:
+            while True:
+                if cancel is not None and cancel.is_set():
+                    raise RequestCancelled()
+                with self._condition:
+                    if not ticket.admitted:
+                        position = self._position(state, ticket)
+                        expected = self._expected_wait(state, position)
+                        if on_wait is None or position == reported:
+                            self._condition.wait(timeout=CANCEL_POLL_SECONDS if cancel is not None else 1.0)
+                            continue
+                if ticket.admitted:
+                    if cancel is not None and cancel.is_set():
+                        raise RequestCancelled()
+                    if reported is not None and on_wait is not None:
+                        on_wait(0, 0.0)
+                    return
+                on_wait(position, expected)
+                reported = position
+        except BaseException:
+            self._abandon(backend, ticket)
+            raise
+
+    def _abandon(self, backend: str, ticket: _Ticket):
+        """Take a ticket whose caller gave up out of the queue, or free its slot if admitted."""
+        with self._condition:
+            if ticket.admitted:
+                self.release(backend)
+                return
+            queue = self._backend(backend).queues[ticket.priority]
+            tickets = queue.get(ticket.session)
+            if tickets is not None and ticket in tickets:
+                tickets.remove(ticket)
+                if not tickets:
+                    del queue[ticket.session]
+            # Requests behind it moved up
+            self._condition.notify_all()
+
+    def release(self, backend: str, duration: Optional[float] = None):
+        """Free a backend slot, recording how long the request took."""
+        with self._condition:
+            state = self._backend(backend)
+            state.in_flight -= 1
+            if duration is not None:
+                # Moving average of request duration for wait estimates
+                weight = 0.5 if state.completed < 5 else 0.2
+                state.service_seconds += weight * (duration - state.service_seconds)
+                state.completed += 1
+            self._dispatch(backend)
+            self._condition.notify_all()
+
+    def slot(self, backend: str, session: str, priority: int = INTERACTIVE,
+             on_wait: Optional[WaitCallback] = None, cancel: Optional[threading.Event] = None) -> "_Slot":
+        """Context manager holding a backend slot for the duration of a request."""
+        return _Slot(self, backend, session, priority, on_wait, cancel)
+
+    def stats(self, backend: str) -> Dict:
+        """In-flight and queued request counts for a backend."""
+        with self._condition:
+            state = self._backend(backend)
+            return {
+                'in_flight': state.in_flight,
+                'max_in_flight': state.max_in_flight,
+                'queued': {p: sum(len(t) for t in q.values()) for p, q in state.queues.items()},
+                'service_seconds': state.service_seconds,
+            }
+
+
+def _before(queue: OrderedDict, session: str, other: str) -> bool:
+    """True if session comes before other in the queue's round-robin order."""
+    for key in queue:
+        if key == session:
+            return True
+        if key == other:
+            return False
+    return False
+
+
+class _Slot:
+    def __init__(self, scheduler: LLMScheduler, backend: str, session: str, priority: int,
+                 on_wait: Optional[WaitCallback], cancel: Optional[threading.Event] = None):
+        self.scheduler, self.backend = scheduler, backend
+        self.session, self.priority, self.on_wait, self.cancel = session, priority, on_wait, cancel
+        self.started = None
+
+    def __enter__(self):
+        self.scheduler.acquire(self.backend, self.session, self.priority, self.on_wait, self.cancel)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release(failed=exc_type is not None)
+
+    def release(self, failed: bool = False):
+        if self.started is not None:
+            # Failed requests say little about normal duration
+            duration = None if failed else time.perf_counter() - self.started
+            self.started = None
+            self.scheduler.release(self.backend, duration)
+
+
+class _ScheduledStream:
+    """Streaming response that holds its slot until fully read or closed."""
+
+    def __init__(self, stream, slot: _Slot):
+        self._stream, self._slot = stream, slot
+        self._iterator = iter(stream)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            self._slot.release()
+            raise
+        except Exception:
+            self._slot.release(failed=True)
+            raise
+
+    def close(self):
+        close = getattr(self._stream, 'close', None)
+        if close is not None:
+            close()
+        self._slot.release()
+
+    def __del__(self):
+        self._slot.release()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class _ScheduledCompletions:
+    def __init__(self, client, scheduler: LLMScheduler, session: str, priority: int,
+                 on_wait: Optional[WaitCallback], cancel: Optional[threading.Event] = None):
+        self._client, self._scheduler = client, scheduler
+        self._session, self._priority, self._on_wait, self._cancel = session, priority, on_wait, cancel
+
+    def create(self, **kwargs):
+        slot = self._scheduler.slot(str(self._client.base_url), self._session, self._priority, self._on_wait,
+                                    self._cancel)
+        if kwargs.get('stream'):
+            slot.__enter__()
+            try:
+                return _ScheduledStream(self._client.chat.completions.create(**kwargs), slot)
+            except BaseException:
+                slot.release(failed=True)
+                raise
+        with slot:
+            return self._client.chat.completions.create(**kwargs)
+
+
+class _ScheduledChat:
+    def __init__(self, completions: _ScheduledCompletions):
+        self.completions = completions
+
+
+class ScheduledClient:
+    """
+    OpenAI client stand-in whose chat.completions.create waits for a scheduler slot.
+
+    Everything else is passed through to the wrapped client.
+    """
+
+    def __init__(self, client, session: str, priority: int = INTERACTIVE,
+                 on_wait: Optional[WaitCallback] = None, scheduler: Optional[LLMScheduler] = None,
+                 cancel: Optional[threading.Event] = None):
+        self._client = client
+        self.chat = _ScheduledChat(_ScheduledCompletions(client, scheduler or get_scheduler(),
+                                                         session, priority, on_wait, cancel))
+
+    def with_options(self, **kwargs) -> "ScheduledClient":
+        """Copy with changed client options (e.g. max_retries), still scheduled the same way."""
+        completions = self.chat.completions
+        return ScheduledClient(self._client.with_options(**kwargs), completions._session, completions._priority,
+                               completions._on_wait, completions._scheduler, completions._cancel)
+
+    def with_waiting(self, on_wait: Optional[WaitCallback],
+                     cancel: Optional[threading.Event] = None) -> "ScheduledClient":
+        """Copy reporting its queue position to on_wait, and giving up its place once cancel is set."""
+        completions = self.chat.completions
+        return ScheduledClient(self._client, completions._session, completions._priority,
+                               on_wait, completions._scheduler, cancel)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+_anonymous_sessions = itertools.count()
+
+
+def get_scheduler() -> LLMScheduler:
+    """Shared scheduler for the process."""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = LLMScheduler()
+        return _default_scheduler
+
+
+def scheduled(client, session: Optional[str] = None, priority: int = INTERACTIVE,
+              on_wait: Optional[WaitCallback] = None) -> ScheduledClient:
+    """
+    Wrap a client so its chat completions go through the shared scheduler.
+
+    Args:
+        client: OpenAI client (e.g. from llm_client.get_client)
+        session: Caller identity for fair sharing (default: a new one per call)
+        priority: INTERACTIVE or BULK
+        on_wait: Queue position callback, see LLMScheduler.acquire
+    """
+    if session is None:
+        session = f"anonymous-{next(_anonymous_sessions)}"
+    return ScheduledClient(client, session, priority, on_wait)
+
+
+def format_queue_status(position: int, expected_wait: float) -> str:
+    """e.g. '⏳ Waiting for the model: 3 requests ahead, about 40s'."""
+    ahead = "next in line" if position == 0 else f"{position} request{'s' if position != 1 else ''} ahead"
+    return f"⏳ Waiting for the model: {ahead}, about {expected_wait:.0f}s"
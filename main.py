@@ -1,7 +1,268 @@
-def main():
-    print("Hello from repl-nix-workspace!")
+#!/usr/bin/env python3
+"""Score a cohort of coaching responses offline.
 
+Reads (scenario ID, coach response) pairs from a CSV or JSONL file, runs the
+same General / Bottom-Lining feedback prompts as the app with bounded
+concurrency, and appends one JSON result per response to the output file.
+
+The output file doubles as the checkpoint: every finished response is
+flushed to disk as soon as it completes, and a rerun with the same output
+skips responses that already succeeded (failed ones are retried). A run can
+be interrupted at any point and resumed by running the same command again.
+
+Input columns (CSV header or JSONL keys):
+    scenario_id   ID of the scenario in the workbook or custom library
+    response      The coach's response
+    category      Optional: scenario category (workbook IDs repeat across sheets)
+    mode          Optional: "general" (default) or "bottom-lining"
+    id            Optional: stable row ID (default: a hash of the row)
+
+Usage:
+    python main.py responses.csv -o results.jsonl
+    python main.py responses.jsonl -o results.jsonl --model llama3.1:8b --concurrency 2
+    python main.py responses.csv -o results.jsonl --provider openai --model gpt-4o-mini
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional
+
+from competency_matcher import get_matcher
+from feedback_prompts import FEEDBACK_MODES, FEEDBACK_PROMPT_VERSION, GENERAL_MODE, build_feedback_prompt
+from llm_client import OLLAMA_BASE_URL, PROVIDER_OLLAMA, PROVIDER_OPENAI, create_chat_completion, get_client
+from llm_rate_limit import DEFAULT_OPENAI_RPM, DEFAULT_OPENAI_TPM, set_rate_limits
+from ollama_warmup import DEFAULT_KEEP_ALIVE, preload_model
+from scenario_loader import DEFAULT_WORKBOOK_FILE, load_scenario_bank
+from scenario_manager import get_shared_manager
+from scenario_sampler import ScenarioIndex
+
+TEXT_COLUMN = 'Client Question / Scenario'
+
+_SECTION_RE = re.compile(r"^\s*\*\*([^*\n]+?):?\*\*:?", re.MULTILINE)
+
+
+def read_rows(path: str) -> Iterator[Dict]:
+    """Yield input rows from a .csv or .jsonl file, each with a 'line' number."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith(('.jsonl', '.ndjson')):
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield {**json.loads(line), 'line': line_number}
+        else:
+            for line_number, row in enumerate(csv.DictReader(f), start=2):
+                yield {**row, 'line': line_number}
+
+
+def row_id(row: Dict) -> str:
+    """The row's own ID, or a hash of its content so resumes survive reordering."""
+    if row.get('id') not in (None, ''):
+        return str(row['id'])
+    content = json.dumps([str(row.get(k, '')) for k in ('scenario_id', 'category', 'mode', 'response')])
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+
+
+def load_checkpoint(path: str) -> set:
+    """IDs already scored successfully in an existing output file."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line from an interrupted run
+            if result.get('status') == 'ok':
+                done.add(result['id'])
+    with open(path, 'rb+') as f:
+        # Drop a torn last line so the next result starts on a line of its own
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+    return done
+
+
+def build_scenario_lookup(workbook_file: str) -> Dict:
+    """Map (category, ID) and bare ID to scenario records (bare IDs only when unambiguous)."""
+    index = ScenarioIndex(load_scenario_bank(workbook_file))
+    index.sync(get_shared_manager())
+    lookup, ambiguous = {}, set()
+    for table in (index.library_records, index.custom_records):
+        for category, records in table.items():
+            for record in records:
+                scenario_id = str(record['ID'])
+                lookup[(category, scenario_id)] = (category, record)
+                if scenario_id in lookup:
+                    ambiguous.add(scenario_id)
+                lookup[scenario_id] = (category, record)
+    for scenario_id in ambiguous:
+        del lookup[scenario_id]
+    return lookup
 
-if __name__ == "__main__":
-    main()
 
+def parse_sections(feedback: str) -> Dict[str, str]:
+    """Split feedback on its **Heading:** lines into {heading: text}."""
+    sections = {}
+    matches = list(_SECTION_RE.finditer(feedback))
+    for match, following in zip(matches, matches[1:] + [None]):
+        end = following.start() if following else len(feedback)
+        sections[match.group(1).strip()] = feedback[match.end():end].strip()
+    return sections
+
+
+def score_row(row: Dict, lookup: Dict, client, args) -> Dict:
+    """Run the feedback prompt for one input row and return its result record."""
+    result = {
+        'id': row_id(row),
+        'line': row['line'],
+        'scenario_id': str(row.get('scenario_id', '')),
+        'category': row.get('category') or None,
+        'mode': row.get('mode') or args.mode,
+        'response': row.get('response', ''),
+    }
+    start = time.perf_counter()
+    try:
+        if result['mode'] not in FEEDBACK_MODES:
+            raise ValueError(f"unknown mode {result['mode']!r}")
+        if not str(result['response']).strip():
+            raise ValueError("empty response")
+        key = (result['category'], result['scenario_id']) if result['category'] else result['scenario_id']
+        if key not in lookup:
+            raise KeyError(f"scenario {result['scenario_id']!r} not found"
+                           + ("" if result['category'] else " (or ambiguous: add a category column)"))
+        result['category'], scenario = lookup[key]
+
+        prompt = build_feedback_prompt(scenario[TEXT_COLUMN], result['response'], result['mode'])
+        feedback = create_chat_completion(
+            client, args.model, prompt, temperature=args.temperature,
+            timeout=args.timeout, max_retries=args.max_retries,
+            use_cache=not args.no_cache, prompt_version=FEEDBACK_PROMPT_VERSION
+        )
+        result.update({
+            'status': 'ok',
+            'model': args.model,
+            'feedback': feedback,
+            'sections': parse_sections(feedback or ''),
+            'instant_competencies': {
+                competency: [hit.phrase for hit in hits]
+                for competency, hits in get_matcher().score(result['response']).items()
+            },
+        })
+    except Exception as e:
+        result.update({'status': 'error', 'error': f"{type(e).__name__}: {e}"})
+    result['elapsed_s'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def make_client(args):
+    api_key = None
+    if args.provider == PROVIDER_OPENAI:
+        api_key = os.environ.get('OPENAI_API_KEY')
+        if not api_key:
+            sys.exit("OPENAI_API_KEY is not set")
+    client = get_client(args.provider, base_url=args.base_url, api_key=api_key,
+                        read_timeout=args.timeout, max_connections=max(1, args.concurrency))
+    if args.rpm or args.tpm:
+        # Stay within the account's budget instead of running into 429s
+        is_openai = args.provider == PROVIDER_OPENAI
+        set_rate_limits(client.base_url, args.model,
+                        args.rpm or (DEFAULT_OPENAI_RPM if is_openai else None),
+                        args.tpm or (DEFAULT_OPENAI_TPM if is_openai else None))
+    return client
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="CSV or JSONL file of responses")
+    parser.add_argument("-o", "--output", default="feedback_results.jsonl",
+                        help="JSONL results file, also used to resume (default: %(default)s)")
+    parser.add_argument("--mode", choices=FEEDBACK_MODES, default=GENERAL_MODE,
+                        help="Feedback mode for rows without a mode column")
+    parser.add_argument("--provider", choices=(PROVIDER_OLLAMA, PROVIDER_OPENAI), default=PROVIDER_OLLAMA)
+    parser.add_argument("--model", default="llama3.2:3b")
+    parser.add_argument("--base-url", help="API base URL (default: local Ollama or OpenAI)")
+    parser.add_argument("--concurrency", type=int, default=2,
+                        help="Requests in flight at once (default: %(default)s; keep low for Ollama)")
+    parser.add_argument("--timeout", type=float, default=300, help="Per-request timeout in seconds")
+    parser.add_argument("--max-retries", type=int, default=5, help="Retries per request on transient errors")
+    parser.add_argument("--temperature", type=float, default=0.7)
+    parser.add_argument("--keep-alive", default=DEFAULT_KEEP_ALIVE,
+                        help="How long Ollama keeps the model loaded after the run (default: %(default)s)")
+    parser.add_argument("--workbook", default=DEFAULT_WORKBOOK_FILE)
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the response cache")
+    parser.add_argument("--rpm", type=int,
+                        help="Requests per minute allowed for the model (default: OPENAI_RPM for OpenAI, none for Ollama)")
+    parser.add_argument("--tpm", type=int,
+                        help="Tokens per minute allowed for the model (default: OPENAI_TPM for OpenAI, none for Ollama)")
+    args = parser.parse_args(argv)
+
+    done = load_checkpoint(args.output)
+    rows = [row for row in read_rows(args.input) if row_id(row) not in done]
+    print(f"📋 {len(rows)} responses to score ({len(done)} already done in {args.output})")
+    if not rows:
+        return 0
+
+    lookup = build_scenario_lookup(args.workbook)
+    client = make_client(args)
+    if args.provider == PROVIDER_OLLAMA:
+        try:
+            load_seconds = preload_model(args.model, args.keep_alive, args.base_url or OLLAMA_BASE_URL)
+            print(f"🔥 {args.model} loaded in {load_seconds:.1f}s")
+        except OSError as e:
+            print(f"⚠️  Could not preload {args.model}: {e}")
+    counts = {'ok': 0, 'error': 0}
+    start = time.perf_counter()
+
+    with open(args.output, 'a', encoding='utf-8') as out, \
+            ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        def record(result: Dict):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+            counts[result['status']] += 1
+            total = counts['ok'] + counts['error']
+            if result['status'] == 'error':
+                print(f"  ✗ line {result['line']}: {result['error']}")
+            if total % 25 == 0 or total == len(rows):
+                rate = total / (time.perf_counter() - start)
+                print(f"  {total}/{len(rows)} scored ({rate:.2f}/s, {counts['error']} failed)")
+
+        # Futures stay in pending until their result is taken for writing, so
+        # an interrupt can lose a result (rescored on resume) but never write it twice
+        pending, queue = set(), iter(rows)
+        try:
+            while True:
+                # Keep at most 2x concurrency rows submitted, so memory stays flat
+                for row in queue:
+                    pending.add(executor.submit(score_row, row, lookup, client, args))
+                    if len(pending) >= 2 * max(1, args.concurrency):
+                        break
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    pending.discard(future)
+                    record(future.result())
+        except KeyboardInterrupt:
+            print("\n⏸️  Interrupted: finishing in-flight requests; rerun the same command to resume")
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True, cancel_futures=True)
+            # In-flight requests ran to completion: keep what they cost
+            for future in pending:
+                if not future.cancelled():
+                    record(future.result())
+
+    print(f"✅ {counts['ok']} scored, {counts['error']} failed -> {args.output}")
+    return 1 if counts['error'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
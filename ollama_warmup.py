@@ -0,0 +1,186 @@
+"""
+Ollama Warm-up - Preload models and keep them resident between requests
+
+Ollama loads a model's weights on its first request and unloads it after
+keep_alive (5 minutes by default) without requests, so the first feedback
+after a pause can spend seconds loading before any token is generated. The
+OpenAI-compatible endpoint the app uses cannot set keep_alive, so the model
+is loaded (and its keep_alive extended) through Ollama's native API: a
+/api/generate request with no prompt loads the model and returns at once.
+"""
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+from llm_client import OLLAMA_BASE_URL
+
+DEFAULT_KEEP_ALIVE = "30m"
+KEEP_ALIVE_OPTIONS = ["5m", "15m", "30m", "1h", "-1"]  # -1 keeps the model loaded until Ollama stops
+# Re-send keep_alive at most this often; every /v1 request resets it to Ollama's default
+REFRESH_INTERVAL = 60.0
+
+
+def _native_url(base_url: str, path: str) -> str:
+    """Native Ollama API URL from the OpenAI-compatible base URL (.../v1)."""
+    root = base_url.rstrip('/')
+    if root.endswith('/v1'):
+        root = root[:-3]
+    return root + path
+
+
+def preload_model(model_name: str, keep_alive: str = DEFAULT_KEEP_ALIVE, base_url: str = OLLAMA_BASE_URL,
+                  timeout: float = 300) -> float:
+    """
+    Load a model into memory and set how long it stays loaded.
+
+    Returns immediately if the model is already loaded (just updating its
+    keep_alive).
+
+    Returns:
+        Seconds Ollama spent loading the weights (0.0 if already loaded)
+    """
+    body = json.dumps({"model": model_name, "keep_alive": keep_alive}).encode()
+    request = urllib.request.Request(_native_url(base_url, "/api/generate"), data=body,
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        result = json.loads(response.read() or b'{}')
+    return result.get('load_duration', 0) / 1e9
+
+
+def loaded_models(base_url: str = OLLAMA_BASE_URL, timeout: float = 1.0) -> Optional[Dict[str, str]]:
+    """
+    Models currently loaded by Ollama, mapped to when they will be unloaded.
+
+    Returns:
+        {model name: expires_at}, or None if Ollama is not reachable
+    """
+    try:
+        with urllib.request.urlopen(_native_url(base_url, "/api/ps"), timeout=timeout) as response:
+            models = json.loads(response.read() or b'{}').get('models', [])
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+    return {m.get('model') or m.get('name'): m.get('expires_at', '') for m in models}
+
+
+class ModelWarmer:
+    """
+    Preloads models in the background, once per model at a time.
+
+    One instance is shared by every session in the process (see
+    get_model_warmer), so several sessions selecting the same model send a
+    single warm-up request.
+    """
+
+    def __init__(self, base_url: str = OLLAMA_BASE_URL):
+        self.base_url = base_url
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ollama-warmup")
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+        self._status: Dict[str, Dict] = {}
+
+    def warm(self, model_name: str, keep_alive: str = DEFAULT_KEEP_ALIVE, force: bool = False) -> Future:
+        """
+        Preload a model in the background and extend its keep_alive.
+
+        Does nothing if a warm-up for the model is already running, or one
+        finished within REFRESH_INTERVAL with the same keep_alive (unless force).
+
+        Returns:
+            Future resolving to the load time in seconds
+        """
+        with self._lock:
+            pending = self._pending.get(model_name)
+            if pending is not None and not pending.done():
+                return pending
+            status = self._status.get(model_name, {})
+            if (not force and pending is not None and status.get('keep_alive') == keep_alive
+                    and 'error' not in status and time.time() - status.get('warmed_at', 0) < REFRESH_INTERVAL):
+                return pending
+            future = self._executor.submit(self._warm, model_name, keep_alive)
+            self._pending[model_name] = future
+            return future
+
+    def _warm(self, model_name: str, keep_alive: str) -> float:
+        try:
+            load_seconds = preload_model(model_name, keep_alive, self.base_url)
+        except Exception as e:
+            with self._lock:
+                self._status[model_name] = {'error': str(e), 'warmed_at': time.time(), 'keep_alive': keep_alive}
+            raise
+        with self._lock:
+            previous = self._status.get(model_name, {})
+            self._status[model_name] = {
+                'warmed_at': time.time(),
+                'keep_alive': keep_alive,
+                # A refresh of a loaded model reports ~0; keep the real load time
+                'load_seconds': load_seconds if load_seconds > 0.05 else previous.get('load_seconds', load_seconds),
+            }
+        return load_seconds
+
+    def is_warming(self, model_name: str) -> bool:
+        with self._lock:
+            pending = self._pending.get(model_name)
+            return pending is not None and not pending.done()
+
+    def wait(self, model_name: str, timeout: Optional[float] = None) -> Optional[float]:
+        """Wait for a running warm-up; returns its load time, or None if none ran or it failed."""
+        with self._lock:
+            pending = self._pending.get(model_name)
+        if pending is None:
+            return None
+        try:
+            return pending.result(timeout=timeout)
+        except Exception:
+            return None
+
+    def status(self, model_name: str) -> Dict:
+        """
+        Current state of a model for display.
+
+        Returns:
+            Dict with state ('warm', 'warming', 'cold' or 'offline'), plus
+            load_seconds and error when known
+        """
+        with self._lock:
+            status = dict(self._status.get(model_name, {}))
+        if self.is_warming(model_name):
+            return {**status, 'state': 'warming'}
+        loaded = loaded_models(self.base_url)
+        if loaded is None:
+            return {**status, 'state': 'offline'}
+        # /api/ps lists models by full tag, e.g. "llama3.2:3b" or "mistral:latest"
+        is_loaded = model_name in loaded or (':' not in model_name and f"{model_name}:latest" in loaded)
+        return {**status, 'state': 'warm' if is_loaded else 'cold'}
+
+
+_default_warmer = None
+_default_warmer_lock = threading.Lock()
+
+
+def get_model_warmer() -> ModelWarmer:
+    """Shared warmer for the local Ollama server (created once per process)."""
+    global _default_warmer
+    with _default_warmer_lock:
+        if _default_warmer is None:
+            _default_warmer = ModelWarmer()
+        return _default_warmer
+
+
+def format_warm_status(model_name: str, status: Dict) -> str:
+    """One-line sidebar status, e.g. '🟢 llama3.2:3b warm (loaded in 3.1s)'."""
+    state = status['state']
+    if state == 'warm':
+        load = status.get('load_seconds')
+        return f"🟢 {model_name} warm" + (f" (loaded in {load:.1f}s)" if load else "")
+    if state == 'warming':
+        return f"🟡 Loading {model_name} into memory..."
+    if state == 'offline':
+        return "🔴 Ollama not reachable - is `ollama serve` running?"
+    if status.get('error'):
+        return f"⚪ {model_name} cold (warm-up failed: {status['error']})"
+    return f"⚪ {model_name} cold - first response will include load time"
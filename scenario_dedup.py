@@ -0,0 +1,168 @@
+"""
+Scenario Dedup - MinHash/LSH index for near-duplicate client statements
+
+Each statement is reduced to a MinHash signature over its word shingles, and
+the signature is split into LSH bands. Statements sharing any band land in
+the same bucket and become candidates; only candidates have their exact
+Jaccard similarity checked against the threshold. A lookup therefore touches
+a handful of buckets instead of every scenario in the library.
+
+The bands are fixed when an index is built, for its threshold. Bands chosen
+for a low threshold also find the pairs above any higher one, so a single
+index serves every threshold from its own up to 1 by passing the threshold
+to query().
+"""
+
+import re
+import zlib
+from typing import Dict, Hashable, List, Optional, Tuple
+import numpy as np
+
+DEFAULT_DUPLICATE_THRESHOLD = 0.7
+# Lowest threshold offered in the UI; the shared library index is banded for it
+MIN_DUPLICATE_THRESHOLD = 0.5
+DEFAULT_NUM_PERM = 128
+DEFAULT_SHINGLE_SIZE = 2
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def shingles(text: str, size: int = DEFAULT_SHINGLE_SIZE) -> set:
+    """Word n-grams of the lowercased text, ignoring punctuation."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    """Exact Jaccard similarity of two shingle sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def lsh_params(threshold: float, num_perm: int, false_negative_weight: float = 0.9) -> Tuple[int, int]:
+    """
+    Pick (bands, rows) with bands * rows <= num_perm for a similarity threshold.
+
+    Minimizes the weighted area under the LSH S-curve on the wrong side of
+    the threshold: missed pairs above it (false negatives) and candidate
+    pairs below it (false positives). Candidates are verified afterwards, so
+    false negatives are weighted more heavily by default.
+    """
+    below = np.linspace(0, threshold, 200)
+    above = np.linspace(threshold, 1, 200)
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        false_positive = np.mean(1 - (1 - below ** rows) ** bands) * threshold
+        false_negative = np.mean((1 - above ** rows) ** bands) * (1 - threshold)
+        error = (1 - false_negative_weight) * false_positive + false_negative_weight * false_negative
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class DuplicateIndex:
+    """
+    Near-duplicate index over texts keyed by an ID.
+
+    add/remove are O(num_perm + shingles) and query inspects only the texts
+    sharing an LSH band with the query, so the cost does not grow with the
+    size of the library.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_DUPLICATE_THRESHOLD,
+                 num_perm: int = DEFAULT_NUM_PERM,
+                 shingle_size: int = DEFAULT_SHINGLE_SIZE, seed: int = 1):
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+        self._shingles: Dict[Hashable, set] = {}
+        self._buckets: List[Dict[bytes, set]] = [{} for _ in range(self.bands)]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._signatures
+
+    def signature(self, shingle_set: set) -> np.ndarray:
+        """MinHash signature of a shingle set."""
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingle_set), dtype=np.uint64)
+        # Universal hashing (a*x + b) mod p; uint64 overflow wraps, as intended
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key: Hashable, text: str):
+        """Index a text under a key (replacing any text already stored for it)."""
+        if key in self._signatures:
+            self.remove(key)
+        shingle_set = shingles(text, self.shingle_size)
+        signature = self.signature(shingle_set)
+        self._signatures[key] = signature
+        self._shingles[key] = shingle_set
+        for bucket, band in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(band, set()).add(key)
+
+    def remove(self, key: Hashable):
+        """Drop a key from the index; unknown keys are ignored."""
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        del self._shingles[key]
+        for bucket, band in zip(self._buckets, self._band_keys(signature)):
+            keys = bucket.get(band)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del bucket[band]
+
+    def query(self, text: str, threshold: Optional[float] = None) -> List[Tuple[Hashable, float]]:
+        """
+        Find indexed texts similar to the given one.
+
+        Args:
+            text: Text to look up
+            threshold: Similarity to require instead of the index's own; values
+                below the index's threshold may miss some matches
+
+        Returns:
+            (key, Jaccard similarity) pairs at or above the threshold, most
+            similar first
+        """
+        shingle_set = shingles(text, self.shingle_size)
+        signature = self.signature(shingle_set)
+        candidates = set()
+        for bucket, band in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(band, ()))
+
+        if threshold is None:
+            threshold = self.threshold
+        matches = []
+        for key in candidates:
+            similarity = jaccard(shingle_set, self._shingles[key])
+            if similarity >= threshold:
+                matches.append((key, similarity))
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
+
+    def find_duplicate(self, text: str, threshold: Optional[float] = None) -> Optional[Tuple[Hashable, float]]:
+        """Return the most similar indexed (key, similarity), or None."""
+        matches = self.query(text, threshold)
+        return matches[0] if matches else None
@@ -0,0 +1,135 @@
+"""
+Scenario Loader - Read the ICF scenario workbook and its compiled artifact
+
+The compiled artifact (scenario_bank.pkl) is a pickled snapshot of the
+workbook sheets. It carries a schema version and a SHA-256 hash of the
+workbook contents, so a stale artifact is detected and the bank is rebuilt
+from the .xlsx instead. Custom scenarios are not part of the artifact: they
+are synced into the ScenarioIndex incrementally (see scenario_sampler), so
+editing the library never invalidates it. Build it ahead of time with:
+
+    python scenario_loader.py
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from typing import Dict, Optional
+import pandas as pd
+
+ARTIFACT_SCHEMA_VERSION = 2
+DEFAULT_WORKBOOK_FILE = "Coach_Training_Scenarios_ICF_PCC.xlsx"
+DEFAULT_ARTIFACT_FILE = "scenario_bank.pkl"
+
+
+def read_scenario_workbook(file_path: str) -> Dict[str, pd.DataFrame]:
+    """
+    Read every sheet of the scenario workbook from one open handle.
+
+    The .xlsx archive is unpacked and its XML parsed once, instead of once
+    per category sheet.
+
+    Args:
+        file_path: Path to the Excel workbook
+
+    Returns:
+        Dictionary of DataFrames keyed by sheet (category) name, in workbook order
+    """
+    with pd.ExcelFile(file_path) as excel_file:
+        return {
+            sheet_name: excel_file.parse(sheet_name)
+            for sheet_name in excel_file.sheet_names
+        }
+
+
+def compute_source_hash(workbook_file: str) -> str:
+    """Hash the workbook contents."""
+    digest = hashlib.sha256()
+    if os.path.exists(workbook_file):
+        with open(workbook_file, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    else:
+        digest.update(b'<missing>')
+    return digest.hexdigest()
+
+
+def build_scenario_artifact(workbook_file: str = DEFAULT_WORKBOOK_FILE,
+                            artifact_file: str = DEFAULT_ARTIFACT_FILE) -> Dict[str, pd.DataFrame]:
+    """
+    Compile the workbook into the binary artifact.
+
+    The artifact is written to a temporary file and renamed into place, so a
+    concurrent reader never sees a partial file.
+
+    Returns:
+        The scenario bank that was written
+    """
+    source_hash = compute_source_hash(workbook_file)
+    data = read_scenario_workbook(workbook_file)
+
+    payload = {
+        'schema_version': ARTIFACT_SCHEMA_VERSION,
+        'source_hash': source_hash,
+        'sheets': data
+    }
+    directory = os.path.dirname(os.path.abspath(artifact_file))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, artifact_file)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return data
+
+
+def load_compiled_scenario_bank(workbook_file: str = DEFAULT_WORKBOOK_FILE,
+                                artifact_file: str = DEFAULT_ARTIFACT_FILE) -> Optional[Dict[str, pd.DataFrame]]:
+    """
+    Load the compiled artifact if it matches the current source files.
+
+    Returns:
+        The scenario bank, or None if the artifact is missing, unreadable,
+        from another schema version, or built from a different workbook
+    """
+    if not os.path.exists(artifact_file):
+        return None
+    try:
+        with open(artifact_file, 'rb') as f:
+            payload = pickle.load(f)
+    except Exception:
+        return None
+
+    if not isinstance(payload, dict) or payload.get('schema_version') != ARTIFACT_SCHEMA_VERSION:
+        return None
+    if payload.get('source_hash') != compute_source_hash(workbook_file):
+        return None
+    return payload['sheets']
+
+
+def load_scenario_bank(workbook_file: str = DEFAULT_WORKBOOK_FILE,
+                       artifact_file: str = DEFAULT_ARTIFACT_FILE) -> Dict[str, pd.DataFrame]:
+    """
+    Load the workbook scenario bank, preferring the compiled artifact.
+
+    Falls back to parsing the .xlsx when the artifact is stale, and rewrites
+    the artifact so the next cold start is fast again. A read-only deployment
+    directory only costs the rewrite, never the load.
+    """
+    data = load_compiled_scenario_bank(workbook_file, artifact_file)
+    if data is not None:
+        return data
+    try:
+        return build_scenario_artifact(workbook_file, artifact_file)
+    except OSError:
+        return read_scenario_workbook(workbook_file)
+
+
+if __name__ == "__main__":
+    bank = build_scenario_artifact()
+    total = sum(len(df) for df in bank.values())
+    print(f"✅ Wrote {DEFAULT_ARTIFACT_FILE}: {len(bank)} categories, {total} scenarios")
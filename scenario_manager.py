@@ -2,39 +2,148 @@
 Scenario Manager - Extract and manage coaching scenarios from transcripts
 """
 
+import itertools
 import json
-import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import List, Dict, Optional
 import streamlit as st
+from llm_client import (create_chat_completion, estimate_tokens, get_context_window, is_quota_error,
+                        is_rate_limit_error)
+from transcript_parser import iter_turns
+from scenario_dedup import DEFAULT_DUPLICATE_THRESHOLD, MIN_DUPLICATE_THRESHOLD, DuplicateIndex
+from scenario_store import DEFAULT_DB_FILE, ScenarioStore, get_store_version, new_scenario_id
+
+CATEGORIES = ["Career", "Leadership", "Relationship", "Self Improvement", "Value System"]
+
+# Bump when the categorization prompts change so cached responses are not reused
+CATEGORIZE_PROMPT_VERSION = "1"
+
+CUSTOM_SOURCE = 'Real Transcript'
+
+# Bank views fall back to a full rebuild once this many changes are pending
+MAX_BANK_CHANGES = 10000
+
+_bank_generations = itertools.count(1)
+
+
+def to_bank_record(scenario: Dict) -> Dict:
+    """Convert a custom scenario to a scenario bank row (Excel column names)."""
+    return {
+        'ID': scenario['id'],
+        'Client Question / Scenario': scenario['statement'],
+        'Coach Response 1': "[From your transcript - practice your response]",
+        'Coach Response 2': '',
+        'Coach Response 3': '',
+        'Quality Score': scenario.get('quality_score', 5),
+        'Source': CUSTOM_SOURCE
+    }
+
 
 class ScenarioManager:
     """Manages extraction and storage of coaching scenarios from transcripts."""
 
-    def __init__(self, storage_file: str = "custom_scenarios.json"):
+    def __init__(self, storage_file: str = DEFAULT_DB_FILE, import_json: bool = True):
         self.storage_file = storage_file
-        self.scenarios = self._load_scenarios()
+        self.store = ScenarioStore(storage_file, import_json)
+        self._lock = threading.RLock()
+        self._version = None
+        self._load_scenarios()
+
+    @property
+    def scenarios(self) -> List[Dict]:
+        """All scenarios in insertion order."""
+        return list(self._by_id.values())
+
+    def _load_scenarios(self):
+        """Load existing scenarios from the store and rebuild the indexes."""
+        try:
+            scenarios, self._version = self.store.load_all()
+        except Exception as e:
+            st.warning(f"Could not load scenarios: {e}")
+            scenarios, self._version = [], None
+        self._rebuild_index(scenarios)
 
-    def _load_scenarios(self) -> List[Dict]:
-        """Load existing scenarios from JSON file."""
-        if os.path.exists(self.storage_file):
-            try:
-                with open(self.storage_file, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                st.warning(f"Could not load scenarios: {e}")
-                return []
-        return []
+    def refresh(self) -> bool:
+        """
+        Reload the scenarios if the library changed since they were loaded
+        (e.g. written by another session or process).
 
-    def _save_scenarios(self):
-        """Save scenarios to JSON file."""
-        try:
-            with open(self.storage_file, 'w') as f:
-                json.dump(self.scenarios, f, indent=2)
+        Returns:
+            True if the scenarios were reloaded
+        """
+        with self._lock:
+            try:
+                if self._version is not None and get_store_version(self.storage_file) == self._version:
+                    return False
+            except Exception:
+                return False
+            self._load_scenarios()
             return True
-        except Exception as e:
-            st.error(f"Could not save scenarios: {e}")
-            return False
+
+    def _record_write(self, new_version: tuple):
+        """Track the version after our own write; any gap means another writer got in first."""
+        if self._version is not None and new_version == (self._version[0], self._version[1] + 1):
+            self._version = new_version
+        else:
+            self._version = None  # stale: reload on the next refresh()
+
+    def _rebuild_index(self, scenarios: List[Dict]):
+        """
+        Rebuild the id map, the category index and the running stats.
+
+        _by_id and each _by_category bucket are insertion-ordered dicts, so
+        lookups, deletes and recategorizations by id are O(1). Starts a new
+        bank generation, so scenario bank views rebuild their custom rows.
+        """
+        self._by_id: Dict[str, Dict] = {}
+        self._by_category: Dict[str, Dict[str, Dict]] = {}
+        self._quality_sum = 0
+        self._last_added = None
+        self._dedup: Optional[DuplicateIndex] = None  # built on first duplicate check
+        self._reset_bank_changes()
+        for scenario in scenarios:
+            self._index_scenario(scenario)
+        self._bank_changes.clear()
+
+    def _reset_bank_changes(self):
+        self._bank_generation = next(_bank_generations)
+        self._bank_changes: List[tuple] = []
+
+    def _log_bank_change(self, op: str, category: str, scenario: Dict):
+        self._bank_changes.append((op, category, scenario))
+        if len(self._bank_changes) > MAX_BANK_CHANGES:
+            self._reset_bank_changes()
+
+    def _index_scenario(self, scenario: Dict):
+        """Add one scenario to the indexes and running stats."""
+        self._by_id[scenario['id']] = scenario
+        category = scenario.get('category', 'Unknown')
+        self._by_category.setdefault(category, {})[scenario['id']] = scenario
+        self._log_bank_change('add', category, scenario)
+        if self._dedup is not None:
+            self._dedup.add(scenario['id'], scenario.get('statement', ''))
+        self._quality_sum += scenario.get('quality_score', 0)
+        date = scenario.get('extracted_date', '')
+        if self._last_added is None or date > self._last_added:
+            self._last_added = date
+
+    def _unindex_scenario(self, scenario: Dict):
+        """Remove one scenario from the indexes and running stats."""
+        self._by_id.pop(scenario['id'], None)
+        category = scenario.get('category', 'Unknown')
+        bucket = self._by_category.get(category, {})
+        bucket.pop(scenario['id'], None)
+        if not bucket:
+            self._by_category.pop(category, None)
+        self._log_bank_change('remove', category, scenario)
+        if self._dedup is not None:
+            self._dedup.remove(scenario['id'])
+        self._quality_sum -= scenario.get('quality_score', 0)
+        if scenario.get('extracted_date', '') == self._last_added:
+            self._last_added = None  # recomputed lazily by get_stats
 
     def extract_client_statements(self, transcript: str) -> List[Dict]:
         """
@@ -42,71 +151,71 @@ class ScenarioManager:
         Returns list of potential scenarios with metadata.
         """
         statements = []
-        lines = transcript.split('\n')
-
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-
-            # Find start of client statement
-            if line.lower().startswith('client:'):
-                # Get context (look back for most recent coach statement)
-                context = ""
-                for j in range(i - 1, -1, -1):
-                    if lines[j].strip().lower().startswith('coach:'):
-                        context = lines[j].strip()[6:].strip()
-                        break
-
-                # Combine consecutive client lines into one complete statement
-                combined_statement = line[7:].strip()  # Remove "Client:" prefix
-                start_line = i + 1
-                i += 1
-
-                # Keep adding consecutive client lines
-                while i < len(lines):
-                    next_line = lines[i].strip()
-                    if next_line.lower().startswith('client:'):
-                        # Remove "Client:" prefix and add to statement
-                        combined_statement += " " + next_line[7:].strip()
-                        i += 1
-                    elif next_line.lower().startswith('coach:'):
-                        # Stop at next coach statement
-                        break
-                    else:
-                        # Skip empty lines or continue
-                        i += 1
-
-                # Clean up the statement
-                combined_statement = combined_statement.strip()
-
-                # Filter for substantive statements (longer than 30 chars for combined)
-                if len(combined_statement) > 30:
-                    statements.append({
-                        'statement': combined_statement,
-                        'context': context,
-                        'line_number': start_line,
-                        'length': len(combined_statement)
-                    })
-            else:
-                i += 1
-
+        for turn in iter_turns(transcript):
+            # Filter for substantive statements (longer than 30 chars for combined)
+            if turn['speaker'] == 'client' and len(turn['text']) > 30:
+                statements.append({
+                    'statement': turn['text'],
+                    'context': turn['previous_coach'],
+                    'line_number': turn['start_line'],
+                    'length': len(turn['text'])
+                })
         return statements
 
-    def categorize_scenarios_with_ai(self, statements: List[Dict], client, model_name: str = "llama3.1:8b") -> List[Dict]:
+    def _duplicate_index(self) -> DuplicateIndex:
         """
-        Use AI to categorize scenarios and assess quality.
+        The library's dedup index, built on first use and then kept in sync.
+
+        It is banded for MIN_DUPLICATE_THRESHOLD, so every session shares it
+        whatever threshold it asks for.
+        """
+        if self._dedup is None:
+            index = DuplicateIndex(MIN_DUPLICATE_THRESHOLD)
+            for scenario in self._by_id.values():
+                index.add(scenario['id'], scenario.get('statement', ''))
+            self._dedup = index
+        return self._dedup
+
+    def flag_duplicates(self, statements: List[Dict],
+                        threshold: float = DEFAULT_DUPLICATE_THRESHOLD) -> List[Dict]:
+        """
+        Mark statements that nearly duplicate a library scenario or an earlier statement.
+
+        Each flagged statement gets a 'duplicate_of' dict with source
+        ('library' or 'transcript'), the matching statement, its id or
+        line_number, and the word-shingle Jaccard similarity (0-1).
 
         Args:
-            statements: List of client statements
-            client: OpenAI client instance
+            statements: Extracted statements (see extract_client_statements)
+            threshold: Minimum word-shingle Jaccard similarity to count as a
+                duplicate, from MIN_DUPLICATE_THRESHOLD to 1
 
         Returns:
-            List of scenarios with category and quality score
+            The same statements, flagged in place
         """
-        categorized = []
+        batch = DuplicateIndex(threshold)
+        with self._lock:
+            library = self._duplicate_index()
+            for i, stmt in enumerate(statements):
+                stmt.pop('duplicate_of', None)
+                match = library.find_duplicate(stmt['statement'], threshold)
+                if match is not None:
+                    scenario = self._by_id[match[0]]
+                    stmt['duplicate_of'] = {'source': 'library', 'id': scenario['id'],
+                                            'statement': scenario['statement'], 'similarity': match[1]}
+                else:
+                    match = batch.find_duplicate(stmt['statement'])
+                    if match is not None:
+                        earlier = statements[match[0]]
+                        stmt['duplicate_of'] = {'source': 'transcript', 'line_number': earlier['line_number'],
+                                                'statement': earlier['statement'], 'similarity': match[1]}
+                batch.add(i, stmt['statement'])
+        return statements
 
-        for stmt in statements:
-            prompt = f"""
+    def _categorize_statement(self, stmt: Dict, client, model_name: str,
+                              timeout: Optional[float], max_retries: int, use_cache: bool = True) -> Optional[Dict]:
+        """Categorize one statement; returns None if the AI reply had no JSON."""
+        prompt = f"""
 Analyze this client statement from a coaching session and provide:
 1. Category (one of: Career, Leadership, Relationship, Self Improvement, Value System)
 2. Quality score (1-10, where 10 = excellent coaching moment)
@@ -123,42 +232,180 @@ Respond in JSON format:
 }}
 """
 
-            try:
-                response = client.chat.completions.create(
-                    model=model_name,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.5
-                )
-
-                # Parse AI response
-                ai_response = response.choices[0].message.content
-
-                # Try to extract JSON from response
-                import re
-                json_match = re.search(r'\{[^}]+\}', ai_response)
-                if json_match:
-                    analysis = json.loads(json_match.group())
-
-                    categorized.append({
-                        **stmt,
-                        'category': analysis.get('category', 'Self Improvement'),
-                        'quality_score': analysis.get('quality_score', 5),
-                        'reason': analysis.get('reason', ''),
-                        'extracted_date': datetime.now().isoformat(),
-                        'source': 'transcript_extraction'
-                    })
-            except Exception as e:
-                # Fallback: default category
-                categorized.append({
+        try:
+            ai_response = create_chat_completion(
+                client, model_name, prompt, temperature=0.5,
+                timeout=timeout, max_retries=max_retries, use_cache=use_cache,
+                prompt_version=CATEGORIZE_PROMPT_VERSION
+            )
+
+            # Try to extract JSON from response
+            json_match = re.search(r'\{[^}]+\}', ai_response)
+            if json_match:
+                analysis = json.loads(json_match.group())
+
+                return {
+                    **stmt,
+                    'category': analysis.get('category', 'Self Improvement'),
+                    'quality_score': analysis.get('quality_score', 5),
+                    'reason': analysis.get('reason', ''),
+                    'extracted_date': datetime.now().isoformat(),
+                    'source': 'transcript_extraction'
+                }
+        except Exception as e:
+            if is_rate_limit_error(e) or is_quota_error(e):
+                # Already retried for as long as the API asked; a default category
+                # here would be saved as if the model had assigned it
+                raise
+            # Fallback: default category
+            return {
+                **stmt,
+                'category': 'Self Improvement',
+                'quality_score': 5,
+                'reason': 'Auto-extracted, needs review',
+                'extracted_date': datetime.now().isoformat(),
+                'source': 'transcript_extraction'
+            }
+        return None
+
+    @staticmethod
+    def _batch_prompt(statements: List[Dict]) -> str:
+        """Build one prompt asking for a JSON array covering every statement."""
+        items = "\n".join(
+            f"{i}. Client statement: \"{stmt['statement']}\"\n"
+            f"   Context (coach's previous question): \"{stmt['context']}\""
+            for i, stmt in enumerate(statements)
+        )
+        return f"""
+Analyze each numbered client statement from a coaching session and provide:
+1. Category (one of: Career, Leadership, Relationship, Self Improvement, Value System)
+2. Quality score (1-10, where 10 = excellent coaching moment)
+3. Brief reason for quality score
+
+{items}
+
+Respond with a JSON array containing one object per statement, using its number as "index":
+[
+    {{"index": 0, "category": "Career", "quality_score": 8, "reason": "Clear dilemma with emotional weight, good for practicing evocative questions"}}
+]
+"""
+
+    @staticmethod
+    def pack_batches(statements: List[Dict], model_name: str, max_batch_size: int = 20) -> List[List[int]]:
+        """
+        Group statement positions into batches that fit the model's context window.
+
+        Each batch is sized so its prompt plus the expected JSON reply (about
+        60 tokens per statement) stays within the context window.
+
+        Returns:
+            List of batches, each a list of positions into ``statements``
+        """
+        budget = get_context_window(model_name) - estimate_tokens(ScenarioManager._batch_prompt([]))
+        batches, current, used = [], [], 0
+        for i, stmt in enumerate(statements):
+            cost = estimate_tokens(stmt['statement']) + estimate_tokens(stmt['context']) + 20 + 60
+            if current and (used + cost > budget or len(current) >= max_batch_size):
+                batches.append(current)
+                current, used = [], 0
+            current.append(i)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    def _categorize_batch(self, statements: List[Dict], client, model_name: str,
+                          timeout: Optional[float], max_retries: int,
+                          use_cache: bool = True) -> List[Optional[Dict]]:
+        """
+        Categorize several statements with a single prompt.
+
+        Entries missing from the reply or failing validation (unknown
+        category, score outside 1-10) are retried one at a time.
+        """
+        if len(statements) == 1:
+            return [self._categorize_statement(statements[0], client, model_name, timeout, max_retries, use_cache)]
+
+        analyses = {}
+        try:
+            ai_response = create_chat_completion(
+                client, model_name, self._batch_prompt(statements), temperature=0.5,
+                timeout=timeout, max_retries=max_retries, use_cache=use_cache,
+                prompt_version=CATEGORIZE_PROMPT_VERSION
+            )
+            json_match = re.search(r'\[.*\]', ai_response, re.DOTALL)
+            if json_match:
+                for analysis in json.loads(json_match.group()):
+                    if isinstance(analysis, dict) and isinstance(analysis.get('index'), int):
+                        analyses[analysis['index']] = analysis
+        except Exception as e:
+            if is_rate_limit_error(e) or is_quota_error(e):
+                # Retrying each statement alone would only send more requests
+                raise
+
+        results = []
+        for i, stmt in enumerate(statements):
+            analysis = analyses.get(i)
+            quality_score = analysis.get('quality_score') if analysis else None
+            if (analysis and analysis.get('category') in CATEGORIES
+                    and isinstance(quality_score, int) and 1 <= quality_score <= 10):
+                results.append({
                     **stmt,
-                    'category': 'Self Improvement',
-                    'quality_score': 5,
-                    'reason': 'Auto-extracted, needs review',
+                    'category': analysis['category'],
+                    'quality_score': quality_score,
+                    'reason': analysis.get('reason', ''),
                     'extracted_date': datetime.now().isoformat(),
                     'source': 'transcript_extraction'
                 })
+            else:
+                results.append(self._categorize_statement(stmt, client, model_name, timeout, max_retries,
+                                                          use_cache))
+        return results
+
+    def categorize_scenarios_with_ai(self, statements: List[Dict], client, model_name: str = "llama3.1:8b",
+                                     max_concurrency: int = 4, timeout: Optional[float] = 120,
+                                     max_retries: int = 3, batched: bool = True,
+                                     use_cache: bool = True) -> List[Dict]:
+        """
+        Use AI to categorize scenarios and assess quality.
+
+        Statements are sent concurrently, so wall-clock time scales with
+        len(statements) / max_concurrency rather than the statement count.
+        Ollama only runs OLLAMA_NUM_PARALLEL requests at once and queues the rest.
+        In batched mode several statements share one prompt (see pack_batches),
+        so the instruction block is sent once per batch instead of per statement.
+
+        Args:
+            statements: List of client statements
+            client: OpenAI client instance
+            model_name: Name of the model to use
+            max_concurrency: Maximum requests in flight
+            timeout: Per-request timeout in seconds
+            max_retries: Retries with backoff on 429/5xx/timeouts
+            batched: Pack multiple statements into each prompt
+            use_cache: Read and write the persistent response cache
+
+        Returns:
+            List of scenarios with category and quality score, in input order
 
-        return categorized
+        Raises:
+            openai.RateLimitError: If the API kept rate limiting past
+                MAX_RATE_LIMIT_WAIT, or the account is out of quota
+        """
+        if not statements:
+            return []
+
+        if batched:
+            jobs = [[statements[i] for i in batch] for batch in self.pack_batches(statements, model_name)]
+        else:
+            jobs = [[stmt] for stmt in statements]
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(jobs)))) as executor:
+            results = executor.map(
+                lambda job: self._categorize_batch(job, client, model_name, timeout, max_retries, use_cache),
+                jobs
+            )
+            return [r for batch in results for r in batch if r is not None]
 
     def add_scenario(self, scenario: Dict) -> bool:
         """
@@ -170,52 +417,105 @@ Respond in JSON format:
         Returns:
             True if successful
         """
-        # Generate unique ID
-        scenario['id'] = f"custom_{datetime.now().strftime('%Y%m%d%H%M%S')}_{len(self.scenarios)}"
+        return self.add_scenarios([scenario]) == 1
+
+    def add_scenarios(self, scenarios: List[Dict]) -> int:
+        """
+        Add several scenarios to the library in a single transaction.
 
-        self.scenarios.append(scenario)
-        return self._save_scenarios()
+        Args:
+            scenarios: List of scenario dictionaries
+
+        Returns:
+            Number of scenarios added (all or nothing)
+        """
+        if not scenarios:
+            return 0
+
+        # Generate unique IDs (safe across sessions and processes)
+        for scenario in scenarios:
+            scenario['id'] = new_scenario_id()
+        # duplicate_of only annotates the review list (see flag_duplicates)
+        records = [{k: v for k, v in scenario.items() if k != 'duplicate_of'} for scenario in scenarios]
+
+        with self._lock:
+            try:
+                self._record_write(self.store.insert_many(records))
+            except Exception as e:
+                st.error(f"Could not save scenarios: {e}")
+                return 0
+            for record in records:
+                self._index_scenario(record)
+        return len(records)
 
     def get_scenarios_by_category(self, category: str) -> List[Dict]:
         """Get all scenarios for a specific category."""
-        return [s for s in self.scenarios if s.get('category') == category]
+        return list(self._by_category.get(category, {}).values())
+
+    def get_scenario(self, scenario_id: str) -> Optional[Dict]:
+        """Get a scenario by ID."""
+        return self._by_id.get(scenario_id)
 
     def get_all_categories(self) -> List[str]:
         """Get list of unique categories in the library."""
-        categories = set(s.get('category', 'Self Improvement') for s in self.scenarios)
-        return sorted(list(categories))
+        return sorted(self._by_category)
 
     def get_stats(self) -> Dict:
-        """Get statistics about the scenario library."""
-        if not self.scenarios:
+        """Get statistics about the scenario library (maintained incrementally)."""
+        with self._lock:
+            if not self._by_id:
+                return {
+                    'total': 0,
+                    'by_category': {},
+                    'avg_quality': 0,
+                    'last_added': None
+                }
+
+            if self._last_added is None:
+                self._last_added = max(s.get('extracted_date', '') for s in self._by_id.values())
+
             return {
-                'total': 0,
-                'by_category': {},
-                'avg_quality': 0,
-                'last_added': None
+                'total': len(self._by_id),
+                'by_category': {category: len(bucket) for category, bucket in self._by_category.items()},
+                'avg_quality': round(self._quality_sum / len(self._by_id), 1),
+                'last_added': self._last_added
             }
 
-        by_category = {}
-        for scenario in self.scenarios:
-            cat = scenario.get('category', 'Unknown')
-            by_category[cat] = by_category.get(cat, 0) + 1
-
-        quality_scores = [s.get('quality_score', 0) for s in self.scenarios]
-        avg_quality = sum(quality_scores) / len(quality_scores) if quality_scores else 0
+    def bank_changes_since(self, cursor: Optional[tuple]) -> tuple:
+        """
+        Custom scenario changes since a cursor, for incremental scenario bank views.
 
-        dates = [s.get('extracted_date', '') for s in self.scenarios]
-        last_added = max(dates) if dates else None
+        Args:
+            cursor: Cursor returned by the previous call, or None on the first call
 
-        return {
-            'total': len(self.scenarios),
-            'by_category': by_category,
-            'avg_quality': round(avg_quality, 1),
-            'last_added': last_added
-        }
+        Returns:
+            (cursor, changes, reset): changes is a list of
+            ('add', category, bank_record) and ('remove', category, scenario_id)
+            tuples. When reset is True the library was reloaded (or the cursor
+            is unknown) and changes adds every scenario from scratch.
+        """
+        with self._lock:
+            new_cursor = (self._bank_generation, len(self._bank_changes))
+            if cursor is not None and cursor[0] == self._bank_generation:
+                pending = self._bank_changes[cursor[1]:]
+                reset = False
+            else:
+                pending = [('add', category, scenario)
+                           for category, bucket in self._by_category.items()
+                           for scenario in bucket.values()]
+                reset = True
+            changes = [
+                (op, category, to_bank_record(scenario) if op == 'add' else scenario['id'])
+                for op, category, scenario in pending
+            ]
+            return new_cursor, changes, reset
 
     def merge_with_excel_data(self, excel_data: Dict) -> Dict:
         """
-        Merge custom scenarios with Excel scenarios.
+        Merge custom scenarios with Excel scenarios into new DataFrames.
+
+        The app draws from an incrementally synced ScenarioIndex instead; this
+        builds a one-off copy for scripts and exports.
 
         Args:
             excel_data: Dictionary of DataFrames from Excel (category -> DataFrame)
@@ -227,26 +527,8 @@ Respond in JSON format:
 
         merged = excel_data.copy()
 
-        # Group custom scenarios by category
-        for category in self.get_all_categories():
-            custom_scenarios = self.get_scenarios_by_category(category)
-
-            if not custom_scenarios:
-                continue
-
-            # Convert to DataFrame format matching Excel structure
-            custom_df = pd.DataFrame([
-                {
-                    'ID': s['id'],
-                    'Client Question / Scenario': s['statement'],
-                    'Coach Response 1': f"[From your transcript - practice your response]",
-                    'Coach Response 2': '',
-                    'Coach Response 3': '',
-                    'Quality Score': s.get('quality_score', 5),
-                    'Source': 'Real Transcript'
-                }
-                for s in custom_scenarios
-            ])
+        for category, bucket in self._by_category.items():
+            custom_df = pd.DataFrame([to_bank_record(s) for s in bucket.values()])
 
             # Merge with existing category or create new
             if category in merged:
@@ -258,16 +540,69 @@ Respond in JSON format:
 
     def delete_scenario(self, scenario_id: str) -> bool:
         """Delete a scenario by ID."""
-        self.scenarios = [s for s in self.scenarios if s.get('id') != scenario_id]
-        return self._save_scenarios()
+        with self._lock:
+            try:
+                new_version = self.store.delete(scenario_id)
+            except Exception as e:
+                st.error(f"Could not save scenarios: {e}")
+                return False
+            if new_version is None:
+                return False
+            self._record_write(new_version)
+            scenario = self._by_id.get(scenario_id)
+            if scenario is not None:
+                self._unindex_scenario(scenario)
+        return True
 
     def update_scenario_category(self, scenario_id: str, new_category: str) -> bool:
         """Update the category of a scenario."""
-        for scenario in self.scenarios:
-            if scenario.get('id') == scenario_id:
+        with self._lock:
+            try:
+                new_version = self.store.update(scenario_id, {'category': new_category})
+            except Exception as e:
+                st.error(f"Could not save scenarios: {e}")
+                return False
+            if new_version is None:
+                return False
+            self._record_write(new_version)
+            scenario = self._by_id.get(scenario_id)
+            if scenario is not None:
+                self._unindex_scenario(scenario)
                 scenario['category'] = new_category
-                return self._save_scenarios()
-        return False
+                self._index_scenario(scenario)
+        return True
+
+    def clear_scenarios(self) -> bool:
+        """Delete every custom scenario."""
+        with self._lock:
+            try:
+                self._record_write(self.store.clear())
+            except Exception as e:
+                st.error(f"Could not save scenarios: {e}")
+                return False
+            self._rebuild_index([])
+        return True
+
+
+_shared_managers = {}
+_shared_managers_lock = threading.Lock()
+
+
+def get_shared_manager(storage_file: str = DEFAULT_DB_FILE) -> ScenarioManager:
+    """
+    Return the process-wide ScenarioManager for a library.
+
+    Every Streamlit session and rerun shares one instance. It only reloads
+    from storage when the library version has changed, instead of re-reading
+    the whole library on each construction.
+    """
+    with _shared_managers_lock:
+        manager = _shared_managers.get(storage_file)
+        if manager is None:
+            manager = _shared_managers[storage_file] = ScenarioManager(storage_file)
+            return manager
+    manager.refresh()
+    return manager
 
 
 def display_extraction_interface(transcript: str, client, model_name: str):
@@ -283,7 +618,7 @@ def display_extraction_interface(transcript: str, client, model_name: str):
     st.subheader("📚 Extract Practice Scenarios")
     st.write("Extract client statements from this transcript to add to your practice library.")
 
-    manager = ScenarioManager()
+    manager = get_shared_manager()
 
     # Show current library stats
     stats = manager.get_stats()
@@ -295,13 +630,28 @@ def display_extraction_interface(transcript: str, client, model_name: str):
     with col3:
         st.metric("Avg Quality", stats['avg_quality'])
 
+    col1, col2 = st.columns(2)
+    with col1:
+        skip_duplicates = st.checkbox("Skip near-duplicates", value=True,
+                                      help="Leave out statements already in your library or repeated in this transcript")
+    with col2:
+        duplicate_threshold = st.slider("Duplicate similarity", MIN_DUPLICATE_THRESHOLD, 1.0, DEFAULT_DUPLICATE_THRESHOLD, 0.05,
+                                        help="How similar (word overlap) two statements must be to count as duplicates")
+
     if st.button("🔍 Extract Scenarios from This Transcript", key="extract_btn"):
         with st.spinner("Extracting client statements..."):
             # Extract statements
             statements = manager.extract_client_statements(transcript)
+            manager.flag_duplicates(statements, duplicate_threshold)
+            if skip_duplicates:
+                unique = [s for s in statements if 'duplicate_of' not in s]
+                skipped = len(statements) - len(unique)
+                statements = unique
+                if skipped:
+                    st.info(f"Skipped {skipped} near-duplicate statements")
 
             if not statements:
-                st.warning("No substantive client statements found in transcript.")
+                st.warning("No new substantive client statements found in transcript.")
                 return
 
             st.success(f"Found {len(statements)} potential scenarios!")
@@ -319,7 +669,19 @@ def display_extraction_interface(transcript: str, client, model_name: str):
         if st.button("🤖 Auto-Categorize with AI", key="categorize_btn"):
             with st.spinner("AI is categorizing scenarios..."):
                 statements = st.session_state.extracted_scenarios
-                categorized = manager.categorize_scenarios_with_ai(statements, client, model_name)
+                try:
+                    categorized = manager.categorize_scenarios_with_ai(statements, client, model_name)
+                except Exception as e:
+                    if not (is_rate_limit_error(e) or is_quota_error(e)):
+                        raise
+                    categorized = None
+                    if is_quota_error(e):
+                        st.error("❌ The AI provider says your account is out of quota. Check your plan and billing.")
+                    else:
+                        # Finished requests are in the response cache, so a retry picks up where this stopped
+                        st.error("❌ Still rate limited after several minutes of retrying. Try again shortly: "
+                                 "statements already categorized will not be sent again.")
+            if categorized is not None:
                 st.session_state.categorized_scenarios = categorized
                 st.success("Categorization complete!")
                 st.rerun()  # Refresh to show categorized scenarios
@@ -347,14 +709,20 @@ def display_extraction_interface(transcript: str, client, model_name: str):
 
                     st.markdown(f"**AI Assessment:** {scenario.get('reason', 'N/A')}")
 
+                    duplicate = scenario.get('duplicate_of')
+                    if duplicate:
+                        where = "your library" if duplicate['source'] == 'library' else f"line {duplicate['line_number']}"
+                        st.warning(f"Possible duplicate ({duplicate['similarity']:.0%} similar to {where}): "
+                                   f"_{duplicate['statement'][:120]}_")
+
                     col1, col2 = st.columns([1, 3])
 
                     with col1:
                         # Allow category override
                         new_category = st.selectbox(
                             "Category",
-                            ["Career", "Leadership", "Relationship", "Self Improvement", "Value System"],
-                            index=["Career", "Leadership", "Relationship", "Self Improvement", "Value System"].index(scenario['category']),
+                            CATEGORIES,
+                            index=CATEGORIES.index(scenario['category']) if scenario['category'] in CATEGORIES else CATEGORIES.index('Self Improvement'),
                             key=f"cat_{i}"
                         )
 
@@ -372,10 +740,7 @@ def display_extraction_interface(transcript: str, client, model_name: str):
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("✅ Approve All"):
-                    count = 0
-                    for scenario in filtered_scenarios:
-                        if manager.add_scenario(scenario):
-                            count += 1
+                    count = manager.add_scenarios(filtered_scenarios)
                     st.success(f"Added {count} scenarios to library!")
                     st.session_state.reviewing_scenarios = False
                     st.rerun()
@@ -390,7 +755,7 @@ def display_library_manager():
     """Display interface for managing the custom scenario library."""
     st.subheader("📚 Scenario Library Manager")
 
-    manager = ScenarioManager()
+    manager = get_shared_manager()
     stats = manager.get_stats()
 
     if stats['total'] == 0:
@@ -421,8 +786,7 @@ def display_library_manager():
     st.markdown("### Export Options")
 
     if st.button("💾 Export Library as JSON"):
-        with open(manager.storage_file, 'r') as f:
-            data = f.read()
+        data = json.dumps(manager.scenarios, indent=2)
 
         st.download_button(
             label="Download custom_scenarios.json",
@@ -436,7 +800,6 @@ def display_library_manager():
     st.markdown("### Danger Zone")
     if st.button("🗑️ Clear All Custom Scenarios", type="secondary"):
         if st.button("⚠️ Confirm Delete All", type="primary"):
-            manager.scenarios = []
-            manager._save_scenarios()
+            manager.clear_scenarios()
             st.success("Library cleared!")
             st.rerun()
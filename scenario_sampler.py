@@ -0,0 +1,213 @@
+"""
+Scenario Sampler - Precomputed per-category index for O(1) random scenario draws
+"""
+
+import itertools
+import random
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+CUSTOM_PRIORITY = 0.70
+# Custom row changes kept for changes_since(); older readers start over
+MAX_CUSTOM_CHANGES = 10000
+
+_index_generations = itertools.count(1)
+
+
+class ScenarioIndex:
+    """
+    Workbook rows and custom scenario rows for every category.
+
+    Workbook rows are converted to records once. Custom rows live in a list per
+    category with an id -> position map, and sync() applies only the library
+    changes since the previous sync, so the workbook frames are never widened,
+    concatenated or copied when custom scenarios are added, deleted or
+    recategorized.
+    """
+
+    def __init__(self, data: Dict[str, pd.DataFrame]):
+        self.data = data
+        self.categories = list(data.keys())
+        self.library_records: Dict[str, List[Dict]] = {
+            category: df.to_dict('records') for category, df in data.items()
+        }
+        self.custom_records: Dict[str, List[Dict]] = {category: [] for category in self.categories}
+        self.custom_versions: Dict[str, int] = {category: 0 for category in self.categories}
+        self._custom_slots: Dict[str, Dict[str, int]] = {category: {} for category in self.categories}
+        self._cursor = None
+        self.generation = next(_index_generations)  # unique per index, unlike id()
+        self.version = 0  # bumped on every custom row change
+        self._changes: List[tuple] = []  # the changes that took version from _changes_from to version
+        self._changes_from = 0
+        self.lock = threading.RLock()
+
+    def sync(self, manager) -> bool:
+        """
+        Apply custom library changes from a ScenarioManager.
+
+        Returns:
+            True if any custom rows changed
+        """
+        with self.lock:
+            self._cursor, changes, reset = manager.bank_changes_since(self._cursor)
+            if reset:
+                for category in list(self.custom_records):
+                    self._clear_custom(category)
+            for op, category, payload in changes:
+                if op == 'add':
+                    self._add_custom(category, payload)
+                else:
+                    self._remove_custom(category, payload)
+            return reset or bool(changes)
+
+    def changes_since(self, version: int) -> Optional[List[tuple]]:
+        """
+        Custom row changes since a version, for indexes kept in step with this one.
+
+        Returns:
+            ('add', category, record) and ('remove', category, scenario_id)
+            tuples in order, or None if they are no longer known (the custom
+            rows were reloaded or too much changed) and the caller must diff
+            everything
+        """
+        with self.lock:
+            if not self._changes_from <= version <= self.version:
+                return None
+            return self._changes[version - self._changes_from:]
+
+    def _log_change(self, op: str, category: str, payload):
+        self.version += 1
+        self._changes.append((op, category, payload))
+        if len(self._changes) > MAX_CUSTOM_CHANGES:
+            self._forget_changes()
+
+    def _forget_changes(self):
+        self._changes = []
+        self._changes_from = self.version
+
+    def _add_custom(self, category: str, record: Dict):
+        if category not in self.custom_records:
+            self.categories.append(category)
+            self.library_records[category] = []
+            self.custom_records[category] = []
+            self.custom_versions[category] = 0
+            self._custom_slots[category] = {}
+        self._custom_slots[category][record['ID']] = len(self.custom_records[category])
+        self.custom_records[category].append(record)
+        self.custom_versions[category] += 1
+        self._log_change('add', category, record)
+
+    def _remove_custom(self, category: str, scenario_id: str):
+        """Swap-remove a custom row in O(1)."""
+        slots = self._custom_slots.get(category, {})
+        position = slots.pop(scenario_id, None)
+        if position is None:
+            return
+        records = self.custom_records[category]
+        last = records.pop()
+        if position < len(records):
+            records[position] = last
+            slots[last['ID']] = position
+        self.custom_versions[category] += 1
+        self._log_change('remove', category, scenario_id)
+        self._drop_if_empty(category)
+
+    def _clear_custom(self, category: str):
+        if self.custom_records[category]:
+            self.custom_records[category] = []
+            self._custom_slots[category] = {}
+            self.custom_versions[category] += 1
+            self.version += 1
+            self._forget_changes()
+        self._drop_if_empty(category)
+
+    def _drop_if_empty(self, category: str):
+        """Forget a category that only existed for custom rows once they are gone."""
+        if category not in self.data and not self.custom_records[category]:
+            self.categories.remove(category)
+            for table in (self.library_records, self.custom_records, self.custom_versions, self._custom_slots):
+                del table[category]
+
+    def counts(self, category: str) -> Tuple[int, int]:
+        """Return (total, custom) scenario counts for a category."""
+        with self.lock:
+            custom = len(self.custom_records.get(category, ()))
+            return len(self.library_records.get(category, ())) + custom, custom
+
+
+class _ShufflePool:
+    """
+    Lazy Fisher-Yates shuffle over a fixed array of row positions.
+
+    Each draw is O(1) and only the swapped slots are stored, so no position
+    repeats until the pool is exhausted, after which it starts over.
+    """
+
+    def __init__(self, positions: np.ndarray):
+        self.positions = positions
+        self.remaining = len(positions)
+        self.swaps: Dict[int, int] = {}
+
+    def draw(self, rng: random.Random) -> int:
+        if self.remaining == 0:
+            self.remaining = len(self.positions)
+            self.swaps.clear()
+        j = rng.randrange(self.remaining)
+        last = self.remaining - 1
+        picked = self.swaps.get(j, j)
+        self.swaps[j] = self.swaps.pop(last, last)
+        self.remaining = last
+        return int(self.positions[picked])
+
+
+class ScenarioSampler:
+    """
+    Per-session scenario draws over a ScenarioIndex.
+
+    When the category has custom scenarios (from real transcripts), 70% of
+    draws pick one of them; the rest pick from all of the category's rows,
+    custom ones included. Custom and workbook rows are each drawn from one
+    shuffle pool, shared by both kinds of draw, so no custom scenario repeats
+    until every custom one has been shown, and likewise for workbook ones.
+    Custom rows cycle faster than workbook rows because of their priority, so
+    a custom scenario can come back before the whole category has been shown.
+    Passing a seed makes the sequence reproducible.
+    """
+
+    def __init__(self, index: ScenarioIndex, seed: Optional[int] = None,
+                 custom_priority: float = CUSTOM_PRIORITY):
+        self.index = index
+        self.custom_priority = custom_priority
+        self._rng = random.Random(seed)
+        self._pools: Dict[Tuple[str, bool], Tuple[int, _ShufflePool]] = {}
+
+    def _pool(self, category: str, custom: bool) -> _ShufflePool:
+        """Shuffle pool for a category; custom pools restart when the custom rows change."""
+        key = (category, custom)
+        version = self.index.custom_versions[category] if custom else 0
+        entry = self._pools.get(key)
+        if entry is None or entry[0] != version:
+            records = (self.index.custom_records if custom else self.index.library_records)[category]
+            entry = (version, _ShufflePool(np.arange(len(records))))
+            self._pools[key] = entry
+        return entry[1]
+
+    def draw(self, category: str) -> Optional[Dict]:
+        """Return one scenario record for the category, or None if it is empty."""
+        with self.index.lock:
+            if category not in self.index.custom_records:
+                return None
+            n_custom = len(self.index.custom_records[category])
+            n_library = len(self.index.library_records[category])
+            if not (n_custom or n_library):
+                return None
+
+            use_custom = n_custom > 0 and self._rng.random() < self.custom_priority
+            if not use_custom:
+                # A pick from all rows lands on a custom one in proportion to their share
+                use_custom = self._rng.randrange(n_custom + n_library) < n_custom
+            position = self._pool(category, use_custom).draw(self._rng)
+            records = self.index.custom_records if use_custom else self.index.library_records
+            return records[category][position]
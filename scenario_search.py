@@ -0,0 +1,367 @@
+"""
+Scenario Search - TF-IDF similar-scenario retrieval over the scenario bank
+
+Each scenario is a sparse TF-IDF vector over the words of its client
+statement plus one tag per ICF competency its example coach responses
+practice, e.g. "(Competency 7: Evokes Awareness)". Vectors are kept as an
+inverted index (term -> rows, weights), so a query only touches the rows that
+share a term with it: one np.bincount over those postings, then
+np.argpartition for the top k.
+
+The index is saved to scenario_vectors.pkl and synced with the scenario bank
+by replaying its custom row changes, or, for a new workbook, by diffing
+scenario keys and content fingerprints, so a library change only tokenizes
+the scenarios that changed. The inverted arrays are then re-sorted
+in one vectorized pass on the next query.
+"""
+
+import hashlib
+import math
+import os
+import pickle
+import re
+import tempfile
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+INDEX_SCHEMA_VERSION = 1
+DEFAULT_INDEX_FILE = "scenario_vectors.pkl"
+
+TEXT_COLUMN = 'Client Question / Scenario'
+RESPONSE_COLUMNS = ('Coach Response 1', 'Coach Response 2', 'Coach Response 3')
+
+ICF_COMPETENCIES = [
+    "Demonstrates Ethical Practice",
+    "Embodies a Coaching Mindset",
+    "Establishes and Maintains Agreements",
+    "Cultivates Trust and Safety",
+    "Maintains Presence",
+    "Listens Actively",
+    "Evokes Awareness",
+    "Facilitates Client Growth",
+]
+
+STOP_WORDS = frozenset("""
+a about am an and are as at be been but by can could did do does doing for from had has
+have having he her him his how i i'd i'll i'm i've if in into is it it's its just me my
+myself of on or our so than that the their them then there they this to too very was we
+were what when where which who why will with would you your
+""".split())
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+_COMPETENCY_RE = re.compile(r"\(Competency\s*\d*\s*:?\s*([^)]+)\)", re.IGNORECASE)
+
+ScenarioKey = Tuple[str, str]
+
+
+def scenario_key(category: str, record: Dict) -> ScenarioKey:
+    """Stable key for a scenario bank row (workbook IDs are only unique per sheet)."""
+    return (category, str(record['ID']))
+
+
+def competency_tag(name: str) -> str:
+    """Index term standing for an ICF competency."""
+    return "competency:" + "_".join(name.lower().split())
+
+
+def scenario_terms(record: Dict) -> Counter:
+    """Term counts for a scenario: statement words plus competency tags from its example responses."""
+    terms = Counter(
+        word for word in _WORD_RE.findall(str(record.get(TEXT_COLUMN, '')).lower())
+        if len(word) > 1 and word not in STOP_WORDS
+    )
+    for column in RESPONSE_COLUMNS:
+        response = record.get(column)
+        if isinstance(response, str):
+            terms.update(competency_tag(name) for name in _COMPETENCY_RE.findall(response))
+    return terms
+
+
+def _fingerprint(record: Dict) -> str:
+    parts = [str(record.get(TEXT_COLUMN, ''))] + [str(record.get(c, '')) for c in RESPONSE_COLUMNS]
+    return hashlib.blake2b("\x1f".join(parts).encode('utf-8'), digest_size=8).hexdigest()
+
+
+class SimilarityIndex:
+    """
+    Incrementally maintained TF-IDF k-NN index over scenario bank rows.
+
+    Rows are appended as scenarios are added and tombstoned when removed;
+    the row table is compacted once a quarter of it is dead. IDF weights and
+    row norms are recomputed from the live rows whenever the index changed,
+    so scores are exact cosine similarities over the current bank.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._vocab: Dict[str, int] = {}
+        self._categories: Dict[str, int] = {}
+        self.keys: List[Optional[ScenarioKey]] = []
+        self.records: List[Optional[Dict]] = []
+        self._rows: Dict[ScenarioKey, int] = {}
+        self._fingerprints: Dict[ScenarioKey, str] = {}
+        self._row_category: List[int] = []
+        self._alive: List[bool] = []
+        # COO triples (row, term, 1 + log tf), appended in chunks
+        self._coo: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._compiled = None
+        self._synced = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: ScenarioKey) -> bool:
+        return key in self._rows
+
+    # --- Updates ---
+
+    def add_many(self, items: Iterable[Tuple[ScenarioKey, Dict]]):
+        """Vectorize and add (key, record) pairs; existing keys are replaced."""
+        items = list(items)
+        rows, terms, weights = [], [], []
+        with self.lock:
+            # Remove replaced keys first: a removal may compact and renumber rows
+            for key, _ in items:
+                self.remove(key)
+            for key, record in items:
+                row = len(self.keys)
+                self.keys.append(key)
+                self.records.append(record)
+                self._rows[key] = row
+                self._fingerprints[key] = _fingerprint(record)
+                self._row_category.append(self._categories.setdefault(key[0], len(self._categories)))
+                self._alive.append(True)
+                for term, count in scenario_terms(record).items():
+                    rows.append(row)
+                    terms.append(self._vocab.setdefault(term, len(self._vocab)))
+                    weights.append(1.0 + math.log(count))
+            if rows:
+                self._coo.append((np.array(rows, dtype=np.int32), np.array(terms, dtype=np.int32),
+                                  np.array(weights, dtype=np.float32)))
+            self._compiled = None
+
+    def remove(self, key: ScenarioKey):
+        """Tombstone a scenario; unknown keys are ignored."""
+        with self.lock:
+            row = self._rows.pop(key, None)
+            if row is None:
+                return
+            del self._fingerprints[key]
+            self._alive[row] = False
+            self.keys[row] = None
+            self.records[row] = None
+            self._compiled = None
+            if len(self._rows) < 0.75 * len(self.keys):
+                self._compact()
+
+    def _compact(self):
+        """Drop dead rows and renumber the live ones."""
+        alive = np.array(self._alive, dtype=bool)
+        new_row = np.cumsum(alive, dtype=np.int64) - 1
+        if self._coo:
+            rows, terms, weights = (np.concatenate(parts) for parts in zip(*self._coo))
+            keep = alive[rows]
+            self._coo = [(new_row[rows[keep]].astype(np.int32), terms[keep], weights[keep])]
+        live = np.flatnonzero(alive)
+        self.keys = [self.keys[i] for i in live]
+        self.records = [self.records[i] for i in live]
+        self._row_category = [self._row_category[i] for i in live]
+        self._alive = [True] * len(live)
+        self._rows = {key: row for row, key in enumerate(self.keys)}
+
+    def sync(self, scenario_index) -> bool:
+        """
+        Bring the index in line with a ScenarioIndex (workbook plus custom rows).
+
+        Custom rows added or removed since the last sync with the same
+        ScenarioIndex are applied directly. Otherwise (first sync, new
+        workbook, reloaded library) every row is diffed against the stored
+        fingerprints, and only scenarios whose key is new or whose text
+        changed are vectorized.
+
+        Returns:
+            True if the index changed
+        """
+        with self.lock, scenario_index.lock:
+            token = (scenario_index.generation, scenario_index.version)
+            if token == self._synced:
+                return False
+            changes = None
+            if self._synced is not None and self._synced[0] == token[0]:
+                changes = scenario_index.changes_since(self._synced[1])
+            if changes is not None:
+                self._apply_changes(changes)
+                self._synced = token
+                return True
+            current = {}
+            for table in (scenario_index.library_records, scenario_index.custom_records):
+                for category, records in table.items():
+                    for record in records:
+                        current[scenario_key(category, record)] = record
+            stale = [key for key in self._rows if key not in current]
+            fresh = [(key, record) for key, record in current.items()
+                     if self._fingerprints.get(key) != _fingerprint(record)]
+            for key in stale:
+                self.remove(key)
+            self.add_many(fresh)
+            # Unchanged rows may be new record objects (e.g. after a reload)
+            for key, row in self._rows.items():
+                self.records[row] = current[key]
+            self._synced = token
+            return bool(stale or fresh)
+
+    def _apply_changes(self, changes: List[tuple]):
+        """Apply ScenarioIndex.changes_since() output, keeping only each key's last change."""
+        latest: Dict[ScenarioKey, Optional[Dict]] = {}
+        for op, category, payload in changes:
+            if op == 'add':
+                latest[scenario_key(category, payload)] = payload
+            else:
+                latest[(category, str(payload))] = None
+        for key, record in latest.items():
+            if record is None:
+                self.remove(key)
+        self.add_many((key, record) for key, record in latest.items() if record is not None)
+
+    # --- Queries ---
+
+    def _compile(self):
+        """Recompute IDF, row norms and the term-sorted postings from the live rows."""
+        n_rows, n_terms = len(self.keys), len(self._vocab)
+        if self._coo:
+            rows, terms, weights = (np.concatenate(parts) for parts in zip(*self._coo))
+        else:
+            rows = terms = np.zeros(0, dtype=np.int32)
+            weights = np.zeros(0, dtype=np.float32)
+        alive = np.array(self._alive, dtype=bool)
+        keep = alive[rows]
+        rows, terms, weights = rows[keep], terms[keep], weights[keep]
+
+        df = np.bincount(terms, minlength=n_terms)
+        idf = (np.log((1 + len(self._rows)) / (1 + df)) + 1).astype(np.float32)
+        weights = weights * idf[terms]
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n_rows)).astype(np.float32)
+        weights = weights / np.where(norms > 0, norms, 1)[rows]
+
+        order = np.argsort(terms, kind='stable')
+        indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(df, out=indptr[1:])
+        self._compiled = {
+            'idf': idf,
+            'indptr': indptr,
+            'rows': rows[order],
+            'weights': weights[order],
+            'alive': alive,
+            'category': np.array(self._row_category, dtype=np.int32),
+        }
+        return self._compiled
+
+    def query_terms(self, terms: Dict[str, float], k: int = 5, category: Optional[str] = None,
+                    exclude: Iterable[ScenarioKey] = ()) -> List[Tuple[ScenarioKey, float, Dict]]:
+        """
+        Top-k scenarios by cosine similarity to a bag of terms.
+
+        Args:
+            terms: Term -> count (see scenario_terms)
+            k: Number of results
+            category: Only return scenarios from this category
+            exclude: Keys to leave out (e.g. the current or already seen scenarios)
+
+        Returns:
+            (key, similarity, record) tuples, most similar first; rows with no
+            term in common with the query are never returned
+        """
+        with self.lock:
+            index = self._compiled or self._compile()
+            term_ids = [(self._vocab[t], 1.0 + math.log(c)) for t, c in terms.items() if t in self._vocab and c > 0]
+            if not term_ids or k <= 0:
+                return []
+            q = np.array([w for _, w in term_ids], dtype=np.float32) * index['idf'][[t for t, _ in term_ids]]
+            q /= np.linalg.norm(q) or 1
+
+            indptr = index['indptr']
+            slices = [slice(indptr[t], indptr[t + 1]) for t, _ in term_ids]
+            rows = np.concatenate([index['rows'][s] for s in slices])
+            weights = np.concatenate([index['weights'][s] * qw for s, qw in zip(slices, q)])
+            scores = np.bincount(rows, weights=weights, minlength=len(self.keys))
+
+            candidates = np.flatnonzero(scores > 0)
+            if category is not None:
+                code = self._categories.get(category)
+                if code is None:
+                    return []
+                candidates = candidates[index['category'][candidates] == code]
+            excluded = [self._rows[key] for key in exclude if key in self._rows]
+            if excluded:
+                candidates = candidates[~np.isin(candidates, excluded)]
+            if len(candidates) > k:
+                top = np.argpartition(-scores[candidates], k - 1)[:k]
+                candidates = candidates[top]
+            candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+            return [(self.keys[row], float(scores[row]), self.records[row]) for row in candidates]
+
+    def similar_to(self, key: ScenarioKey, k: int = 5, category: Optional[str] = None,
+                   exclude: Iterable[ScenarioKey] = ()) -> List[Tuple[ScenarioKey, float, Dict]]:
+        """Top-k scenarios most similar to an indexed scenario (never the scenario itself)."""
+        with self.lock:
+            row = self._rows.get(key)
+            if row is None:
+                return []
+            return self.query_terms(scenario_terms(self.records[row]), k, category, [key, *exclude])
+
+    def for_competency(self, competency: str, k: int = 5, category: Optional[str] = None,
+                       exclude: Iterable[ScenarioKey] = ()) -> List[Tuple[ScenarioKey, float, Dict]]:
+        """Top-k scenarios whose example responses practice an ICF competency."""
+        return self.query_terms({competency_tag(competency): 1}, k, category, exclude)
+
+    # --- Persistence ---
+
+    def save(self, index_file: str = DEFAULT_INDEX_FILE):
+        """Write the index atomically (temp file + rename)."""
+        with self.lock:
+            payload = {
+                'schema_version': INDEX_SCHEMA_VERSION,
+                'vocab': self._vocab,
+                'categories': self._categories,
+                'keys': self.keys,
+                'records': self.records,
+                'fingerprints': self._fingerprints,
+                'row_category': self._row_category,
+                'alive': self._alive,
+                'coo': self._coo,
+            }
+            directory = os.path.dirname(os.path.abspath(index_file))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, index_file)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    @classmethod
+    def load(cls, index_file: str = DEFAULT_INDEX_FILE) -> 'SimilarityIndex':
+        """Load a saved index, or return an empty one if it is missing, unreadable or outdated."""
+        index = cls()
+        try:
+            with open(index_file, 'rb') as f:
+                payload = pickle.load(f)
+        except Exception:
+            return index
+        if not isinstance(payload, dict) or payload.get('schema_version') != INDEX_SCHEMA_VERSION:
+            return index
+
+        index._vocab = payload['vocab']
+        index._categories = payload['categories']
+        index.keys = payload['keys']
+        index.records = payload['records']
+        index._fingerprints = payload['fingerprints']
+        index._row_category = payload['row_category']
+        index._alive = payload['alive']
+        index._coo = payload['coo']
+        index._rows = {key: row for row, key in enumerate(index.keys) if key is not None}
+        return index
@@ -0,0 +1,185 @@
+"""
+Scenario Store - Transactional SQLite storage for the custom scenario library
+
+Each scenario is one row, so adding a scenario is a single INSERT instead of
+rewriting the whole library, and every write is an atomic, durable
+transaction (WAL journal, synchronous=FULL). Writes from any number of
+Streamlit sessions or worker processes are serialized by SQLite's write lock
+(BEGIN IMMEDIATE with a busy timeout), so none are lost. A version counter in the meta
+table is bumped by every write so readers can cheaply tell when the library
+changed. The legacy JSON library next to the database (custom_scenarios.json
+for custom_scenarios.db) is imported once, the first time the database is
+opened.
+"""
+
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_DB_FILE = "custom_scenarios.db"
+
+
+def new_scenario_id() -> str:
+    """
+    Generate a collision-free, time-ordered scenario ID (UUIDv7 layout).
+
+    48 bits of millisecond timestamp followed by 74 random bits, so IDs from
+    different sessions and processes never collide and still sort by creation
+    time (to the millisecond).
+    """
+    millis = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), 'big')
+    value = (
+        (millis & ((1 << 48) - 1)) << 80
+        | 0x7 << 76                                   # version 7
+        | ((rand >> 62) & 0xFFF) << 64
+        | 0b10 << 62                                  # RFC 4122 variant
+        | (rand & ((1 << 62) - 1))
+    )
+    return f"custom_{uuid.UUID(int=value)}"
+
+
+def legacy_json_path(db_file: str) -> str:
+    """Path of the JSON library a database imports from (same name, .json)."""
+    return os.path.splitext(db_file)[0] + '.json'
+
+
+class ScenarioStore:
+    """SQLite-backed storage for custom scenarios."""
+
+    def __init__(self, db_file: str = DEFAULT_DB_FILE, import_json: bool = True):
+        self.db_file = db_file
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS scenarios (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT UNIQUE NOT NULL,
+                    data TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('library_id', ?)", (uuid.uuid4().hex,))
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('version', '0')")
+        finally:
+            conn.close()
+        if import_json:
+            self._import_legacy_json(legacy_json_path(db_file))
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Run the block in one write transaction: COMMIT on success, ROLLBACK on error."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _read_version(conn: sqlite3.Connection) -> tuple:
+        meta = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('library_id', 'version')"))
+        return (meta['library_id'], int(meta['version']))
+
+    @classmethod
+    def _bump_version(cls, conn: sqlite3.Connection) -> tuple:
+        conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'version'")
+        return cls._read_version(conn)
+
+    def _import_legacy_json(self, json_file: str):
+        """Copy scenarios from the old JSON library, once per database."""
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone():
+                return
+            if os.path.exists(json_file):
+                with open(json_file, 'r') as f:
+                    scenarios = json.load(f)
+                conn.executemany(
+                    "INSERT OR IGNORE INTO scenarios (id, data) VALUES (?, ?)",
+                    [(s['id'], json.dumps(s)) for s in scenarios if s.get('id')]
+                )
+                self._bump_version(conn)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('json_imported', ?)", (json_file,))
+
+    def load_all(self) -> Tuple[List[Dict], tuple]:
+        """Return every scenario in insertion order, with the version they were read at."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN")
+            scenarios = [json.loads(row[0]) for row in conn.execute("SELECT data FROM scenarios ORDER BY seq")]
+            version = self._read_version(conn)
+            conn.execute("COMMIT")
+            return scenarios, version
+        finally:
+            conn.close()
+
+    def insert_many(self, scenarios: List[Dict]) -> tuple:
+        """Insert scenarios (each with an 'id') in a single transaction; returns the new version."""
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO scenarios (id, data) VALUES (?, ?)",
+                [(s['id'], json.dumps(s)) for s in scenarios]
+            )
+            return self._bump_version(conn)
+
+    def delete(self, scenario_id: str) -> Optional[tuple]:
+        """Delete a scenario by ID; returns the new version, or None if it did not exist."""
+        with self._transaction() as conn:
+            if not conn.execute("DELETE FROM scenarios WHERE id = ?", (scenario_id,)).rowcount:
+                return None
+            return self._bump_version(conn)
+
+    def update(self, scenario_id: str, changes: Dict) -> Optional[tuple]:
+        """Apply field changes to a scenario; returns the new version, or None if it did not exist."""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM scenarios WHERE id = ?", (scenario_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE scenarios SET data = ? WHERE id = ?",
+                (json.dumps({**json.loads(row[0]), **changes}), scenario_id)
+            )
+            return self._bump_version(conn)
+
+    def clear(self) -> tuple:
+        """Delete every scenario; returns the new version."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM scenarios")
+            return self._bump_version(conn)
+
+
+def get_store_version(db_file: str = DEFAULT_DB_FILE) -> tuple:
+    """
+    Cheap version stamp for a library without opening it for writing.
+
+    Falls back to the legacy JSON file's mtime/size before the database exists.
+    """
+    if not os.path.exists(db_file):
+        try:
+            stat = os.stat(legacy_json_path(db_file))
+        except OSError:
+            return ('', 0)
+        return ('json', stat.st_mtime_ns, stat.st_size)
+    conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True, timeout=30)
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('library_id', 'version')"))
+    except sqlite3.Error:
+        return ('', 0)
+    finally:
+        conn.close()
+    return (meta.get('library_id', ''), int(meta.get('version', 0)))
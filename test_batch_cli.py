@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Test script for checkpoint/resume in the batch scoring CLI (main.py).
+
+Scores a small cohort through a stub client that answers instantly, with no
+workbook or model needed, and checks that:
+  - a run interrupted partway (Ctrl-C) and then resumed writes every row
+    exactly once, all scored successfully,
+  - a torn last checkpoint line is dropped on resume and its row re-scored.
+"""
+
+import _thread
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import main
+
+ROWS = 12
+INTERRUPT_AFTER = 4
+FEEDBACK = "**Strengths:** Reflected the client's words.\n**Areas for Growth:** Ask one open question."
+
+
+class StubClient:
+    """Answers every chat completion with FEEDBACK, interrupting the run once after INTERRUPT_AFTER calls."""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=self)
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.interrupt = False
+
+    def create(self, model, messages, **kwargs):
+        time.sleep(0.02)
+        prompt = messages[0]['content']
+        with self.lock:
+            scored = next((f"r{i}" for i in range(ROWS) if f"coach response r{i}." in prompt), None)
+            self.calls[scored] += 1
+            if self.interrupt and sum(self.calls.values()) == INTERRUPT_AFTER:
+                self.interrupt = False
+                _thread.interrupt_main()  # as if Ctrl-C were pressed
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=FEEDBACK))], usage=None)
+
+
+def written(path):
+    """Result records in an output file (every line must be complete JSON)."""
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def run(path):
+    return main.main([input_path, "-o", path, "--provider", "openai", "--model", "stub-model",
+                      "--concurrency", "2", "--no-cache"])
+
+
+client = StubClient()
+main.make_client = lambda args: client
+main.build_scenario_lookup = lambda workbook_file: {
+    f"s{i}": ("Career", {'ID': f"s{i}", main.TEXT_COLUMN: f"Client statement {i}"}) for i in range(ROWS)
+}
+failures = []
+
+with tempfile.TemporaryDirectory() as tmp:
+    input_path = os.path.join(tmp, "responses.jsonl")
+    output_path = os.path.join(tmp, "results.jsonl")
+    with open(input_path, 'w', encoding='utf-8') as f:
+        for i in range(ROWS):
+            f.write(json.dumps({'id': f"r{i}", 'scenario_id': f"s{i}",
+                                'response': f"This is coach response r{i}."}) + "\n")
+
+    print(f"🧪 Scoring {ROWS} responses, interrupted after {INTERRUPT_AFTER} model calls")
+    client.interrupt = True
+    run(output_path)
+    first = written(output_path)
+    print(f"\n📄 Interrupted run: {len(first)}/{ROWS} results checkpointed")
+    if client.interrupt:
+        failures.append("the run finished before it could be interrupted")
+    if not 0 < len(first) < ROWS:
+        failures.append(f"interrupted run wrote {len(first)} results, expected some but not all")
+
+    run(output_path)
+    ids = Counter(result['id'] for result in written(output_path))
+    repeated = sorted(row for row, count in ids.items() if count > 1)
+    statuses = Counter(result['status'] for result in written(output_path))
+    print(f"📄 Resumed run: {len(ids)}/{ROWS} rows, {statuses['ok']} ok, repeated: {repeated or 'none'}")
+    if len(ids) != ROWS or repeated:
+        failures.append(f"after resuming, {len(ids)} distinct rows and {repeated} written more than once")
+    if statuses['ok'] != ROWS:
+        failures.append(f"after resuming, {statuses['ok']} of {ROWS} rows scored ok")
+
+    # Tear the last result in half, as a crash mid-write would
+    with open(output_path, encoding='utf-8') as f:
+        lines = f.readlines()
+    torn = json.loads(lines[-1])['id']
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.writelines(lines[:-1])
+        f.write(lines[-1][:len(lines[-1]) // 2])
+    calls_before = client.calls[torn]
+    run(output_path)
+    results = written(output_path)
+    ids = Counter(result['id'] for result in results)
+    print(f"📄 Torn last line ({torn}): re-scored {client.calls[torn] - calls_before} time(s), "
+          f"{len(results)} complete lines, {len(ids)}/{ROWS} rows")
+    if client.calls[torn] != calls_before + 1:
+        failures.append(f"torn row {torn} was scored {client.calls[torn] - calls_before} times on resume, expected 1")
+    if len(results) != ROWS or len(ids) != ROWS:
+        failures.append(f"after the torn resume, {len(results)} lines for {len(ids)} distinct rows")
+
+if failures:
+    print(f"\n❌ FAILED: {'; '.join(failures)}")
+    sys.exit(1)
+print("\n✅ Interrupted and torn runs resume with every row written exactly once")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Stress test: many writer processes sharing one scenario library.
+
+Each worker process opens its own ScenarioManager on the same database and
+mixes single adds, bulk adds (as "Approve All" does), recategorizations and
+deletes. Afterwards every surviving scenario must be present exactly once
+with its final category, i.e. no write was lost and no ID collided.
+
+Usage:
+    python test_concurrent_writes.py
+    python test_concurrent_writes.py --workers 16 --rounds 50
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+
+from scenario_manager import ScenarioManager
+
+
+def writer(db_file, worker, rounds):
+    """Add, bulk-add, update and delete scenarios; return the IDs expected to survive."""
+    manager = ScenarioManager(db_file, import_json=False)
+    expected = {}
+    for r in range(rounds):
+        single = {'statement': f"worker {worker} round {r} single", 'category': 'Career', 'quality_score': 5}
+        bulk = [
+            {'statement': f"worker {worker} round {r} bulk {b}", 'category': 'Career', 'quality_score': 7}
+            for b in range(3)
+        ]
+        if not manager.add_scenario(single) or manager.add_scenarios(bulk) != len(bulk):
+            raise RuntimeError(f"worker {worker}: write failed in round {r}")
+
+        # Recategorize one of the bulk scenarios and delete another
+        if not manager.update_scenario_category(bulk[0]['id'], 'Leadership'):
+            raise RuntimeError(f"worker {worker}: update lost in round {r}")
+        if not manager.delete_scenario(bulk[1]['id']):
+            raise RuntimeError(f"worker {worker}: delete lost in round {r}")
+
+        expected[single['id']] = 'Career'
+        expected[bulk[0]['id']] = 'Leadership'
+        expected[bulk[2]['id']] = 'Career'
+    return expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent writer processes")
+    parser.add_argument("--rounds", type=int, default=25, help="Write rounds per worker")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "custom_scenarios.db")
+        ScenarioManager(db_file, import_json=False)
+
+        print(f"🧪 {args.workers} processes x {args.rounds} rounds against {db_file}")
+        with multiprocessing.Pool(args.workers) as pool:
+            results = pool.starmap(writer, [(db_file, w, args.rounds) for w in range(args.workers)])
+
+        expected = {}
+        for result in results:
+            expected.update(result)
+        stored = ScenarioManager(db_file, import_json=False).scenarios
+        stored_ids = [s['id'] for s in stored]
+        actual = {s['id']: s['category'] for s in stored}
+
+        print(f"  - Expected scenarios: {len(expected)}")
+        print(f"  - Stored scenarios:   {len(stored)}")
+        failures = []
+        if len(set(stored_ids)) != len(stored_ids):
+            failures.append("duplicate IDs stored")
+        if actual != expected:
+            missing = set(expected) - set(actual)
+            extra = set(actual) - set(expected)
+            wrong = [i for i in set(expected) & set(actual) if expected[i] != actual[i]]
+            failures.append(f"{len(missing)} lost, {len(extra)} unexpected, {len(wrong)} with a stale category")
+
+    if failures:
+        print(f"\n❌ FAILED: {'; '.join(failures)}")
+        sys.exit(1)
+    print("\n✅ No lost writes or ID collisions")
+
+
+if __name__ == "__main__":
+    main()
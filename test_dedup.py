@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Test script for near-duplicate detection on the bundled transcripts.
+
+Adds every statement from the cleaned sample transcript to a temporary
+library, then extracts from:
+  - the same transcript again (all should be flagged),
+  - the original WEBVTT recording of the same session (all should be flagged),
+  - a "re-transcribed" copy with filler words dropped and punctuation changed,
+    compared against brute-force exact Jaccard similarity.
+"""
+
+import os
+import random
+import re
+import tempfile
+import time
+
+from scenario_manager import ScenarioManager
+from scenario_dedup import DEFAULT_DUPLICATE_THRESHOLD, DuplicateIndex, jaccard, shingles
+
+CLEANED = "transcripts/coaching_transcript_cleaned.txt"
+WEBVTT = "transcripts/sample_coaching_transcript.txt"
+FILLERS = re.compile(r"\b(like|yeah|yep|um|uh|so|just|kind of|you know)\b,?\s*", re.IGNORECASE)
+
+
+def retranscribe(transcript):
+    """Simulate a second transcription: fillers dropped, ellipses and case changed."""
+    lines = []
+    for line in transcript.split('\n'):
+        speaker, sep, text = line.partition(':')
+        if sep:
+            text = FILLERS.sub('', text).replace('…', '...').lower()
+        lines.append(speaker + sep + text)
+    return '\n'.join(lines)
+
+
+def flagged(statements):
+    return sum('duplicate_of' in s for s in statements)
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    manager = ScenarioManager(os.path.join(tmp, "dedup_test.db"), import_json=False)
+    threshold = DEFAULT_DUPLICATE_THRESHOLD
+
+    with open(CLEANED) as f:
+        cleaned = f.read()
+    with open(WEBVTT) as f:
+        webvtt = f.read().replace('Coachee:', 'Client:')
+
+    print(f"🔍 Threshold: {threshold}")
+    original = manager.extract_client_statements(cleaned)
+    manager.flag_duplicates(original, threshold)
+    print(f"  - Cleaned transcript: {len(original)} statements, {flagged(original)} repeated within it")
+    manager.add_scenarios([{**s, 'category': 'Self Improvement', 'quality_score': 5,
+                            'extracted_date': ''} for s in original])
+
+    print("\n" + "="*80)
+
+    again = manager.flag_duplicates(manager.extract_client_statements(cleaned), threshold)
+    print(f"\n📄 Same transcript again: {flagged(again)}/{len(again)} flagged")
+    assert flagged(again) == len(again)
+
+    vtt = manager.flag_duplicates(manager.extract_client_statements(webvtt), threshold)
+    print(f"📄 WEBVTT recording of the same session: {flagged(vtt)}/{len(vtt)} flagged")
+    assert flagged(vtt) == len(vtt)
+
+    redo = manager.flag_duplicates(manager.extract_client_statements(retranscribe(cleaned)), threshold)
+    library = [s['statement'] for s in manager.scenarios]
+    expected = [max(jaccard(shingles(s['statement']), shingles(t)) for t in library) >= threshold for s in redo]
+    hits = sum(e and 'duplicate_of' in s for s, e in zip(redo, expected))
+    false_alarms = sum(not e and 'duplicate_of' in s for s, e in zip(redo, expected))
+    print(f"📄 Re-transcribed copy: {flagged(redo)}/{len(redo)} flagged, "
+          f"{hits}/{sum(expected)} true near-duplicates found, {false_alarms} false alarms")
+    for s in redo:
+        if 'duplicate_of' not in s:
+            print(f"    • not flagged: {s['statement'][:60]}...")
+    assert false_alarms == 0
+
+    # Other thresholds are answered by the same library index, just as exactly
+    library_index = manager._dedup
+    for other in (0.5, 0.9):
+        redo = manager.flag_duplicates(manager.extract_client_statements(retranscribe(cleaned)), other)
+        expected = [max(jaccard(shingles(s['statement']), shingles(t)) for t in library) >= other for s in redo]
+        mismatches = sum(e != ('duplicate_of' in s) for s, e in zip(redo, expected))
+        print(f"📄 Re-transcribed copy at threshold {other}: {flagged(redo)}/{len(redo)} flagged, "
+              f"{sum(expected)} expected, {mismatches} mismatches")
+        assert mismatches == 0
+    assert manager._dedup is library_index, "library index was rebuilt for another threshold"
+
+    # Approving a flagged statement anyway saves it without the review-only flag
+    manager.add_scenario({**again[0], 'category': 'Self Improvement', 'quality_score': 5, 'extracted_date': ''})
+    reloaded = ScenarioManager(os.path.join(tmp, "dedup_test.db"), import_json=False)
+    assert not any('duplicate_of' in s for s in manager.scenarios + reloaded.scenarios)
+
+    # Distinct statements of one session must not match each other
+    index = DuplicateIndex(threshold)
+    for i, text in enumerate(library):
+        index.add(i, text)
+    cross = sum(1 for i, text in enumerate(library) for key, _ in index.query(text) if key != i)
+    print(f"📄 Distinct statements matched to each other: {cross}")
+    assert cross == 0
+
+    print("\n" + "="*80)
+
+    # Lookup cost should stay flat as the library grows, unlike a linear scan
+    print("\n⏱️  Lookup time vs library size:")
+    rng = random.Random(0)
+    vocabulary = sorted({word for text in library for word in shingles(text, 1)})
+    probe = original[5]['statement']
+    probe_shingles = shingles(probe)
+    for size in (1000, 10000, 30000):
+        texts = [" ".join(rng.choices(vocabulary, k=25)) for _ in range(size)]
+        index = DuplicateIndex(threshold)
+        for i, text in enumerate(texts):
+            index.add(i, text)
+        index.add('probe', probe)
+
+        start = time.perf_counter()
+        for _ in range(100):
+            matches = index.query(probe)
+        lsh_ms = (time.perf_counter() - start) * 10
+        assert [key for key, _ in matches] == ['probe']
+
+        text_shingles = [shingles(text) for text in texts]
+        start = time.perf_counter()
+        for _ in range(3):
+            [t for t in text_shingles if jaccard(probe_shingles, t) >= threshold]
+        scan_ms = (time.perf_counter() - start) * 1000 / 3
+        print(f"  - {size:>6} scenarios: {lsh_ms:.3f} ms per lookup (linear scan: {scan_ms:.1f} ms)")
+
+print("\n✅ Test complete! Check output above.")
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""Test script for hedged requests and failover across LLM backends.
+
+Runs two local OpenAI-compatible stubs, a primary and a backup, whose delay
+and failure mode can be changed between requests. Checks that:
+  - a healthy primary answers everything and the backup is never called,
+  - when the primary stalls, the hedged backup answers at about the
+    primary's p90 latency, and a losing stream is closed,
+  - a 429 "exceeded your current quota" error fails over at once, and the
+    backup model's reply is not cached as the primary model's,
+  - an error the backup would also hit (400) is raised, not failed over,
+  - queue position updates for a scheduled primary reach on_wait on the
+    calling thread (where Streamlit calls work), and an exception from
+    on_wait propagates,
+  - a primary still queued when the backup answers is never sent, and
+    leaves no scheduler slot behind,
+  - an interactive hedged request goes ahead of many queued bulk ones,
+and prints latency with and without hedging for a stalled primary.
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+from llm_cache import get_response_cache, make_cache_key
+from llm_client import (DEFAULT_PROMPT_VERSION, PROVIDER_OLLAMA, create_chat_completion, get_client,
+                        stream_chat_completion)
+from llm_failover import Backend, HedgedClient
+from llm_scheduler import BULK, INTERACTIVE, LLMScheduler, ScheduledClient
+
+FAST = 0.05
+STALL = 2.0
+
+
+def make_stub(name):
+    class Stub(BaseHTTPRequestHandler):
+        """Answers after `delay` seconds, or fails with `status` when set."""
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+        delay, status, calls, aborted = FAST, None, 0, 0
+
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            Stub.calls += 1
+            if Stub.status:
+                message = "You exceeded your current quota" if Stub.status == 429 else "bad request"
+                return self.reply(Stub.status, {"error": {"message": message, "type": "insufficient_quota"}})
+            chunk = {"id": "stub", "object": "chat.completion.chunk", "created": 0, "model": request['model'],
+                     "choices": [{"index": 0, "delta": {"content": name}, "finish_reason": None}]}
+            if not request.get('stream'):
+                time.sleep(Stub.delay)
+                return self.reply(200, {
+                    "id": "stub", "object": "chat.completion", "created": 0, "model": request['model'],
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": name},
+                                 "finish_reason": "stop"}],
+                })
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            try:
+                time.sleep(Stub.delay)  # time to first token
+                for event in (json.dumps(chunk).encode(), json.dumps(chunk).encode(), b'[DONE]'):
+                    data = b'data: ' + event + b'\n\n'
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                    self.wfile.flush()
+                    time.sleep(0.05)
+                self.wfile.write(b'0\r\n\r\n')
+            except (BrokenPipeError, ConnectionResetError):
+                Stub.aborted += 1
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, Stub, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+primary_server, Primary, primary_url = make_stub("primary")
+backup_server, Backup, backup_url = make_stub("backup")
+client = HedgedClient([
+    Backend("primary", get_client(PROVIDER_OLLAMA, base_url=primary_url), "primary-model"),
+    Backend("backup", get_client(PROVIDER_OLLAMA, base_url=backup_url), "backup-model"),
+])
+failures = []
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def ask(prompt="Hi", use_cache=False):
+    return create_chat_completion(client, "primary-model", prompt, use_cache=use_cache, max_retries=0)
+
+
+def ask_streaming():
+    return "".join(stream_chat_completion(client, "primary-model", "Hi", use_cache=False))
+
+
+print(f"🧪 Primary answers in {FAST:.2f}s when healthy; stalls take {STALL:.1f}s")
+
+# Healthy primary builds up its latency history
+for _ in range(10):
+    ask()
+    ask_streaming()
+print(f"\n📄 Healthy primary: 20 requests, primary {Primary.calls} calls, backup {Backup.calls} calls")
+if Backup.calls:
+    failures.append(f"backup called {Backup.calls} times while the primary was healthy")
+
+Primary.delay = STALL
+reply, hedged = timed(ask)
+stream_reply, hedged_stream = timed(ask_streaming)
+stream_source = "backup" if stream_reply.startswith("backup") else stream_reply
+time.sleep(STALL + 0.3)  # let the abandoned primary requests finish or notice the closed stream
+print(f"📄 Stalled primary: hedged reply from {reply!r} in {hedged:.2f}s, "
+      f"streamed reply from {stream_source!r} in {hedged_stream:.2f}s "
+      f"(unhedged: {STALL:.1f}s+); primary streams closed: {Primary.aborted}")
+if reply != "backup" or stream_source != "backup":
+    failures.append("backup did not answer for a stalled primary")
+if max(hedged, hedged_stream) > 1.0:
+    failures.append(f"hedged latency {max(hedged, hedged_stream):.2f}s is not well below the {STALL}s stall")
+if Primary.aborted < 1:
+    failures.append("losing primary stream was not closed")
+
+Primary.delay, Primary.status = FAST, 429
+cache_prompt = f"Hi at {time.time()}"
+reply, failover = timed(lambda: ask(cache_prompt, use_cache=True))
+print(f"📄 Primary out of quota (429): reply from {reply!r} ({client.answered_model}) in {failover:.2f}s")
+if reply != "backup" or client.answered_model != "backup-model" or failover > 0.5:
+    failures.append(f"429 did not fail over promptly ({reply!r} in {failover:.2f}s)")
+if get_response_cache().get(make_cache_key("primary-model", cache_prompt, 0.7, DEFAULT_PROMPT_VERSION)):
+    failures.append("backup reply was cached under the primary model")
+
+Primary.status, Backup.status = 400, 400
+try:
+    ask()
+    failures.append("400 from both backends was not raised")
+except openai.BadRequestError:
+    print("📄 Bad request on both backends: BadRequestError raised")
+
+Primary.status, Backup.status = None, None
+primary_key = str(get_client(PROVIDER_OLLAMA, base_url=primary_url).base_url)  # as the scheduler sees it
+scheduler = LLMScheduler({primary_key: 1})
+queued_client = HedgedClient([
+    Backend("primary", ScheduledClient(get_client(PROVIDER_OLLAMA, base_url=primary_url), "user", INTERACTIVE,
+                                       scheduler=scheduler), "primary-model"),
+    Backend("backup", get_client(PROVIDER_OLLAMA, base_url=backup_url), "backup-model"),
+], hedge_delay=0.3, on_wait=lambda pos, wait: updates.append((pos, threading.get_ident())))
+updates = []
+primary_calls = Primary.calls
+scheduler.acquire(primary_key, "other-session")  # primary busy: this request queues behind it
+reply = create_chat_completion(queued_client, "primary-model", "Hi", use_cache=False)
+callback_threads = {ident for _, ident in updates}
+print(f"📄 Primary queued: reply from {reply!r}, {len(updates)} queue updates, "
+      f"{'all on the calling thread' if callback_threads == {threading.get_ident()} else 'on other threads'}")
+if not updates or callback_threads != {threading.get_ident()}:
+    failures.append("queue updates did not reach on_wait on the calling thread")
+if updates and updates[-1][0] != 0:
+    failures.append("queue status was not cleared once the backup answered")
+
+
+class Interrupted(Exception):
+    """Stands in for Streamlit's RerunException raised from st.* calls."""
+
+
+def interrupt(position, expected_wait):
+    raise Interrupted()
+
+
+queued_client.on_wait = interrupt
+try:
+    create_chat_completion(queued_client, "primary-model", "Hi", use_cache=False)
+    failures.append("exception from on_wait was swallowed")
+except Interrupted:
+    print("📄 on_wait raising: exception reached the caller")
+scheduler.release(primary_key)
+time.sleep(0.3)  # queued primary attempts would be admitted and sent now
+sent = Primary.calls - primary_calls
+print(f"📄 Queued primary after the backup answered: {sent} requests sent, "
+      f"{scheduler.stats(primary_key)['in_flight']} slots held")
+if sent:
+    failures.append(f"{sent} cancelled primary requests were still sent")
+if scheduler.stats(primary_key)['in_flight']:
+    failures.append("cancelled primary attempts left a scheduler slot held")
+
+
+def queued_hedged_client(session, priority):
+    return HedgedClient([
+        Backend("primary", ScheduledClient(get_client(PROVIDER_OLLAMA, base_url=primary_url), session, priority,
+                                           scheduler=scheduler), "primary-model"),
+        Backend("backup", get_client(PROVIDER_OLLAMA, base_url=backup_url), "backup-model"),
+    ], hedge_delay=30)
+
+
+scheduler.acquire(primary_key, "other-session")
+bulk_client = queued_hedged_client("bulk-session", BULK)
+bulk = [threading.Thread(target=create_chat_completion, args=(bulk_client, "primary-model", f"Bulk {i}"),
+                         kwargs={'use_cache': False}, daemon=True) for i in range(24)]
+for thread in bulk:
+    thread.start()
+time.sleep(0.2)
+threading.Timer(0.1, scheduler.release, (primary_key,)).start()
+start = time.perf_counter()
+create_chat_completion(queued_hedged_client("user", INTERACTIVE), "primary-model", "Hi", use_cache=False)
+interactive = time.perf_counter() - start
+for thread in bulk:
+    thread.join()
+print(f"📄 Interactive request behind 24 queued bulk requests: answered in {interactive:.2f}s "
+      f"(bulk takes {24 * FAST:.1f}s)")
+if interactive > 0.1 + 3 * FAST + 0.2:
+    failures.append(f"interactive hedged request waited {interactive:.2f}s behind bulk requests")
+
+primary_server.shutdown()
+backup_server.shutdown()
+if failures:
+    print(f"\n❌ FAILED: {'; '.join(failures)}")
+    sys.exit(1)
+print("\n✅ Hedging cuts stalled-primary latency and errors fail over")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Test script for the client-side rate limiter and 429 handling.
+
+Runs a local OpenAI-compatible stub that, like the OpenAI API, allows a
+fixed number of requests per second and answers the rest with 429 and a
+Retry-After header. Auto-categorizes a batch of statements through it and
+checks that:
+  - without a budget, 429s are retried (honouring Retry-After) and every
+    statement still gets the model's category, never the fallback,
+  - with a budget just under the server's limit, no request is rejected and
+    the batch runs at about that rate,
+  - an exhausted quota raises instead of saving default categories,
+  - the token budget spaces requests by their estimated size.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+from llm_client import PROVIDER_OLLAMA, get_client
+from llm_rate_limit import RateLimiter, set_rate_limits
+from scenario_manager import ScenarioManager
+
+REQUESTS_PER_SECOND = 10
+# Requests are paced evenly; a little headroom absorbs network jitter
+BUDGET_PER_SECOND = 9
+STATEMENTS = 30
+MODEL = "stub-model"
+
+
+class LimitedBackend(BaseHTTPRequestHandler):
+    """Allows REQUESTS_PER_SECOND over a sliding one-second window; 429s the rest."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    lock = threading.Lock()
+    recent = deque()
+    accepted, rejected, out_of_quota = 0, 0, False
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, payload, headers=()):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        cls = LimitedBackend
+        if cls.out_of_quota:
+            return self.reply(429, {"error": {"message": "You exceeded your current quota",
+                                              "type": "insufficient_quota", "code": "insufficient_quota"}})
+        with cls.lock:
+            now = time.monotonic()
+            while cls.recent and now - cls.recent[0] >= 1.0:
+                cls.recent.popleft()
+            allowed = len(cls.recent) < REQUESTS_PER_SECOND
+            if allowed:
+                cls.recent.append(now)
+                cls.accepted += 1
+            else:
+                cls.rejected += 1
+        if not allowed:
+            return self.reply(429, {"error": {"message": "Rate limit reached for requests",
+                                              "type": "requests", "code": "rate_limit_exceeded"}},
+                              [('Retry-After', '1')])
+        time.sleep(0.02)
+        content = '{"category": "Career", "quality_score": 8, "reason": "stub"}'
+        prompt_tokens = len(request['messages'][0]['content']) // 4
+        self.reply(200, {
+            "id": "stub", "object": "chat.completion", "created": 0, "model": request['model'],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 20, "total_tokens": prompt_tokens + 20},
+        })
+
+    @classmethod
+    def reset(cls):
+        cls.recent.clear()
+        cls.accepted, cls.rejected = 0, 0
+
+
+def categorize():
+    """Categorize STATEMENTS one per request, bypassing the response cache."""
+    LimitedBackend.reset()
+    statements = [{'statement': f"Statement {i}: I keep putting off the hard talk.",
+                   'context': "What is in the way?"} for i in range(STATEMENTS)]
+    start = time.perf_counter()
+    results = manager.categorize_scenarios_with_ai(statements, client, MODEL, max_concurrency=8, batched=False,
+                                                   use_cache=False)
+    return results, time.perf_counter() - start
+
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), LimitedBackend)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+client = get_client(PROVIDER_OLLAMA, base_url=base_url)
+workdir = tempfile.mkdtemp()
+manager = ScenarioManager(os.path.join(workdir, "scenarios.db"), import_json=False)
+failures = []
+
+print(f"🧪 Server allows {REQUESTS_PER_SECOND} requests/second; categorizing {STATEMENTS} statements, 8 at a time")
+
+results, elapsed = categorize()
+fallback = sum(1 for r in results if r['category'] != "Career")
+print(f"\n📄 No budget:      {elapsed:.2f}s, {LimitedBackend.rejected} requests rejected (429), "
+      f"{fallback} fallback categories")
+if len(results) != STATEMENTS or fallback:
+    failures.append(f"without a budget {fallback} of {len(results)} results used the fallback category")
+
+set_rate_limits(base_url, MODEL, BUDGET_PER_SECOND * 60, None)
+results, elapsed = categorize()
+fallback = sum(1 for r in results if r['category'] != "Career")
+print(f"📄 Budget of {BUDGET_PER_SECOND}/s: {elapsed:.2f}s, {LimitedBackend.rejected} requests rejected (429), "
+      f"{fallback} fallback categories")
+if LimitedBackend.rejected:
+    failures.append(f"{LimitedBackend.rejected} requests rejected within the configured budget")
+if len(results) != STATEMENTS or fallback:
+    failures.append(f"with a budget {fallback} of {len(results)} results used the fallback category")
+expected = STATEMENTS / BUDGET_PER_SECOND
+if elapsed > expected + 0.5:
+    failures.append(f"limited batch took {elapsed:.2f}s, expected about {expected:.1f}s")
+
+LimitedBackend.out_of_quota = True
+try:
+    categorize()
+    failures.append("exhausted quota did not raise")
+except openai.RateLimitError:
+    print("📄 Out of quota: RateLimitError raised, nothing saved with a default category")
+
+limiter = RateLimiter(tokens_per_minute=600_000)  # 10,000 tokens/second, 1,000 at once
+start = time.perf_counter()
+for _ in range(3):
+    limiter.acquire(1000)
+token_wait = time.perf_counter() - start
+print(f"📄 Token budget: 3 x 1,000 tokens at 10,000/s took {token_wait:.2f}s (expected ~0.20s)")
+if not 0.15 <= token_wait <= 0.4:
+    failures.append(f"token budget wait {token_wait:.2f}s, expected ~0.20s")
+
+server.shutdown()
+if failures:
+    print(f"\n❌ FAILED: {'; '.join(failures)}")
+    sys.exit(1)
+print("\n✅ Requests stay within budget and 429s are retried, never saved as defaults")
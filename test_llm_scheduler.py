@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""Test script for LLM admission control and fair queueing.
+
+Runs a local OpenAI-compatible stub that, like a single Ollama instance,
+serves one request at a time with a fixed delay. Two sessions start bulk
+categorization-style batches (one large, one small) and a third session
+asks for interactive feedback while they run. Checks, with the scheduler:
+  - the backend never sees more than max_in_flight requests,
+  - interactive requests wait for at most the request already running,
+  - the small bulk batch is interleaved with the large one, not queued behind it,
+  - queue position updates count down while waiting,
+  - a wait callback that raises (as Streamlit does when a rerun interrupts
+    the script) gives up its place or slot instead of leaking it,
+and prints interactive latency without the scheduler for comparison.
+"""
+
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_client import PROVIDER_OLLAMA, get_client
+from llm_scheduler import BULK, INTERACTIVE, LLMScheduler, ScheduledClient
+
+SERVICE_SECONDS = 0.2
+
+
+class SlowBackend(BaseHTTPRequestHandler):
+    """Serves one completion at a time, recording the order and concurrency seen."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    model_lock = threading.Lock()
+    stats_lock = threading.Lock()
+    served, active, max_active = [], 0, 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        cls = SlowBackend
+        with cls.stats_lock:
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        with cls.model_lock:
+            time.sleep(SERVICE_SECONDS)
+            cls.served.append(request['model'])
+        with cls.stats_lock:
+            cls.active -= 1
+        body = json.dumps({
+            "id": "stub", "object": "chat.completion", "created": 0, "model": request['model'],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    @classmethod
+    def reset(cls):
+        cls.served, cls.active, cls.max_active = [], 0, 0
+
+
+def complete(client, label):
+    client.chat.completions.create(model=label, messages=[{"role": "user", "content": "Hi"}])
+
+
+def run_workload(make_client):
+    """Large and small bulk batches plus two interactive requests; returns interactive latencies."""
+    SlowBackend.reset()
+    latencies, positions = [], []
+    # Each session runs its batch with its own workers, as categorize_scenarios_with_ai does
+    with ThreadPoolExecutor(max_workers=4) as pool_a, ThreadPoolExecutor(max_workers=4) as pool_b:
+        large = make_client("session-a", BULK, None)
+        small = make_client("session-b", BULK, None)
+        jobs = [pool_a.submit(complete, large, f"bulk-a-{i}") for i in range(12)]
+        time.sleep(SERVICE_SECONDS / 2)
+        jobs += [pool_b.submit(complete, small, f"bulk-b-{i}") for i in range(3)]
+        time.sleep(SERVICE_SECONDS * 2)
+
+        interactive = make_client("session-c", INTERACTIVE, lambda pos, wait: positions.append((pos, wait)))
+        for i in range(2):
+            start = time.perf_counter()
+            complete(interactive, f"interactive-{i}")
+            latencies.append(time.perf_counter() - start)
+        for job in jobs:
+            job.result()
+    return latencies, positions, list(SlowBackend.served), SlowBackend.max_active
+
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), SlowBackend)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+client = get_client(PROVIDER_OLLAMA, base_url=base_url)
+failures = []
+
+print(f"🧪 Backend serves one request at a time, {SERVICE_SECONDS:.1f}s each")
+
+latencies, _, served, max_active = run_workload(lambda session, priority, on_wait: client)
+print(f"\n📄 Without scheduler: interactive latency {max(latencies):.2f}s, "
+      f"{max_active} requests open at the backend")
+
+scheduler = LLMScheduler({base_url: 1})
+latencies, positions, served, max_active = run_workload(
+    lambda session, priority, on_wait: ScheduledClient(client, session, priority, on_wait, scheduler))
+bulk = [label for label in served if label.startswith('bulk')]
+print(f"📄 With scheduler:    interactive latency {max(latencies):.2f}s, "
+      f"{max_active} request open at the backend")
+print(f"  - Service order: {' '.join(label.replace('bulk-', '').replace('interactive-', 'I') for label in served)}")
+print(f"  - Queue updates: {[(pos, round(wait, 2)) for pos, wait in positions]}")
+
+if max_active > 1:
+    failures.append(f"{max_active} requests in flight at once (limit 1)")
+# Waits only for the request already running, then its own
+if max(latencies) > 2 * SERVICE_SECONDS + 0.15:
+    failures.append(f"interactive latency {max(latencies):.2f}s exceeds two service times")
+last_small = max(bulk.index(f"bulk-b-{i}") for i in range(3))
+if last_small > 7:
+    failures.append(f"small batch finished at position {last_small} of {len(bulk)} (not interleaved)")
+waiting = [pos for pos, wait in positions if wait > 0]
+if waiting != sorted(waiting, reverse=True):
+    failures.append(f"queue positions did not count down: {waiting}")
+if positions and positions[-1] != (0, 0.0):
+    failures.append("no admission update after waiting")
+
+
+
+class Interrupted(Exception):
+    """Stands in for Streamlit's RerunException raised from st.* calls."""
+
+
+def interrupt_when(condition):
+    def on_wait(position, expected_wait):
+        if condition(position, expected_wait):
+            raise Interrupted()
+    return on_wait
+
+
+def leaks_slot(on_wait):
+    """Queue behind a running request with on_wait; True if the backend slot is lost afterwards."""
+    leak_scheduler = LLMScheduler({base_url: 1})
+    leak_scheduler.acquire(base_url, "holder")
+    waiter = ThreadPoolExecutor(max_workers=1).submit(leak_scheduler.acquire, base_url, "waiter", INTERACTIVE,
+                                                      on_wait)
+    time.sleep(0.1)
+    leak_scheduler.release(base_url)
+    try:
+        waiter.result(timeout=5)
+    except Interrupted:
+        pass
+    admitted = threading.Event()
+    threading.Thread(target=lambda: (leak_scheduler.acquire(base_url, "next"), admitted.set()), daemon=True).start()
+    return not admitted.wait(timeout=2) or leak_scheduler.stats(base_url)['in_flight'] != 1
+
+
+for label, on_wait in (("while queued", interrupt_when(lambda pos, wait: True)),
+                       ("on admission", interrupt_when(lambda pos, wait: (pos, wait) == (0, 0.0)))):
+    leaked = leaks_slot(on_wait)
+    print(f"📄 Wait callback raising {label}: slot {'leaked' if leaked else 'given back'}")
+    if leaked:
+        failures.append(f"a wait callback raising {label} leaked the backend slot")
+
+server.shutdown()
+if failures:
+    print(f"\n❌ FAILED: {'; '.join(failures)}")
+    sys.exit(1)
+print("\n✅ Bounded concurrency, interactive requests first, bulk sessions share fairly")
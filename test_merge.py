@@ -1,16 +1,14 @@
 #!/usr/bin/env python3
 """Test script to verify custom scenarios are merging correctly."""
 
-import pandas as pd
 from scenario_manager import ScenarioManager
+from scenario_loader import read_scenario_workbook
 
 # Load Excel data
 print("📊 Loading Excel data...")
-excel_file = pd.ExcelFile("Coach_Training_Scenarios_ICF_PCC.xlsx")
-data = {}
-for sheet_name in excel_file.sheet_names:
-    data[sheet_name] = pd.read_excel("Coach_Training_Scenarios_ICF_PCC.xlsx", sheet_name=sheet_name)
-    print(f"  - {sheet_name}: {len(data[sheet_name])} scenarios")
+data = read_scenario_workbook("Coach_Training_Scenarios_ICF_PCC.xlsx")
+for sheet_name, df in data.items():
+    print(f"  - {sheet_name}: {len(df)} scenarios")
 
 print("\n" + "="*80)
 
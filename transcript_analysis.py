@@ -0,0 +1,282 @@
+"""
+Transcript Analysis - Full-session analysis prompts, chunked for long transcripts
+
+A transcript that fits the model's context window is analyzed with a single
+prompt, as before. A longer one is split on speaker-turn boundaries into
+excerpts that each fit comfortably, with the last few turns of each excerpt
+repeated at the start of the next for context. The excerpts are analyzed
+concurrently (map), and their notes are merged into the usual 10-section
+report (reduce). Notes that do not fit one reduce prompt are first merged in
+groups, so the final prompt always fits.
+
+Because the excerpts run in parallel, wall-clock time is roughly one excerpt
+plus the report rather than growing with transcript length, as long as the
+server runs requests in parallel (Ollama: OLLAMA_NUM_PARALLEL).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from feedback_prompts import FEEDBACK_PROMPT_VERSION
+from llm_client import create_chat_completion, estimate_tokens, get_context_window
+from transcript_parser import iter_speaker_turns
+
+# Tokens kept free for the model's reply
+REPORT_REPLY_TOKENS = 1500
+NOTES_REPLY_TOKENS = 400
+# Smaller excerpts prefill faster and spread across more parallel requests
+DEFAULT_MAX_CHUNK_TOKENS = 1500
+DEFAULT_OVERLAP_TURNS = 2
+
+_REPORT_FRAMEWORK = """**EVALUATION FRAMEWORK:**
+Please provide a comprehensive analysis structured as follows:
+
+**1. ACC-Level Competencies Demonstrated:**
+Identify which ICF ACC competencies were demonstrated in this session:
+- Establishes and Maintains Agreements
+- Cultivates Trust and Safety
+- Maintains Presence
+- Listens Actively
+- Evokes Awareness
+- Facilitates Client Growth
+- Embodies a Coaching Mindset
+
+For each competency demonstrated, provide specific examples from the transcript.
+
+**2. Missed Opportunities to Evoke Awareness:**
+Identify 3-5 specific moments where the coach could have asked a more powerful question or made an observation that would have deepened the client's awareness. For each:
+- Quote the coach's actual statement
+- Explain what opportunity was missed
+- Provide an example of what could have been said instead
+
+**3. Questions Analysis:**
+Evaluate the quality of questions asked:
+- How many were open vs. closed questions?
+- Were questions powerful and evocative, or leading/directive?
+- Did questions help the client explore deeply or stay surface-level?
+- Provide 2-3 examples of strong questions and 2-3 that could be improved
+
+**4. Tone and Attunement:**
+Assess how well the coach attuned to the client:
+- Did the coach match the client's energy and pace?
+- Were there moments of deep empathy and understanding?
+- Did the coach seem present and fully engaged?
+- Any moments where attunement could have been stronger?
+
+**5. Acknowledgment:**
+Evaluate how the coach acknowledged the client:
+- Were there genuine moments of acknowledgment (not just praise)?
+- Did acknowledgments recognize the client's strengths, growth, or insights?
+- Provide examples of effective acknowledgments or missed opportunities
+
+**6. Observations:**
+Assess the coach's use of observations:
+- Did the coach share observations about what they noticed?
+- Were observations offered tentatively as gifts, not judgments?
+- Examples of strong observations or missed opportunities to share observations
+
+**7. Clean Language:**
+Evaluate the coach's use of the client's own language:
+- Did the coach use the client's words and metaphors, or impose their own?
+- Were there moments of interpretation or assumption?
+- Examples of good clean language usage and areas for improvement
+
+**8. Overall Strengths:**
+Summarize the top 3 strengths demonstrated in this session.
+
+**9. Priority Development Areas:**
+Identify the top 3 areas for focused development to progress toward PCC level.
+
+**10. Action Steps:**
+Provide 3 specific, actionable practices the coach can implement in their next session.
+"""
+
+
+def build_analysis_prompt(transcript: str) -> str:
+    """Single-prompt analysis of a whole transcript."""
+    return f"""
+You are an ICF ACC-level mentor coach evaluating a complete coaching session transcript.
+
+**TRANSCRIPT:**
+{transcript}
+
+{_REPORT_FRAMEWORK}
+Keep tone encouraging, specific, and developmental. Use examples from the actual transcript to illustrate points.
+"""
+
+
+def build_excerpt_prompt(turns: List[str], context: List[str], part: int, parts: int) -> str:
+    """Map step: notes on one excerpt of a long transcript."""
+    context_block = ""
+    if context:
+        context_block = "**EARLIER TURNS (context only, covered in the previous part):**\n" + "\n".join(context) + "\n\n"
+    excerpt = "\n".join(turns)
+    return f"""
+You are an ICF ACC-level mentor coach reviewing part {part} of {parts} of a coaching session transcript.
+
+{context_block}**EXCERPT:**
+{excerpt}
+
+Write concise notes on this excerpt only (at most 250 words). Another mentor will combine the notes from every part into one report. Cover what this excerpt shows of:
+- ICF ACC competencies demonstrated, with short exact quotes
+- Missed opportunities to evoke awareness: quote the coach and suggest a stronger question or observation
+- Questions: open vs. closed, powerful vs. leading (give counts and examples)
+- Tone and attunement, acknowledgment, observations and clean language
+
+Quote the transcript exactly. Leave out anything this excerpt does not show.
+"""
+
+
+def build_merge_notes_prompt(notes: List[str]) -> str:
+    """Intermediate reduce step: merge notes on consecutive parts into one set of notes."""
+    sections = "\n\n".join(f"**NOTES {i}:**\n{note}" for i, note in enumerate(notes, start=1))
+    return f"""
+You are an ICF ACC-level mentor coach. Below are notes on consecutive parts of one coaching session.
+
+{sections}
+
+Combine them into one set of notes (at most 300 words) covering competencies demonstrated, missed opportunities, questions, tone and attunement, acknowledgment, observations and clean language. Keep the strongest exact quotes and add up question counts.
+"""
+
+
+def build_report_prompt(notes: List[str]) -> str:
+    """Final reduce step: the 10-section report from notes on every part of the session."""
+    sections = "\n\n".join(f"**PART {i} NOTES:**\n{note}" for i, note in enumerate(notes, start=1))
+    return f"""
+You are an ICF ACC-level mentor coach evaluating a complete coaching session. The session was too long to read at once, so it was reviewed in consecutive parts; the notes from each part follow, in order.
+
+{sections}
+
+{_REPORT_FRAMEWORK}
+Judge the session as a whole, not part by part. Keep tone encouraging, specific, and developmental. Use the quotes in the notes to illustrate points.
+"""
+
+
+def needs_chunking(transcript: str, model_name: str) -> bool:
+    """True if the single-prompt analysis plus its reply would not fit the model's context window."""
+    return estimate_tokens(build_analysis_prompt(transcript)) + REPORT_REPLY_TOKENS > get_context_window(model_name)
+
+
+def chunk_transcript(transcript: str, model_name: str, max_chunk_tokens: int = DEFAULT_MAX_CHUNK_TOKENS,
+                     overlap_turns: int = DEFAULT_OVERLAP_TURNS) -> List[Dict]:
+    """
+    Split a transcript into excerpts on speaker-turn boundaries.
+
+    Each excerpt's prompt, including the overlap turns repeated from the
+    previous excerpt and the reply, fits the model's context window. A single
+    turn longer than an excerpt is split on whitespace.
+
+    Returns:
+        List of dicts with turns (formatted "Speaker: text" lines) and
+        context (overlap turns from the previous excerpt)
+    """
+    budget = get_context_window(model_name) - estimate_tokens(build_excerpt_prompt([], [], 1, 1)) - NOTES_REPLY_TOKENS
+    budget = max(100, min(budget, max_chunk_tokens))
+
+    lines = []
+    for turn in iter_speaker_turns(transcript):
+        line = f"{turn['speaker']}: {turn['text']}" if turn['speaker'] else turn['text']
+        if estimate_tokens(line) <= budget:
+            lines.append(line)
+            continue
+        piece, length = [], 0
+        for word in line.split():
+            if piece and estimate_tokens(" " * (length + len(word))) > budget:
+                lines.append(" ".join(piece))
+                piece, length = [], 0
+            piece.append(word)
+            length += len(word) + 1
+        lines.append(" ".join(piece))
+
+    chunks, turns, used = [], [], 0
+    context: List[str] = []
+    for line in lines:
+        cost = estimate_tokens(line)
+        if turns and used + cost > budget:
+            chunks.append({'turns': turns, 'context': context})
+            context = turns[-overlap_turns:] if overlap_turns else []
+            used = sum(estimate_tokens(t) for t in context)
+            while context and used + cost > budget:
+                used -= estimate_tokens(context.pop(0))
+            turns = []
+        turns.append(line)
+        used += cost
+    if turns:
+        chunks.append({'turns': turns, 'context': context})
+    return chunks
+
+
+def _run_all(prompts: List[str], client, model_name: str, max_concurrency: int, timeout: Optional[float],
+             max_retries: int, use_cache: bool, progress: Optional[Callable[[int, int], None]]) -> List[str]:
+    """Run prompts concurrently, returning replies in order."""
+    done = 0
+
+    def run(prompt):
+        return create_chat_completion(client, model_name, prompt, temperature=0.3, timeout=timeout,
+                                      max_retries=max_retries, use_cache=use_cache,
+                                      prompt_version=FEEDBACK_PROMPT_VERSION)
+
+    replies = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(prompts)))) as executor:
+        for reply in executor.map(run, prompts):
+            replies.append(reply or "")
+            done += 1
+            if progress:
+                progress(done, len(prompts))
+    return replies
+
+
+def reduce_notes(notes: List[str], client, model_name: str, max_concurrency: int = 4,
+                 timeout: Optional[float] = 120, max_retries: int = 3, use_cache: bool = True) -> List[str]:
+    """
+    Merge notes in groups until they all fit one report prompt.
+
+    Each round merges consecutive groups concurrently, so the number of
+    rounds grows with the log of the number of excerpts.
+    """
+    report_budget = get_context_window(model_name) - REPORT_REPLY_TOKENS
+    merge_budget = get_context_window(model_name) - NOTES_REPLY_TOKENS
+    while len(notes) > 1 and estimate_tokens(build_report_prompt(notes)) > report_budget:
+        groups = [[notes[0]]]
+        for note in notes[1:]:
+            if estimate_tokens(build_merge_notes_prompt(groups[-1] + [note])) > merge_budget:
+                groups.append([])
+            groups[-1].append(note)
+        if len(groups) == len(notes):
+            break  # no two notes fit one merge prompt; report on them as they are
+
+        merged = iter(_run_all([build_merge_notes_prompt(g) for g in groups if len(g) > 1], client, model_name,
+                               max_concurrency, timeout, max_retries, use_cache, None))
+        notes = [next(merged) if len(group) > 1 else group[0] for group in groups]
+    return notes
+
+
+def prepare_analysis_prompt(transcript: str, client, model_name: str, max_concurrency: int = 4,
+                            timeout: Optional[float] = 120, max_retries: int = 3, use_cache: bool = True,
+                            progress: Optional[Callable[[int, int], None]] = None) -> str:
+    """
+    Return the prompt that produces the 10-section report for a transcript.
+
+    Short transcripts get the single-prompt analysis directly. Long ones are
+    chunked and their excerpts analyzed first (the map step, which calls the
+    model); the returned prompt is then the reduce step, ready to stream.
+
+    Args:
+        transcript: Transcript text
+        client: OpenAI client instance
+        model_name: Name of the model to use
+        max_concurrency: Maximum excerpt requests in flight
+        timeout: Per-request timeout in seconds
+        max_retries: Retries with backoff on 429/5xx/timeouts
+        use_cache: Read and write the persistent response cache
+        progress: Optional callback(done, total) as excerpts finish
+    """
+    if not needs_chunking(transcript, model_name):
+        return build_analysis_prompt(transcript)
+
+    chunks = chunk_transcript(transcript, model_name)
+    prompts = [build_excerpt_prompt(chunk['turns'], chunk['context'], i, len(chunks))
+               for i, chunk in enumerate(chunks, start=1)]
+    notes = _run_all(prompts, client, model_name, max_concurrency, timeout, max_retries, use_cache, progress)
+    notes = reduce_notes(notes, client, model_name, max_concurrency, timeout, max_retries, use_cache)
+    return build_report_prompt(notes)
@@ -0,0 +1,113 @@
+"""
+Transcript Parser - Single-pass turn parser for Coach:/Client: transcripts
+"""
+
+import re
+from typing import Dict, Iterable, Iterator, Union
+
+# A speaker label ("Coach:", "Coachee:", "Dr. Smith:") at the start of a line
+_SPEAKER_RE = re.compile(r"([A-Za-z][\w .'-]{0,39}):(.*)")
+# WEBVTT header, cue numbers and cue timings carry no dialogue
+_CUE_RE = re.compile(r"WEBVTT.*|\d+|\d[\d:.,]*\s*-->.*")
+
+
+def iter_turns(transcript: Union[str, Iterable[str]]) -> Iterator[Dict]:
+    """
+    Parse a transcript into speaker turns in one pass over its lines.
+
+    Consecutive lines from the same speaker are merged into one turn. Lines
+    without a Coach:/Client: label (blank lines, timestamps, other speakers)
+    are skipped and do not end the current turn. Runs in O(n) time and, given
+    an iterable of lines such as an open file, holds only the current turn in
+    memory.
+
+    Args:
+        transcript: Transcript text, or any iterable of lines (e.g. an open file)
+
+    Yields:
+        Dicts with speaker ('coach' or 'client'), text (merged), start_line and
+        end_line (1-based, inclusive), and previous_coach (text of the most
+        recent coach turn before this one, '' if none)
+    """
+    lines = transcript.split('\n') if isinstance(transcript, str) else transcript
+
+    previous_coach = ""
+    speaker, parts, start_line, end_line = None, [], 0, 0
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        # Cheap first-character test skips most unlabelled lines
+        if line[:1] not in ('c', 'C'):
+            continue
+        label = line[:7].lower()
+        if label.startswith('coach:'):
+            line_speaker, text = 'coach', line[6:].strip()
+        elif label == 'client:':
+            line_speaker, text = 'client', line[7:].strip()
+        else:
+            continue
+
+        if line_speaker == speaker:
+            parts.append(text)
+            end_line = line_number
+            continue
+
+        if speaker is not None:
+            merged = " ".join(parts).strip()
+            yield {'speaker': speaker, 'text': merged, 'start_line': start_line,
+                   'end_line': end_line, 'previous_coach': previous_coach}
+            if speaker == 'coach':
+                previous_coach = merged
+        speaker, parts, start_line, end_line = line_speaker, [text], line_number, line_number
+
+    if speaker is not None:
+        yield {'speaker': speaker, 'text': " ".join(parts).strip(), 'start_line': start_line,
+               'end_line': end_line, 'previous_coach': previous_coach}
+
+
+def iter_speaker_turns(transcript: Union[str, Iterable[str]]) -> Iterator[Dict]:
+    """
+    Parse a transcript into turns for every labelled speaker, not just Coach/Client.
+
+    Unlike iter_turns, lines without a label continue the current turn rather
+    than being skipped, so no dialogue is lost; only WEBVTT cue numbers and
+    timings are dropped. Consecutive lines from the same speaker are merged.
+
+    Args:
+        transcript: Transcript text, or any iterable of lines (e.g. an open file)
+
+    Yields:
+        Dicts with speaker (label as written, or '' before the first label),
+        text (merged), start_line and end_line (1-based, inclusive)
+    """
+    lines = transcript.split('\n') if isinstance(transcript, str) else transcript
+
+    speaker, parts, start_line, end_line = None, [], 0, 0
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or _CUE_RE.fullmatch(line):
+            continue
+        match = _SPEAKER_RE.fullmatch(line)
+        if match is None or match.group(1).strip() == speaker:
+            if speaker is None:
+                speaker, start_line = '', line_number
+            parts.append(match.group(2).strip() if match else line)
+            end_line = line_number
+            continue
+
+        if speaker is not None:
+            yield {'speaker': speaker, 'text': " ".join(parts).strip(),
+                   'start_line': start_line, 'end_line': end_line}
+        speaker, parts = match.group(1).strip(), [match.group(2).strip()]
+        start_line = end_line = line_number
+
+    if speaker is not None:
+        yield {'speaker': speaker, 'text': " ".join(parts).strip(),
+               'start_line': start_line, 'end_line': end_line}
+
+
+def count_turns(transcript: Union[str, Iterable[str]]) -> Dict[str, int]:
+    """Count coach and client turns in a transcript."""
+    counts = {'coach': 0, 'client': 0}
+    for turn in iter_turns(transcript):
+        counts[turn['speaker']] += 1
+    return counts